@@ -0,0 +1,57 @@
+"""
+abort() latency: time between the abort call and the worker being finished,
+for a worker ignoring its token and for one waiting on it, and the time to abort many waiting workers
+"""
+import time
+
+from common import summarize
+from worker import worker, get_token, ThreadWorkerManager
+
+
+def spin():
+    while True:
+        time.sleep(0.0001)
+
+
+def cooperative():
+    get_token().wait()
+
+
+def _abort(n: int, start) -> dict:
+    samples = []
+    for _ in range(n):
+        w = start()
+        while w.thread is None or not w.thread.is_alive():
+            time.sleep(0.0001)
+        time.sleep(0.001)
+        begin = time.perf_counter_ns()
+        w.abort()
+        w.wait()
+        samples.append(time.perf_counter_ns() - begin)
+    return summarize(samples)
+
+
+def _shutdown(count: int, start) -> dict:
+    workers = [start() for _ in range(count)]
+    while any(w.token.waiters == 0 for w in workers):
+        time.sleep(0.001)
+    begin = time.perf_counter_ns()
+    for w in workers:
+        w.abort()
+    ThreadWorkerManager.wait(*workers)
+    return {"workers": count, "total_ms": round((time.perf_counter_ns() - begin) / 1e6, 3)}
+
+
+def run(quick: bool = False) -> dict:
+    n = 50 if quick else 500
+    plain = worker("bench-abort")(spin)
+    pooled = worker("bench-abort-pool", pool="bench-abort", max_workers=1)(spin)
+    token = worker("bench-abort-token")(cooperative)
+    results = {
+        "worker": _abort(n, plain),
+        "worker_pool": _abort(n, pooled),
+        "worker_token": _abort(n, token),
+        "shutdown_token": _shutdown(200 if quick else 1000, token),
+    }
+    ThreadWorkerManager.shutdown_pool("bench-abort", wait=False)
+    return results
@@ -0,0 +1,116 @@
+"""
+Dispatch latency and throughput of empty tasks
+"""
+import time
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from common import summarize, throughput, timed
+from worker import worker, async_worker, process, ThreadWorkerManager
+
+
+def noop():
+    return None
+
+
+def noop_batch(items):
+    return items
+
+
+async def anoop():
+    return None
+
+
+def _threads(n: int) -> dict:
+    results = {}
+
+    plain = worker("bench-dispatch")(noop)
+    pooled = worker("bench-dispatch-pool", pool="bench-dispatch", max_workers=4)(noop)
+    batched = worker("bench-dispatch-batch", pool="bench-dispatch", max_workers=4, batch_size=64, max_latency_ms=5)(noop_batch)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        cases = {
+            "worker": lambda: plain(),
+            "worker_pool": lambda: pooled(),
+            "worker_pool_batched": lambda: batched(None),
+            "thread_pool_executor": lambda: executor.submit(noop),
+        }
+        for name, submit in cases.items():
+            handles = []
+            samples = timed(lambda: handles.append(submit()), n)
+            for h in handles:
+                h.result() if isinstance(h, Future) else h.wait(timeout=None)
+
+            start = time.perf_counter_ns()
+            handles = [submit() for _ in range(n)]
+            for h in handles:
+                h.result() if isinstance(h, Future) else h.wait(timeout=None)
+            results[name] = {
+                "submit_latency": summarize(samples),
+                "throughput": throughput(n, time.perf_counter_ns() - start),
+            }
+    ThreadWorkerManager.shutdown_pool("bench-dispatch")
+    return results
+
+
+def _async(n: int) -> dict:
+    results = {}
+    cases = {
+        "async_worker": async_worker("bench-dispatch-async")(anoop),
+        "async_worker_shared_loop": async_worker("bench-dispatch-loop", shared_loop=True)(anoop),
+    }
+    for name, submit in cases.items():
+        async def run():
+            samples, handles = [], []
+            for _ in range(n):
+                start = time.perf_counter_ns()
+                handles.append(await submit())
+                samples.append(time.perf_counter_ns() - start)
+            for h in handles:
+                await h
+            start = time.perf_counter_ns()
+            handles = [await submit() for _ in range(n)]
+            for h in handles:
+                await h
+            return {
+                "submit_latency": summarize(samples),
+                "throughput": throughput(n, time.perf_counter_ns() - start),
+            }
+        results[name] = asyncio.run(run())
+    return results
+
+
+def _processes(n: int) -> dict:
+    results = {}
+    pooled = process(noop, pool_size=2)
+    pooled().wait()  # fork the children before measuring
+    start = time.perf_counter_ns()
+    handles = [pooled() for _ in range(n)]
+    for h in handles:
+        h.wait(timeout=None)
+    results["process_pool"] = {
+        "round_trip": summarize(timed(lambda: pooled().receive(), n)),
+        "throughput": throughput(n, time.perf_counter_ns() - start),
+    }
+    pooled.pool.shutdown()
+
+    batched = process(noop_batch, pool_size=2, batch_size=64, max_latency_ms=5)
+    start = time.perf_counter_ns()
+    handles = [batched(None) for _ in range(n)]
+    for h in handles:
+        h.wait(timeout=None)
+    results["process_pool_batched"] = {
+        "throughput": throughput(n, time.perf_counter_ns() - start),
+    }
+    batched.pool.shutdown()
+
+    forked = process(noop)
+    count = max(1, n // 50)
+    results["process"] = {
+        "round_trip": summarize(timed(lambda: forked().receive(), count)),
+    }
+    return results
+
+
+def run(quick: bool = False) -> dict:
+    n = 500 if quick else 5000
+    return {**_threads(n), **_async(n), **_processes(n // 5)}
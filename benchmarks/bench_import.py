@@ -0,0 +1,56 @@
+"""
+`import worker` cost in fresh interpreters, from `python -X importtime`.
+The process backend and asyncio are loaded on first use, `import_process` and `import_asyncio`
+show what a program pays once it uses them
+"""
+import sys
+import subprocess
+
+from common import ROOT, summarize
+
+
+SNIPPETS = {
+    "import": "import worker",
+    "import_process": "import worker; worker.ProcessConnector",
+    "import_asyncio": "import worker; worker.EventLoopThread",
+}
+
+# heavy modules which `import worker` alone must not load
+DEFERRED = ("asyncio", "multiprocessing", "ctypes", "inspect", "json", "hashlib")
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def _top_level_imports(code: str) -> dict:
+    """
+    Cumulative time in microseconds of every top-level import done by `code`
+    """
+    imports = {}
+    for line in _run(code, "-X", "importtime").stderr.splitlines():
+        # import time: self [us] | cumulative | imported package, nested imports are indented
+        columns = line.split("|")
+        if len(columns) == 3 and columns[1].strip().isdigit() and not columns[2].startswith("  "):
+            imports[columns[2].strip()] = int(columns[1])
+    return imports
+
+
+def _import_ns(code: str, startup: set) -> int:
+    """
+    Time spent importing what `code` needs on top of the interpreter startup, in nanoseconds
+    """
+    return sum(us for name, us in _top_level_imports(code).items() if name not in startup) * 1000
+
+
+def run(quick: bool = False) -> dict:
+    repeat = 5 if quick else 30
+    _run("import worker")  # compile the bytecode first
+    startup = set(_top_level_imports("pass"))
+    results = {
+        label: summarize([_import_ns(code, startup) for _ in range(repeat)])
+        for label, code in SNIPPETS.items()
+    }
+    loaded = _run(f"import sys, worker; print(' '.join(m for m in {DEFERRED!r} if m in sys.modules))").stdout.split()
+    results["import"]["deferred_modules_loaded"] = len(loaded)
+    return results
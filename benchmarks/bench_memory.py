@@ -0,0 +1,49 @@
+"""
+Memory held by 10k finished workers in `ThreadWorkerManager.allWorkers`
+"""
+import gc
+import tracemalloc
+
+from worker import worker, ThreadWorkerManager
+
+
+def noop(payload):
+    return None
+
+
+def _retained(count: int, history_size: int) -> dict:
+    ThreadWorkerManager.clear()
+    ThreadWorkerManager.set_history_size(history_size)
+    run = worker("bench-memory", pool="bench-memory", max_workers=4)(noop)
+    run(None).wait()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    workers = [run(None) for _ in range(count)]
+    for w in workers:
+        w.wait()
+    del workers, w
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return {
+        "workers": count,
+        "history_size": history_size,
+        "retained_bytes": retained,
+        "bytes_per_worker": round(retained / count, 1),
+        "kept_workers": len(ThreadWorkerManager.allWorkers),
+    }
+
+
+def run(quick: bool = False) -> dict:
+    count = 2000 if quick else 10000
+    try:
+        return {
+            "history_all": _retained(count, count),
+            "history_default": _retained(count, 1000),
+        }
+    finally:
+        ThreadWorkerManager.clear()
+        ThreadWorkerManager.set_history_size(1000)
+        ThreadWorkerManager.shutdown_pool("bench-memory")
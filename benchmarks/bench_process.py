@@ -0,0 +1,47 @@
+"""
+ProcessConnector round-trip cost by payload size, through the pipe and through shared memory,
+and the cost of starting a child with every start method
+"""
+from common import summarize, timed
+from worker import process
+
+
+# label -> (size, repeat)
+SIZES = {
+    "1KiB": (1 << 10, 200),
+    "64KiB": (64 << 10, 200),
+    "1MiB": (1 << 20, 50),
+    "16MiB": (16 << 20, 10),
+}
+
+
+def echo(payload):
+    return payload
+
+
+def run(quick: bool = False) -> dict:
+    results = {}
+    variants = {
+        "pipe": process(echo, pool_size=1),
+        "shared_memory": process(echo, pool_size=1, shared_memory=64 << 10),
+    }
+    for variant, run_echo in variants.items():
+        run_echo(b"").receive()  # fork the child before measuring
+        for label, (size, repeat) in SIZES.items():
+            payload = bytearray(size)
+            samples = timed(lambda: run_echo(payload).receive(), max(3, repeat // 10) if quick else repeat)
+            stats = summarize(samples)
+            stats["MiB_per_s"] = round(2 * size / (1 << 20) / (stats["p50_us"] / 1e6), 1)
+            results[f"{variant}.{label}"] = stats
+        run_echo.pool.shutdown()
+
+    plain = process(echo)
+    for label in ("1KiB", "1MiB"):
+        payload = bytearray(SIZES[label][0])
+        results[f"process.{label}"] = summarize(timed(lambda: plain(payload).receive(), 5 if quick else 20))
+
+    for method in ("fork", "forkserver", "spawn"):
+        start = process(echo, start_method=method, preload=["bench_process"])
+        start(b"").receive()  # the forkserver is started on the first child
+        results[f"startup.{method}"] = summarize(timed(lambda: start(b"").receive(), 3 if quick else 20))
+    return results
@@ -0,0 +1,48 @@
+"""
+Wake-up latency: time between the end of a task and the waiter resuming
+"""
+import time
+import asyncio
+
+from common import summarize
+from worker import worker, ThreadWorkerManager
+
+
+def finish_at():
+    time.sleep(0.002)
+    return time.perf_counter_ns()
+
+
+def _wake_up(n: int, wait) -> dict:
+    samples = []
+    for _ in range(n):
+        finished_ns = wait()
+        samples.append(time.perf_counter_ns() - finished_ns)
+    return summarize(samples)
+
+
+def run(quick: bool = False) -> dict:
+    n = 100 if quick else 1000
+    plain = worker("bench-wait")(finish_at)
+    pooled = worker("bench-wait-pool", pool="bench-wait", max_workers=2)(finish_at)
+
+    def wait(w):
+        w.wait()
+        return w.ret
+
+    async def awaited(n):
+        samples = []
+        for _ in range(n):
+            finished_ns = await pooled()
+            samples.append(time.perf_counter_ns() - finished_ns)
+        return summarize(samples)
+
+    results = {
+        "worker.wait": _wake_up(n, lambda: wait(plain())),
+        "worker.await_worker": _wake_up(n, lambda: plain().await_worker()),
+        "pool.wait": _wake_up(n, lambda: wait(pooled())),
+        "pool.await": asyncio.run(awaited(n)),
+        "manager.wait_any": _wake_up(n, lambda: ThreadWorkerManager.wait_any(pooled()).ret),
+    }
+    ThreadWorkerManager.shutdown_pool("bench-wait")
+    return results
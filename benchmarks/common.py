@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import platform
+import statistics
+import subprocess
+from typing import Callable, Dict, List
+
+
+# benchmark the checkout, not an installed copy
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# the forkserver does not get our sys.path, it imports the preloaded modules from PYTHONPATH
+os.environ["PYTHONPATH"] = os.pathsep.join(
+    [ROOT, os.path.dirname(os.path.abspath(__file__))] + [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+)
+
+
+def summarize(samples_ns: List[int]) -> Dict[str, float]:
+    """
+    Summary of latency samples in microseconds
+    """
+    samples = sorted(samples_ns)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] / 1e3
+    return {
+        "n": len(samples),
+        "mean_us": round(statistics.fmean(samples) / 1e3, 2),
+        "min_us": round(samples[0] / 1e3, 2),
+        "p50_us": round(pick(0.50), 2),
+        "p90_us": round(pick(0.90), 2),
+        "p99_us": round(pick(0.99), 2),
+    }
+
+
+def throughput(count: int, elapsed_ns: int) -> Dict[str, float]:
+    return {
+        "n": count,
+        "elapsed_s": round(elapsed_ns / 1e9, 4),
+        "ops_per_s": round(count / (elapsed_ns / 1e9), 1),
+    }
+
+
+def timed(func: Callable, repeat: int) -> List[int]:
+    """
+    Call `func` `repeat` times and return the duration of every call in nanoseconds
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
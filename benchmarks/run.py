@@ -0,0 +1,66 @@
+"""
+Run the benchmarks and print the results as JSON
+
+    python benchmarks/run.py                      # all benchmarks
+    python benchmarks/run.py dispatch process     # some of them
+    python benchmarks/run.py --quick --output new.json --compare old.json
+"""
+import sys
+import json
+import argparse
+import importlib
+
+from common import metadata
+
+
+BENCHMARKS = ["import", "dispatch", "wait", "process", "abort", "memory"]
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(new: dict, old: dict):
+    """
+    Print the relative change of every metric found in both results
+    """
+    new, old = flatten(new["results"]), flatten(old["results"])
+    for key in sorted(new.keys() & old.keys()):
+        if old[key]:
+            print(f"{key:<70} {old[key]:>14} -> {new[key]:>14} ({(new[key] - old[key]) / old[key]:+.1%})", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="python-worker benchmarks")
+    parser.add_argument("benchmarks", nargs="*", help=f"any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a smoke run")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report = {"meta": metadata(), "results": {}}
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"running {name} ...", file=sys.stderr)
+        report["results"][name] = importlib.import_module(f"bench_{name}").run(quick=args.quick)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    if args.compare:
+        with open(args.compare) as file:
+            compare(report, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# run the tests against the package of this checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
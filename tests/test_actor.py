@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from worker import actor, ActorPool, ProcessKilled
+
+
+@actor
+class Counter:
+    def __init__(self, start=0):
+        self.value = start
+        self.pid = os.getpid()
+
+    def add(self, n=1):
+        self.value += n
+        return self.value
+
+    def info(self):
+        return "method named like an ActorRef method"
+
+    def crash(self):
+        os._exit(1)
+
+
+@actor
+class Broken:
+    def __init__(self):
+        raise ValueError("init failed")
+
+
+def test_state_stays_warm_across_calls_in_one_child():
+    counter = Counter(10)
+    try:
+        assert counter.ready.wait(10) and counter.ready.error is None
+        assert [counter.add().receive() for _ in range(3)] == [11, 12, 13]
+        assert counter.value().receive() == 13
+        assert counter.pid().receive() != os.getpid()
+        assert counter.call("info").receive() == "method named like an ActorRef method"
+    finally:
+        counter.stop()
+
+
+def test_killed_child_starts_a_fresh_instance():
+    counter = Counter()
+    try:
+        assert counter.add(5).receive() == 5
+        pid = counter.pid().receive()
+        crashed = counter.crash()
+        assert crashed.wait(10) and isinstance(crashed.error, ProcessKilled)
+        assert counter.add().receive() == 1
+        assert counter.pid().receive() != pid
+    finally:
+        counter.stop()
+
+
+def test_init_error_shows_up_on_ready():
+    broken = Broken()
+    try:
+        assert broken.ready.wait(10)
+        assert isinstance(broken.ready.error, ValueError)
+    finally:
+        broken.stop()
+
+
+def test_actor_pool_routes_a_key_to_the_same_instance():
+    pool = ActorPool(Counter, 3)
+    try:
+        assert pool["user-1"] is pool.route("user-1")
+        assert [pool["user-1"].add().receive() for _ in range(3)] == [1, 2, 3]
+        assert sorted(h.receive() for h in pool.broadcast("add", 10)) == [10, 10, 13]
+        assert len({ref.pid().receive() for ref in pool.actors}) == 3
+    finally:
+        pool.stop()
+
+
+def test_plain_class_is_required():
+    with pytest.raises(AssertionError):
+        actor(lambda: None)
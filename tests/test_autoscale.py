@@ -0,0 +1,192 @@
+import os
+import time
+import threading
+
+import pytest
+
+from worker import process, ScalingPolicy, Autoscaler, ThreadWorkerManager
+from worker.process import PooledProcessConnector, ProcessPool
+
+
+class FakeLoad():
+    """
+    A load meter driven by the test, every sample is one second after the previous one
+    """
+    def __init__(self):
+        self.totals = dict(
+            time_ns=0, started=0, finished=0, queued=0, running=0, queue_wait_ns=0, queued_age_ns=0, busy_ns=0
+        )
+
+    def tick(self, size, finished=0, queue_wait=0.0, queued=0, utilization=0.0):
+        t = self.totals
+        t["time_ns"] += 10**9
+        t["started"] += finished
+        t["finished"] += finished
+        t["queue_wait_ns"] += int(queue_wait * 1e9) * finished
+        t["queued"] = queued
+        t["queued_age_ns"] = int(queue_wait * 1e9) * queued
+        t["busy_ns"] += int(utilization * size * 1e9)
+
+    def sample(self, now_ns):
+        return dict(self.totals)
+
+
+class FakePool():
+    def __init__(self, size):
+        self.name = "fake"
+        self.max_workers = size
+        self.is_shutdown = False
+        self.load = FakeLoad()
+
+    def resize(self, size):
+        self.max_workers = size
+
+
+def scaler(size=2, **options):
+    pool = FakePool(size)
+    options.setdefault("scale_up_intervals", 2)
+    options.setdefault("scale_down_intervals", 3)
+    return pool, Autoscaler(pool, ScalingPolicy(**options), ThreadWorkerManager.deadlines)
+
+
+def step(pool, autoscaler, **load):
+    pool.load.tick(pool.max_workers, **load)
+    return autoscaler.evaluate()
+
+
+def test_grows_after_consecutive_intervals_over_the_target_queue_wait():
+    pool, a = scaler(2, max_size=10)
+    assert step(pool, a, finished=50, queue_wait=0.2, queued=20, utilization=1.0)["action"] == "hold"
+    decision = step(pool, a, finished=50, queue_wait=0.2, queued=20, utilization=1.0)
+    assert decision["action"] == "grow" and "queue wait" in decision["reason"]
+    assert pool.max_workers == decision["new_size"] == 3
+    assert list(a.decisions) == [decision]
+
+
+def test_a_single_spike_does_not_grow():
+    pool, a = scaler(2)
+    step(pool, a, finished=50, queue_wait=0.2, queued=20, utilization=1.0)
+    step(pool, a, finished=50, utilization=0.5)
+    step(pool, a, finished=50, queue_wait=0.2, queued=20, utilization=1.0)
+    assert pool.max_workers == 2 and not a.decisions
+
+
+def test_shrinks_after_consecutive_idle_intervals_down_to_min_size():
+    pool, a = scaler(8, min_size=3)
+    for _ in range(2):
+        assert step(pool, a, finished=1, utilization=0.05)["action"] == "hold"
+    decision = step(pool, a, finished=1, utilization=0.05)
+    assert decision["action"] == "shrink" and pool.max_workers == 6
+    for _ in range(30):
+        step(pool, a)
+    assert pool.max_workers == 3
+    assert step(pool, a)["reason"] in ("idle", "at min_size")
+
+
+def test_between_the_thresholds_the_size_holds():
+    pool, a = scaler(4)
+    for _ in range(10):
+        assert step(pool, a, finished=40, queue_wait=0.01, utilization=0.6)["reason"] == "within target"
+    assert pool.max_workers == 4
+
+
+def test_growth_without_throughput_gain_is_undone_and_becomes_a_ceiling():
+    pool, a = scaler(2, max_size=10, probe_intervals=4)
+    for _ in range(2):
+        step(pool, a, finished=100, queue_wait=0.5, queued=50, utilization=1.0)
+    assert pool.max_workers == 3
+    for _ in range(2):
+        decision = step(pool, a, finished=100, queue_wait=0.5, queued=50, utilization=1.0)
+    assert decision["action"] == "shrink" and "no throughput gain" in decision["reason"]
+    assert pool.max_workers == 2 and a.ceiling == 2
+    for _ in range(2):
+        decision = step(pool, a, finished=100, queue_wait=0.5, queued=50, utilization=1.0)
+    assert decision["reason"] == "at ceiling 2"
+    for _ in range(4):
+        step(pool, a, finished=100, queue_wait=0.5, queued=50, utilization=1.0)
+    # the ceiling expires, the pool probes a larger size again and finds no gain again
+    assert [(d["action"], d["new_size"]) for d in a.decisions] == [("grow", 3), ("shrink", 2), ("grow", 3), ("shrink", 2)]
+
+
+def test_growth_with_throughput_gain_keeps_growing():
+    pool, a = scaler(2, max_size=10)
+    for finished in (100, 100, 150, 150):
+        step(pool, a, finished=finished, queue_wait=0.5, queued=50, utilization=1.0)
+    assert [d["action"] for d in a.decisions] == ["grow", "grow"]
+
+
+def test_max_cpu_holds_a_thread_pool():
+    pool, a = scaler(2, max_cpu=0.0)
+    for _ in range(2):
+        decision = step(pool, a, finished=50, queue_wait=0.2, queued=20, utilization=1.0)
+    assert decision["action"] == "hold" and decision["reason"].startswith("cpu")
+
+
+def test_max_cpu_is_rejected_for_process_pools():
+    pool = ProcessPool(len, 1)
+    with pytest.raises(AssertionError):
+        Autoscaler(pool, ScalingPolicy(max_cpu=1.0), ThreadWorkerManager.deadlines)
+    a = Autoscaler(pool, ScalingPolicy(), ThreadWorkerManager.deadlines)
+    assert a.evaluate()["cpu"] is None
+
+
+def test_policy_validation():
+    with pytest.raises(AssertionError):
+        ScalingPolicy(min_size=4, max_size=2)
+    with pytest.raises(AssertionError):
+        ScalingPolicy(target_utilization=0)
+
+
+def test_autoscale_a_named_thread_pool_under_load():
+    a = ThreadWorkerManager.autoscale("test-autoscale", min_size=1, max_size=8, interval=0.1, scale_up_intervals=1)
+    try:
+        pool = ThreadWorkerManager.get_pool("test-autoscale")
+        pool.resize(1)
+        done = threading.Semaphore(0)
+        for _ in range(40):
+            pool.submit(lambda: (time.sleep(0.02), done.release()))
+        for _ in range(40):
+            assert done.acquire(timeout=10)
+        assert any(d["action"] == "grow" for d in a.decisions)
+        assert "test-autoscale" in ThreadWorkerManager.list_autoscalers()
+    finally:
+        ThreadWorkerManager.shutdown_pool("test-autoscale")
+    assert not a.is_running and "test-autoscale" not in ThreadWorkerManager.autoscalers
+
+
+def child_pid(delay):
+    time.sleep(delay)
+    return os.getpid()
+
+
+def settle(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_process_pool_resize_grows_and_retires_children():
+    pool = ProcessPool(child_pid, 1)
+    try:
+        call = lambda delay=0: PooledProcessConnector(child_pid, pool).create_and_run(delay)
+        first = call().receive()
+        pool.resize(3)
+        pids = {c.receive() for c in [call(0.3) for _ in range(3)]}
+        assert len(pids) == 3 and first in pids
+        pool.resize(1)
+        assert settle(lambda: len(pool.slots) == 1)
+        assert pool.info()["pool_size"] == 1
+        assert call().receive() in pids
+    finally:
+        pool.shutdown()
+
+
+def test_process_decorator_starts_an_autoscaler():
+    run = process(pool_size=1, autoscale=dict(min_size=1, max_size=2, interval=10))(child_pid)
+    try:
+        assert ThreadWorkerManager.autoscalers[run.pool.name].max_size == 2
+        assert run(0).receive() != os.getpid()
+    finally:
+        ThreadWorkerManager.stop_autoscale(run.pool.name)
+        run.pool.shutdown()
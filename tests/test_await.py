@@ -0,0 +1,57 @@
+import os
+import time
+import asyncio
+
+from worker import worker, process
+
+
+@worker("slow-square")
+def slow_square(n):
+    time.sleep(0.2)
+    return n * n
+
+
+@process
+def child_pid():
+    time.sleep(0.2)
+    return os.getpid()
+
+
+async def count_ticks(awaitable):
+    ticks = 0
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+    task = asyncio.ensure_future(ticker())
+    result = await awaitable
+    task.cancel()
+    return result, ticks
+
+
+def test_await_worker_does_not_block_the_loop():
+    result, ticks = asyncio.run(count_ticks(slow_square(3)))
+    assert result == 9
+    assert ticks > 5
+
+
+def test_await_process_does_not_block_the_loop():
+    result, ticks = asyncio.run(count_ticks(child_pid()))
+    assert result != os.getpid()
+    assert ticks > 5
+
+
+def test_gather_workers_and_processes():
+    async def main():
+        return await asyncio.gather(slow_square(2), slow_square(4), child_pid())
+    four, sixteen, pid = asyncio.run(main())
+    assert (four, sixteen) == (4, 16) and pid != os.getpid()
+
+
+def test_await_a_finished_worker():
+    w = slow_square(5)
+    w.await_worker()
+    async def main():
+        return await w
+    assert asyncio.run(main()) == 25
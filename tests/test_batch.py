@@ -0,0 +1,108 @@
+import os
+import time
+import asyncio
+import threading
+
+from worker import worker, process
+from worker.batch import Batcher
+from worker.timer import DeadlineTimer
+
+
+@worker("double", batch_size=4, max_latency_ms=20)
+def double(items):
+    return [item * 2 for item in items]
+
+
+@worker("short", batch_size=4, max_latency_ms=10)
+def short(items):
+    return items[1:]
+
+
+class Runner():
+    def __init__(self, items):
+        self.ret = items
+        self.error = None
+
+    def add_done_callback(self, callback):
+        callback(self)
+
+
+def test_full_batch_splits_the_results():
+    handles = [double(i) for i in range(4)]
+    assert [h.receive() for h in handles] == [0, 2, 4, 6]
+    assert handles[0].batch is handles[3].batch
+
+
+def test_partial_batch_is_dispatched_after_max_latency():
+    handles = [double(i) for i in range(3)]
+    assert [h.receive() for h in handles] == [0, 2, 4]
+
+
+def test_wrong_result_count_fails_every_item():
+    handles = [short(i) for i in range(2)]
+    for h in handles:
+        h.wait()
+        assert isinstance(h.error, ValueError)
+
+
+def test_aborted_item_leaves_the_pending_batch():
+    handles = [double(i) for i in range(3)]
+    handles[1].abort()
+    assert handles[1].is_aborted
+    assert handles[0].receive() == 0
+    assert handles[2].receive() == 4
+    assert handles[1].ret is None
+
+
+def test_partial_batch_is_not_dispatched_on_the_timer_thread():
+    timer = DeadlineTimer("test-batch-deadlines")
+    threads = []
+    release = threading.Event()
+
+    def run(items):
+        threads.append(threading.current_thread().name)
+        # a slow dispatch (a full gate, a process start) must not hold the other deadlines
+        release.wait(5)
+        return Runner(items)
+
+    batcher = Batcher("slow", run, 10, 10, timer)
+    handle = batcher.submit(1)
+    fired = threading.Event()
+    time.sleep(0.05)
+    timer.schedule(0.01, fired.set)
+    assert fired.wait(1)
+    release.set()
+    assert handle.wait(5)
+    assert handle.ret == 1
+    assert threads == ["slow-flush"]
+
+
+def test_partial_batch_waits_for_a_blocking_gate():
+    @worker("gated-batch", batch_size=8, max_latency_ms=10, max_concurrency=1)
+    def gated(items):
+        time.sleep(0.05)
+        return items
+
+    first = [gated(i) for i in range(8)]
+    second = [gated(i) for i in range(3)]
+    assert [h.receive() for h in first] == list(range(8))
+    assert [h.receive() for h in second] == [0, 1, 2]
+
+
+@process(pool_size=1, batch_size=3, max_latency_ms=10)
+def process_batch(items):
+    return [(item, len(items), os.getpid()) for item in items]
+
+
+def test_process_batch_runs_once_per_batch_in_the_pool():
+    handles = [process_batch(i) for i in range(5)]
+    results = [h.receive() for h in handles]
+    assert [item for item, _, _ in results] == list(range(5))
+    assert [size for _, size, _ in results] == [3, 3, 3, 2, 2]
+    assert len({pid for _, _, pid in results}) == 1 and results[0][2] != os.getpid()
+
+
+def test_batch_item_is_awaitable():
+    async def main():
+        return await asyncio.gather(*(double(i) for i in range(6)))
+    assert asyncio.run(main()) == [0, 2, 4, 6, 8, 10]
@@ -0,0 +1,32 @@
+import os
+import sys
+import json
+import subprocess
+
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+
+def run(*args):
+    return subprocess.run(
+        [sys.executable, os.path.join(BENCHMARKS, "run.py"), "--quick", *args],
+        capture_output=True, text=True, timeout=300
+    )
+
+
+def test_quick_run_writes_and_compares_the_results(tmp_path):
+    output = tmp_path / "results.json"
+    first = run("dispatch", "wait", "--output", str(output))
+    assert first.returncode == 0, first.stderr
+    report = json.loads(output.read_text())
+    assert set(report["results"]) == {"dispatch", "wait"}
+    assert report["meta"]["python"]
+
+    second = run("dispatch", "--compare", str(output))
+    assert second.returncode == 0, second.stderr
+    assert "dispatch." in second.stderr and "%)" in second.stderr
+
+
+def test_unknown_benchmark_is_an_error():
+    result = run("nope")
+    assert result.returncode != 0 and "unknown benchmarks: nope" in result.stderr
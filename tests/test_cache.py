@@ -0,0 +1,86 @@
+import os
+import time
+
+import pytest
+
+from worker import worker, process, LRU
+from worker.cache import MISSING, make_key
+
+
+calls = []
+
+
+@worker("test-cached", cache=LRU(maxsize=2))
+def cached_square(n):
+    calls.append(n)
+    return n * n
+
+
+@worker("test-cache-errors", cache=LRU())
+def fails(n):
+    calls.append(n)
+    raise ValueError(n)
+
+
+@process(pool_size=1, cache=LRU())
+def cached_pid(n):
+    return os.getpid()
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRU(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.info()["evictions"] == 1
+
+
+def test_lru_expires_after_ttl():
+    cache = LRU(ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is MISSING
+
+
+def test_lru_disk_tier_survives_a_new_cache(tmp_path):
+    LRU(directory=str(tmp_path)).set(("key", 1), {"value": 1})
+    cache = LRU(directory=str(tmp_path))
+    assert cache.get(("key", 1)) == {"value": 1}
+    assert cache.info()["disk_hits"] == 1
+    cache.clear()
+    assert LRU(directory=str(tmp_path)).get(("key", 1)) is MISSING
+
+
+def test_make_key_ignores_call_options_and_pickles_unhashable_arguments():
+    assert make_key("f", (1,), {"_priority": 5}) == make_key("f", (1,), {})
+    ok, key = make_key("f", ([1, 2],), {})
+    assert ok and key == make_key("f", ([1, 2],), {})[1]
+    assert make_key("f", ([lambda: 0],), {}) == (False, None)
+
+
+def test_worker_returns_a_cached_handle_for_known_arguments():
+    calls.clear()
+    assert cached_square(3).await_worker(5) == 9
+    handle = cached_square(3)
+    assert handle.is_cached and handle.ret == 9 and handle.wait()
+    assert calls == [3]
+    assert cached_square.cache.info()["hits"] >= 1
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_failed_calls_are_not_cached():
+    calls.clear()
+    for _ in range(2):
+        w = fails(1)
+        w.thread.join(5)
+    assert calls == [1, 1]
+
+
+def test_process_results_are_cached():
+    first = cached_pid(1).receive()
+    handle = cached_pid(1)
+    assert handle.is_cached and handle.receive() == first
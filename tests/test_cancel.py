@@ -0,0 +1,82 @@
+import time
+import threading
+
+import pytest
+
+from worker import worker, get_token, ThreadWorkerManager
+from worker.cancel import CancellationToken, WorkerCancelled
+
+
+
+def wait_finished(w, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not w.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return w.finished
+
+
+cleaned = []
+stopped_by = []
+
+
+@worker("test-poller")
+def poller():
+    token = get_token()
+    while not token.cancelled:
+        token.wait(10)
+    cleaned.append(True)
+    return "stopped"
+
+
+@worker("test-checker")
+def checker(started):
+    started.set()
+    try:
+        while True:
+            get_token().raise_if_cancelled()
+            time.sleep(0.001)
+    except SystemExit as e:
+        stopped_by.append(type(e))
+        raise
+
+
+def test_token_wait_wakes_up_on_cancel():
+    token = CancellationToken()
+    assert token.wait(0.01) is False
+    threading.Timer(0.05, token.cancel).start()
+    start = time.monotonic()
+    assert token.wait(5) is True
+    assert time.monotonic() - start < 1
+    with pytest.raises(WorkerCancelled):
+        token.raise_if_cancelled()
+
+
+def test_get_token_outside_a_worker_is_never_cancelled():
+    assert get_token() is get_token()
+    assert not get_token().cancelled
+
+
+def test_abort_wakes_up_a_worker_waiting_on_its_token():
+    cleaned.clear()
+    w = poller()
+    time.sleep(0.05)
+    start = time.monotonic()
+    w.abort()
+    assert wait_finished(w)
+    assert time.monotonic() - start < ThreadWorkerManager.abort_grace
+    # it stopped by itself, so it could clean up and return
+    assert cleaned == [True] and w.ret == "stopped"
+
+
+def test_raise_if_cancelled_ends_the_worker_as_aborted():
+    stopped_by.clear()
+    before = ThreadWorkerManager.stats("test-checker")["aborted"]
+    started = threading.Event()
+    w = checker(started)
+    assert started.wait(5)
+    w.abort()
+    assert wait_finished(w)
+    # the worker saw its token, it was not stopped by the asynchronous exception
+    assert stopped_by == [WorkerCancelled]
+    assert w.ret is None and w.error is None
+    assert ThreadWorkerManager.stats("test-checker")["aborted"] == before + 1
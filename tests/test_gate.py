@@ -0,0 +1,78 @@
+import time
+import threading
+
+import pytest
+
+from worker import worker, ThreadWorkerManager, WorkerQueueFull
+
+
+def wait_finished(w, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not w.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return w.finished
+
+
+def gated(name, **options):
+    release = threading.Event()
+    state = {"running": 0, "peak": 0}
+    lock = threading.Lock()
+
+    @worker(name, **options)
+    def task(n):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        release.wait(5)
+        with lock:
+            state["running"] -= 1
+        return threading.current_thread().name
+    return task, release, state
+
+
+def test_max_concurrency_limits_the_running_workers():
+    task, release, state = gated("test-gate-limit", max_concurrency=2)
+    workers = [task(i) for i in range(6)]
+    time.sleep(0.1)
+    assert ThreadWorkerManager.queue_depth("test-gate-limit") == 4
+    release.set()
+    for w in workers:
+        w.await_worker(5)
+    assert state["peak"] == 2
+    assert ThreadWorkerManager.list_gates()["test-gate-limit"]["running"] == 0
+
+
+def test_full_queue_rejects():
+    task, release, _ = gated("test-gate-reject", max_concurrency=1, queue_size=1, on_full="reject")
+    running, queued = task(0), task(1)
+    with pytest.raises(WorkerQueueFull):
+        task(2)
+    release.set()
+    assert running.await_worker(5) and queued.await_worker(5)
+    assert ThreadWorkerManager.gates["test-gate-reject"].rejected == 1
+
+
+def test_full_queue_drops_the_oldest_queued_worker():
+    task, release, _ = gated("test-gate-drop", max_concurrency=1, queue_size=1, on_full="drop_oldest")
+    running, oldest, newest = task(0), task(1), task(2)
+    assert wait_finished(oldest)
+    assert oldest.is_aborted and oldest.ret is None
+    release.set()
+    assert running.await_worker(5) and newest.await_worker(5)
+
+
+def test_drop_oldest_needs_a_queue():
+    with pytest.raises(AssertionError):
+        gated("test-gate-drop-nothing", max_concurrency=1, queue_size=0, on_full="drop_oldest")
+    # an existing gate cannot be switched to it either
+    gated("test-gate-drop-update", max_concurrency=1, queue_size=0, on_full="caller_runs")
+    with pytest.raises(AssertionError):
+        gated("test-gate-drop-update", max_concurrency=1, queue_size=0, on_full="drop_oldest")
+
+
+def test_full_queue_runs_on_the_caller():
+    task, release, _ = gated("test-gate-caller", max_concurrency=1, queue_size=0, on_full="caller_runs")
+    running = task(0)
+    threading.Timer(0.1, release.set).start()
+    assert task(1).ret == threading.current_thread().name
+    assert running.await_worker(5) != threading.current_thread().name
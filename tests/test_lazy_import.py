@@ -0,0 +1,43 @@
+import os
+import sys
+import json
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fresh(code: str) -> dict:
+    """
+    Run `code` in a new interpreter and return the JSON it prints
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+def test_import_worker_does_not_load_the_process_and_asyncio_backends():
+    loaded = fresh(
+        "import sys, json, worker\n"
+        "print(json.dumps([m for m in ('multiprocessing', 'asyncio', 'ctypes', 'worker.process') if m in sys.modules]))"
+    )
+    assert loaded == []
+
+
+def test_lazy_names_load_on_first_use():
+    loaded = fresh(
+        "import sys, json, worker\n"
+        "pool = worker.ProcessPool\n"
+        "print(json.dumps(['worker.process' in sys.modules, pool.__module__, callable(worker.process)]))"
+    )
+    assert loaded == [True, "worker.process", True]
+
+
+def test_submodule_import_keeps_the_decorators():
+    import worker.process
+    import worker.actor
+    assert callable(worker.process) and not isinstance(worker.process, type(sys))
+    assert callable(worker.actor) and not isinstance(worker.actor, type(sys))
+    assert "ActorPool" in dir(worker)
@@ -0,0 +1,63 @@
+import time
+import asyncio
+import threading
+
+from worker import async_worker, ThreadWorkerManager
+from worker.loop import EventLoopThread
+
+
+@async_worker(shared_loop=True)
+async def loop_thread_name(delay=0):
+    await asyncio.sleep(delay)
+    return threading.current_thread().name
+
+
+@async_worker(shared_loop=True)
+async def sleeper():
+    await asyncio.sleep(10)
+
+
+def wait_finished(w, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not w.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return w.finished
+
+
+def start(coroutine_function, *args):
+    return asyncio.run(coroutine_function(*args))
+
+
+def test_shared_loop_coroutines_run_on_the_manager_loop_threads():
+    workers = [start(loop_thread_name, 0.01) for _ in range(20)]
+    names = {w.await_worker(5) for w in workers}
+    assert names <= {f"worker-loop-{i}" for i in range(ThreadWorkerManager.event_loop_threads)}
+    assert all(info["is_alive"] for info in ThreadWorkerManager.list_event_loops())
+
+
+def test_abort_cancels_the_coroutine_not_the_loop_thread():
+    w = start(sleeper)
+    w.abort()
+    assert wait_finished(w)
+    assert w.is_aborted
+    assert start(loop_thread_name).await_worker(5).startswith("worker-loop-")
+
+
+def test_abort_worker_cancels_a_shared_loop_worker():
+    w = start(sleeper)
+    ThreadWorkerManager.abort_worker(w)
+    assert wait_finished(w)
+    assert w.is_aborted
+    assert start(loop_thread_name).await_worker(5).startswith("worker-loop-")
+
+
+def test_event_loop_thread_stop_finishes_the_running_coroutines():
+    loop_thread = EventLoopThread("test-loop")
+    results = []
+    async def work():
+        await asyncio.sleep(0.05)
+        results.append(threading.current_thread().name)
+    future = loop_thread.submit(work())
+    loop_thread.stop(wait=True)
+    assert future.done() and results == ["test-loop"]
+    assert not loop_thread.is_alive and loop_thread.tasks == 0
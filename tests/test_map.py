@@ -0,0 +1,84 @@
+import os
+import time
+import threading
+
+import pytest
+
+from worker import worker, process
+from worker.mapping import chunked, iter_chunk_results
+
+
+@worker("square", pool="test-map", max_workers=4)
+def square(n):
+    return n * n
+
+
+@worker("add")
+def add(a, b):
+    return a + b
+
+
+@worker("late")
+def late(n):
+    time.sleep(0.2 if n == 0 else 0)
+    return n
+
+
+@worker("broken")
+def broken(n):
+    raise ValueError(n)
+
+
+@process(pool_size=2)
+def process_square(n):
+    return n * n, os.getpid()
+
+
+def test_chunked_splits_lazily():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    with pytest.raises(AssertionError):
+        list(chunked(range(3), 0))
+
+
+def test_iter_chunk_results_bounds_the_chunks_in_flight():
+    inflight = []
+    class Handle():
+        def __init__(self, chunk):
+            self.chunk = chunk
+            inflight.append(self)
+            peak.append(len(inflight))
+        def wait(self, timeout=None):
+            inflight.remove(self)
+    peak = []
+    results = iter_chunk_results(Handle, lambda h: h.chunk, chunked(range(10), 2), max_inflight=2)
+    assert list(results) == list(range(10))
+    assert max(peak) == 2
+
+
+def test_map_keeps_the_input_order():
+    assert list(square.map(range(50), chunksize=7)) == [n * n for n in range(50)]
+
+
+def test_map_unordered_yields_in_completion_order():
+    assert list(late.map(range(3), ordered=False)) == [1, 2, 0]
+
+
+def test_starmap_unpacks_the_items():
+    assert list(add.starmap([(1, 2), (3, 4)], chunksize=1)) == [3, 7]
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_failed_chunk_raises_the_error_of_the_function():
+    before = set(threading.enumerate())
+    with pytest.raises(ValueError):
+        list(broken.map(range(2)))
+    # the failed chunk threads re-raise the error, let them end inside this test
+    for thread in set(threading.enumerate()) - before:
+        if not thread.daemon:
+            thread.join(5)
+
+
+def test_process_map_sends_chunks_to_the_pool():
+    results = list(process_square.map(range(20), chunksize=5))
+    assert [square for square, _ in results] == [n * n for n in range(20)]
+    assert os.getpid() not in {pid for _, pid in results}
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from worker import worker, ThreadWorkerManager
+from worker.metrics import Histogram, LoadMeter, MetricsRegistry
+
+
+@worker("test-metrics")
+def metered(fail=False):
+    if fail:
+        raise ValueError("boom")
+    return "ok"
+
+
+def test_histogram_counts_by_bucket():
+    histogram = Histogram((0.001, 0.01))
+    for value_ns in (500_000, 5_000_000, 5_000_000, 50_000_000):
+        histogram.observe(value_ns)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.001": 1, "0.01": 2, "+Inf": 1}
+    assert snapshot["count"] == 4 and snapshot["sum"] == pytest.approx(0.0605)
+
+
+def test_registry_exports_prometheus_and_json():
+    registry = MetricsRegistry((0.1,))
+    metrics = registry.get('a "quoted" name')
+    metrics.on_queued()
+    metrics.on_start(1000)
+    metrics.on_finish(2000, "failed")
+    text = registry.to_prometheus("test")
+    assert 'test_failed_total{name="a \\"quoted\\" name"} 1' in text
+    assert 'test_run_time_seconds_bucket{name="a \\"quoted\\" name",le="+Inf"} 1' in text
+    assert json.loads(registry.to_json())['a "quoted" name']["started"] == 1
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_manager_stats_count_the_outcomes():
+    before = ThreadWorkerManager.stats("test-metrics")
+    metered().await_worker(5)
+    w = metered(fail=True)
+    # the error is raised out of the thread once the worker is finished
+    w.thread.join(5)
+    stats = ThreadWorkerManager.stats("test-metrics")
+    assert stats["started"] - before["started"] == 2
+    assert stats["finished"] - before["finished"] == 1
+    assert stats["failed"] - before["failed"] == 1
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["run_time_seconds"]["count"] - before["run_time_seconds"]["count"] == 2
+    assert 'name="test-metrics"' in ThreadWorkerManager.export_metrics("prometheus")
+
+
+def test_list_returns_the_worker_rows():
+    w = metered()
+    w.await_worker(5)
+    rows = ThreadWorkerManager.list()
+    assert any(row["id"] == w.id and row["name"] == w.name for row in rows)
+    assert all(row["is_alive"] for row in ThreadWorkerManager.list(active_only=True))
+
+
+def test_load_meter_counts_running_tasks_up_to_the_sample():
+    meter = LoadMeter()
+    meter.on_queued(0)
+    meter.on_queued(10)
+    meter.on_start(0, 100)
+    sample = meter.sample(1000)
+    assert sample["queued"] == 1 and sample["queued_age_ns"] == 990
+    assert sample["running"] == 1 and sample["busy_ns"] == 900
+    meter.on_finish(100, 600)
+    meter.on_cancel(10)
+    sample = meter.sample(2000)
+    assert (sample["queued"], sample["running"], sample["busy_ns"], sample["queue_wait_ns"]) == (0, 0, 500, 100)
@@ -0,0 +1,95 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from worker import Pipeline, stage
+
+
+def square(n):
+    return n * n
+
+
+def collector():
+    items, lock = [], threading.Lock()
+    def collect(item):
+        with lock:
+            items.append(item)
+    return items, collect
+
+
+def test_items_flow_through_the_stages():
+    items, collect = collector()
+    pipeline = Pipeline(stage(square, workers=3), stage(collect)).run(range(20), timeout=10)
+    assert pipeline.finished
+    assert sorted(items) == [n * n for n in range(20)]
+    stats = pipeline.stats()
+    assert stats["stages"]["square"]["received"] == 20 and stats["stages"]["square"]["emitted"] == 20
+
+
+def test_source_stage_none_drops_and_generators_fan_out():
+    items, collect = collector()
+    def source():
+        yield from range(6)
+    def odd_only(n):
+        return n if n % 2 else None
+    def twice(n):
+        yield n
+        yield n
+    Pipeline(stage(source), stage(odd_only), stage(twice), stage(collect)).run(timeout=10)
+    assert sorted(items) == [1, 1, 3, 3, 5, 5]
+
+
+def test_full_queue_blocks_the_upstream_stage():
+    items, collect = collector()
+    def slow(item):
+        time.sleep(0.01)
+        collect(item)
+    pipeline = Pipeline(stage(lambda n: n, name="fast"), stage(slow, queue_size=2)).run(range(20), timeout=10)
+    stats = pipeline.stats()
+    assert sorted(items) == list(range(20))
+    assert stats["stages"]["fast"]["blocked_seconds"] > 0.05
+    assert stats["bottleneck"] == "slow"
+
+
+def test_failed_items_are_skipped_or_abort_the_pipeline():
+    items, collect = collector()
+    def fragile(n):
+        if n == 3:
+            raise ValueError(n)
+        return n
+    skipped = Pipeline(stage(fragile), stage(collect)).run(range(6), timeout=10)
+    assert sorted(items) == [0, 1, 2, 4, 5]
+    assert skipped.stats()["stages"]["fragile"]["errors"] == 1
+
+    aborted = Pipeline(stage(fragile, on_error="abort"), stage(collect)).run(range(1000), timeout=10)
+    assert aborted.is_aborted
+
+
+def test_async_and_process_stages():
+    items, collect = collector()
+    async def fetch(n):
+        await asyncio.sleep(0.01)
+        return n
+    Pipeline(
+        stage(fetch, workers=8, kind="async"),
+        stage(square, workers=2, kind="process"),
+        stage(collect)
+    ).run(range(16), timeout=20)
+    assert sorted(items) == [n * n for n in range(16)]
+
+
+def test_abort_stops_an_endless_source():
+    def endless():
+        n = 0
+        while True:
+            n += 1
+            yield n
+    pipeline = Pipeline(stage(endless), stage(lambda n: time.sleep(0.01))).start()
+    time.sleep(0.1)
+    pipeline.abort()
+    assert pipeline.wait(timeout=5)
+    assert pipeline.finished and pipeline.is_aborted
+    with pytest.raises(AssertionError):
+        pipeline.start()
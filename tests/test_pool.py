@@ -0,0 +1,112 @@
+import time
+import threading
+
+import pytest
+
+from worker import worker, ThreadWorkerManager
+from worker.pool import ThreadPool
+
+
+def settle(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def busy_pool(size):
+    pool = ThreadPool("test-resize", size)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+    def task():
+        started.release()
+        release.wait()
+    for _ in range(size):
+        pool.submit(task)
+    for _ in range(size):
+        assert started.acquire(timeout=5)
+    return pool, release
+
+
+def test_resize_down_twice_while_busy():
+    pool, release = busy_pool(4)
+    pool.resize(3)
+    pool.resize(2)
+    release.set()
+    assert settle(lambda: pool.size == 2)
+    time.sleep(0.1)
+    assert pool.size == 2 and pool.max_workers == 2
+    pool.shutdown()
+
+
+def test_resize_up_after_a_pending_shrink():
+    # the stopped threads leave while the next tasks are submitted, repeat to hit that window
+    for _ in range(100):
+        pool, release = busy_pool(4)
+        pool.resize(2)
+        pool.resize(4)
+        release.set()
+        # the pool still runs 4 tasks at once
+        barrier = threading.Barrier(4, timeout=2)
+        done = threading.Semaphore(0)
+        def task():
+            barrier.wait()
+            done.release()
+        for _ in range(4):
+            pool.submit(task)
+        for _ in range(4):
+            assert done.acquire(timeout=5)
+        assert settle(lambda: pool.size == 4)
+        pool.shutdown()
+
+
+def test_blocking_tasks_start_max_workers_threads():
+    # every submitted task must get a thread while the earlier ones are still picking theirs
+    for _ in range(100):
+        pool, release = busy_pool(4)
+        release.set()
+        pool.shutdown()
+
+
+@worker(pool="test-reuse", max_workers=2)
+def thread_name(delay=0):
+    time.sleep(delay)
+    return threading.current_thread().name
+
+
+def test_pooled_workers_reuse_at_most_max_workers_threads():
+    workers = [thread_name(0.01) for _ in range(20)]
+    names = {w.await_worker(5) for w in workers}
+    assert 1 <= len(names) <= 2
+    assert all(name.startswith("test-reuse-") for name in names)
+    assert ThreadWorkerManager.list_pools()["test-reuse"]["max_workers"] == 2
+
+
+def test_queued_pooled_worker_is_aborted_before_it_starts():
+    busy = [thread_name(0.3) for _ in range(2)]
+    queued = thread_name()
+    queued.abort()
+    assert queued.is_aborted
+    assert [w.await_worker(5).startswith("test-reuse-") for w in busy] == [True, True]
+    assert queued.ret is None
+
+
+def test_task_error_keeps_the_pool_thread():
+    pool = ThreadPool("test-errors", 1)
+    done = threading.Event()
+    def fail():
+        raise ValueError("boom")
+    pool.submit(fail)
+    pool.submit(done.set)
+    assert done.wait(5)
+    assert pool.size == 1
+    pool.shutdown()
+
+
+def test_shutdown_pool_rejects_new_tasks():
+    pool = ThreadWorkerManager.get_pool("test-shutdown", 1)
+    ThreadWorkerManager.shutdown_pool("test-shutdown")
+    assert "test-shutdown" not in ThreadWorkerManager.list_pools()
+    assert pool.size == 0
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
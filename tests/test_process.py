@@ -0,0 +1,109 @@
+import os
+import sys
+import asyncio
+import time
+import subprocess
+
+from worker import process, async_process, ProcessKilled
+from worker.process import PooledProcessConnector
+
+
+@process(pool_size=1)
+def pid(delay=0):
+    time.sleep(delay)
+    return os.getpid()
+
+
+@process(pool_size=1, max_tasks_per_child=2)
+def recycled_pid():
+    return os.getpid()
+
+
+def test_pool_reuses_its_child():
+    first = pid().receive()
+    assert pid().receive() == first
+
+
+def test_pool_recycles_the_child_after_max_tasks():
+    pids = [recycled_pid().receive() for _ in range(4)]
+    assert pids[0] == pids[1] and pids[2] == pids[3]
+    assert pids[1] != pids[2]
+
+
+def test_killed_task_is_replaced_by_a_fresh_child():
+    running = pid(10)
+    time.sleep(0.3)
+    running.kill()
+    assert running.wait(5)
+    assert isinstance(running.error, ProcessKilled)
+    assert pid().receive() != running.pid
+
+
+def test_kill_after_the_task_left_the_child_spares_the_next_task():
+    done = pid()
+    done.receive()
+    running = pid(0.5)
+    time.sleep(0.2)
+    # the state a kill races with: the task left the child but is not marked finished yet
+    stale = PooledProcessConnector(pid.__wrapped__, pid.pool)
+    stale.slot = stale_slot = pid.pool.slots[0]
+    stale.proc = stale_slot.proc
+    stale.kill()
+    done.kill()
+    assert running.wait(5)
+    assert running.error is None
+    assert running.result == running.pid
+
+
+@process(pool_size=1)
+def fail(message):
+    raise ValueError(message)
+
+
+@async_process(pool_size=1)
+async def async_pid():
+    return os.getpid()
+
+
+def test_pool_child_error_is_set_on_the_connector():
+    c = fail("boom")
+    assert c.wait(5)
+    assert isinstance(c.error, ValueError) and "boom" in str(c.error)
+    # the child survives a raised error
+    assert pid().receive() == pid().receive()
+
+
+def test_async_pool_is_awaitable():
+    async def main():
+        return [await (await async_pid()) for _ in range(2)]
+    first, second = asyncio.run(main())
+    assert first == second != os.getpid()
+
+
+def test_child_killed_while_idle_is_replaced():
+    before = pid().receive()
+    pid.pool.slots[0].proc.kill()
+    pid.pool.slots[0].proc.join()
+    after = pid()
+    assert after.wait(5)
+    assert after.error is None and after.result != before
+
+
+def test_every_pool_of_a_function_is_shut_down_at_exit(tmp_path):
+    script = tmp_path / "two_pools.py"
+    script.write_text(
+        "from worker import process\n"
+        "def square(x):\n"
+        "    return x * x\n"
+        "if __name__ == '__main__':\n"
+        "    a = process(square, pool_size=1)\n"
+        "    b = process(square, pool_size=1)\n"
+        "    print(a(2).receive(), b(3).receive())\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, str(script)], cwd=root, capture_output=True, text=True, timeout=30,
+        env=dict(os.environ, PYTHONPATH=root)
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["4", "9"]
@@ -0,0 +1,54 @@
+import time
+
+from worker import worker, ThreadWorkerManager
+from worker.registry import WorkerRegistry
+
+
+class Item():
+    pass
+
+
+def test_registry_moves_finished_workers_into_a_bounded_history():
+    registry = WorkerRegistry(history_size=2)
+    items = [Item() for _ in range(4)]
+    for i, item in enumerate(items):
+        registry[f"w{i}"] = item
+    for i, item in enumerate(items[:3]):
+        registry.finish(f"w{i}", item)
+    assert registry.active() == [items[3]]
+    assert registry.history_count == 2
+    assert "w0" not in registry
+    assert list(registry) == ["w1", "w2", "w3"]
+
+
+def test_registry_finish_ignores_a_replaced_worker():
+    registry = WorkerRegistry()
+    old, new = Item(), Item()
+    registry["w"] = old
+    registry["w"] = new
+    registry.finish("w", old)
+    assert registry.active() == [new]
+
+
+def test_registry_register_suffixes_a_taken_name():
+    registry = WorkerRegistry()
+    registry["w"] = Item()
+    assert registry.register("w", Item(), 7) == "w7"
+    assert len(registry) == 2
+
+
+def test_manager_prunes_finished_workers():
+    @worker("pruned")
+    def noop():
+        return None
+
+    try:
+        ThreadWorkerManager.set_history_size(3)
+        workers = [noop() for _ in range(10)]
+        for w in workers:
+            w.await_worker()
+        time.sleep(0.05)
+        assert ThreadWorkerManager.allWorkers.history_count <= 3
+        assert not any(w in ThreadWorkerManager.active_workers() for w in workers)
+    finally:
+        ThreadWorkerManager.set_history_size(1000)
@@ -0,0 +1,62 @@
+import time
+import queue
+import threading
+
+import pytest
+
+from worker import worker
+from worker.scheduler import PriorityTaskQueue
+
+
+def drain(tasks):
+    items = []
+    while tasks:
+        items.append(tasks.get_nowait())
+    return items
+
+
+def test_higher_priority_first_and_fifo_within_a_priority():
+    tasks = PriorityTaskQueue(aging_rate=0)
+    for item, priority in [("a", 0), ("b", 5), ("c", 0), ("d", 5), ("e", float("inf"))]:
+        tasks.put(item, priority)
+    assert drain(tasks) == ["e", "b", "d", "a", "c"]
+
+
+def test_queued_items_age_into_a_higher_priority():
+    tasks = PriorityTaskQueue(aging_rate=100)
+    tasks.put("old", 0)
+    time.sleep(0.05)
+    tasks.put("new", 1)
+    assert drain(tasks) == ["old", "new"]
+
+
+def test_remove_and_pop_oldest():
+    tasks = PriorityTaskQueue()
+    for item, priority in [("a", 0), ("b", 9), ("c", 5)]:
+        tasks.put(item, priority)
+    assert tasks.pop_oldest() == "a"
+    assert tasks.remove("c") and not tasks.remove("c")
+    assert drain(tasks) == ["b"]
+    with pytest.raises(queue.Empty):
+        tasks.get(timeout=0.01)
+
+
+def test_pool_runs_the_queued_workers_by_priority():
+    order = []
+    started = threading.Event()
+    release = threading.Event()
+
+    @worker("test-priority", pool="test-priority", max_workers=1)
+    def task(name):
+        if name == "blocker":
+            started.set()
+            release.wait(5)
+        order.append(name)
+
+    blocker = task("blocker")
+    assert started.wait(5)
+    workers = [task("low"), task("high", _priority=10), task("mid", _priority=5)]
+    release.set()
+    for w in [blocker] + workers:
+        w.await_worker(5)
+    assert order == ["blocker", "high", "mid", "low"]
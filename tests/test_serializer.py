@@ -0,0 +1,71 @@
+import json
+import array
+import pickle
+from dataclasses import dataclass
+
+import pytest
+
+from worker import process
+from worker.serializer import (
+    CodecSerializer, JSONSerializer, PickleSerializer, get_serializer
+)
+
+
+@dataclass
+class Point():
+    x: int
+    y: int
+
+
+@process
+def move(point, dx):
+    return Point(point.x + dx, point.y)
+
+
+@process(pool_size=1, serializer="json")
+def json_keys(mapping):
+    return sorted(mapping)
+
+
+@process(serializer=json)
+def json_echo(value):
+    return value
+
+
+def test_get_serializer_resolves_the_option():
+    assert isinstance(get_serializer(None), PickleSerializer)
+    assert isinstance(get_serializer("json"), JSONSerializer)
+    assert isinstance(get_serializer(json), CodecSerializer)
+    serializer = PickleSerializer()
+    assert get_serializer(serializer) is serializer
+    with pytest.raises(AssertionError):
+        get_serializer("yaml")
+
+
+def test_pickle_sends_large_buffers_out_of_band():
+    serializer = PickleSerializer()
+    values = array.array("d", range(1024))
+    payload = {"buffer": pickle.PickleBuffer(b"x" * 4096), "values": values, "small": b"y"}
+    data, buffers = serializer.dumps(payload, oob_threshold=1024)
+    assert len(buffers) == 2
+    assert len(data) < 1024
+    loaded = serializer.loads(data, [bytearray(b) for b in buffers])
+    assert bytes(loaded["buffer"]) == b"x" * 4096
+    assert loaded["values"] == values and loaded["small"] == b"y"
+
+
+def test_process_returns_any_picklable_result():
+    assert move(Point(1, 2), 3).receive() == Point(4, 2)
+
+
+def test_json_serializers_in_the_children():
+    assert json_keys({"b": 1, "a": 2}).receive() == ["a", "b"]
+    assert json_echo([1, "two", None]).receive() == [1, "two", None]
+
+
+def test_msgpack_serializer():
+    msgpack = pytest.importorskip("msgpack")
+    serializer = get_serializer("msgpack")
+    data, buffers = serializer.dumps({"a": [1, b"2"]})
+    assert buffers == [] and msgpack.unpackb(data) == {"a": [1, b"2"]}
+    assert pickle.loads(pickle.dumps(serializer)).loads(data, []) == {"a": [1, b"2"]}
@@ -0,0 +1,81 @@
+import array
+import threading
+import multiprocessing
+
+from worker import process, PickleSerializer, SharedMemoryTransport
+from worker.serializer import send_payload, recv_payload
+
+
+MB = 1 << 20
+
+
+class CountingTransport(SharedMemoryTransport):
+    """
+    Count the segments created by this process
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.segments = 0
+
+    def put(self, buffer):
+        self.segments += 1
+        return super().put(buffer)
+
+
+def roundtrip(obj, transport):
+    parent, child = multiprocessing.Pipe()
+    segments = []
+    # an in-band buffer larger than the pipe blocks the sender until it is received
+    sender = threading.Thread(target=lambda: segments.extend(send_payload(parent, obj, PickleSerializer(), transport)))
+    sender.start()
+    try:
+        return recv_payload(child, PickleSerializer()), segments
+    finally:
+        sender.join()
+        parent.close()
+        child.close()
+
+
+def test_large_buffers_go_through_shared_memory():
+    payloads = [
+        bytes(2 * MB),
+        bytearray(2 * MB),
+        array.array("d", range(MB // 8 * 2)),
+        memoryview(bytearray(2 * MB)),
+    ]
+    for payload in payloads:
+        transport = CountingTransport(MB)
+        result, segments = roundtrip(("call", (payload,), {}), transport)
+        assert transport.segments == len(segments) == 1, type(payload)
+        assert type(result[1][0]) is type(payload)
+        assert bytes(result[1][0]) == bytes(payload)
+
+
+def test_nested_bytes_go_through_shared_memory():
+    transport = CountingTransport(MB)
+    payload = {"a": [bytes(2 * MB), b"small"], "b": (bytearray(2 * MB),)}
+    result, segments = roundtrip(payload, transport)
+    assert transport.segments == 2
+    assert result == payload
+
+
+def test_small_buffers_stay_in_the_pipe():
+    transport = CountingTransport(MB)
+    result, segments = roundtrip((b"x" * 100, bytearray(100)), transport)
+    assert transport.segments == 0 and segments == []
+    assert result == (b"x" * 100, bytearray(100))
+
+
+shm = CountingTransport(MB)
+
+
+@process(pool_size=1, shared_memory=shm)
+def size_of(data):
+    return type(data).__name__, len(data)
+
+
+def test_process_pool_sends_bytes_and_bytearray_through_shared_memory():
+    before = shm.segments
+    assert size_of(bytes(8 * MB)).receive() == ("bytes", 8 * MB)
+    assert size_of(bytearray(8 * MB)).receive() == ("bytearray", 8 * MB)
+    assert shm.segments - before == 2
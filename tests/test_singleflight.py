@@ -0,0 +1,115 @@
+import time
+import asyncio
+import threading
+
+from worker import worker
+from worker.singleflight import SingleFlight
+
+
+class Handle():
+    def __init__(self, value):
+        self.value = value
+        self.callbacks = []
+
+    def add_done_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def done(self):
+        for callback in self.callbacks:
+            callback(self)
+
+
+def run_in_thread(coro_function, timeout=5):
+    result = {}
+    def target():
+        result["value"] = asyncio.run(coro_function())
+    th = threading.Thread(target=target, daemon=True)
+    th.start()
+    th.join(timeout)
+    assert not th.is_alive(), "the event loop was blocked"
+    return result["value"]
+
+
+def test_sync_callers_share_the_handle():
+    group = SingleFlight("sync")
+    calls = []
+    def run(x):
+        calls.append(x)
+        return Handle(x)
+    call = group.wrap(run)
+    first = call(1)
+    assert call(1) is first
+    assert call(2) is not first
+    assert calls == [1, 2]
+    assert group.info()["shared"] == 1
+    first.done()
+    assert call(1) is not first
+
+
+def test_async_follower_does_not_block_the_loop():
+    group = SingleFlight("async")
+    calls = []
+
+    async def run(x):
+        calls.append(x)
+        await asyncio.sleep(0.2)
+        return Handle(x)
+    call = group.wrap(run)
+
+    async def main():
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        task = asyncio.ensure_future(ticker())
+        leader = asyncio.ensure_future(call(1))
+        await asyncio.sleep(0.01)
+        follower = await call(1)
+        task.cancel()
+        return await leader, follower, ticks
+
+    leader, follower, ticks = run_in_thread(main)
+    assert leader is follower
+    assert calls == [1]
+    assert ticks > 5
+
+
+def test_async_follower_gets_the_leader_error():
+    group = SingleFlight("error")
+
+    async def run(x):
+        await asyncio.sleep(0.05)
+        raise ValueError(x)
+    call = group.wrap(run)
+
+    async def main():
+        leader = asyncio.ensure_future(call(1))
+        await asyncio.sleep(0.01)
+        results = await asyncio.gather(leader, call(1), return_exceptions=True)
+        return results
+
+    results = run_in_thread(main)
+    assert [type(e) for e in results] == [ValueError, ValueError]
+    assert len(group) == 0
+
+
+def test_worker_calls_share_the_running_worker():
+    release = threading.Event()
+
+    @worker("test-singleflight", singleflight=True)
+    def load(key):
+        release.wait(5)
+        return key
+
+    a, b, other = load(1), load(1), load(2)
+    assert a is b and a is not other
+    release.set()
+    assert a.await_worker(5) == 1 and other.await_worker(5) == 2
+    # the flight is dropped by the done callback, right after the waiters are woken up
+    deadline = time.monotonic() + 5
+    while len(load.singleflight) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert load.singleflight.info()["in_flight"] == 0
+    assert load(1) is not a
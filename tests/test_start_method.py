@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+from worker import process
+from worker.process import ProcessConnector
+
+
+@process(pool_size=1, start_method="spawn")
+def spawned_pid():
+    return os.getpid()
+
+
+@process(pool_size=1, start_method="fork", preload=["colorsys"])
+def preloaded():
+    return "colorsys" in sys.modules
+
+
+def test_spawned_children_import_the_function_by_name():
+    first = spawned_pid().receive()
+    assert first != os.getpid()
+    assert spawned_pid().receive() == first
+    assert spawned_pid.pool.context.get_start_method() == "spawn"
+
+
+def test_local_function_is_rejected_without_fork():
+    with pytest.raises(AssertionError):
+        @process(start_method="spawn")
+        def local():
+            return None
+
+
+def test_fork_preload_imports_in_the_parent():
+    assert "colorsys" in sys.modules
+    assert preloaded().receive() is True
+
+
+def test_forkserver_preload_is_shared():
+    context = ProcessConnector.get_context("forkserver", ["json"])
+    ProcessConnector.get_context("forkserver", ["json", "csv"])
+    assert context.get_start_method() == "forkserver"
+    assert ProcessConnector.forkserver_preload.count("json") == 1
+    assert "csv" in ProcessConnector.forkserver_preload
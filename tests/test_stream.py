@@ -0,0 +1,79 @@
+import time
+import asyncio
+
+from worker import worker, process, ThreadWorkerManager, ResultStream
+
+
+STREAM_SIZE = ThreadWorkerManager.stream_size
+
+
+@worker("numbers")
+def numbers(n):
+    for i in range(n):
+        yield i
+
+
+@process(pool_size=1)
+def pooled_numbers(n):
+    for i in range(n):
+        yield i
+
+
+def wait_finished(w, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not w.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return w.finished
+
+
+def test_stream_items_in_order():
+    assert list(numbers(200)) == list(range(200))
+
+
+def test_stream_late_consumer_keeps_a_full_queue():
+    w = numbers(STREAM_SIZE)
+    assert wait_finished(w)
+    assert list(w) == list(range(STREAM_SIZE))
+
+
+def test_stream_late_async_consumer_keeps_a_full_queue():
+    w = numbers(STREAM_SIZE)
+    assert wait_finished(w)
+
+    async def consume():
+        return [item async for item in w]
+
+    assert asyncio.run(consume()) == list(range(STREAM_SIZE))
+
+
+def test_pooled_process_stream_late_consumer_keeps_a_full_queue():
+    pc = pooled_numbers(STREAM_SIZE)
+    assert pc.wait(timeout=10)
+    assert list(pc) == list(range(STREAM_SIZE))
+
+
+def test_closed_stream_wakes_a_waiting_consumer():
+    stream = ResultStream(4)
+    stream.put(1)
+    stream.close()
+    assert list(stream) == [1]
+    # a second consumer sees the end too
+    assert list(stream) == []
+
+
+def test_cancelled_async_consumer_leaves_the_next_item():
+    stream = ResultStream(4)
+
+    async def main():
+        async def first():
+            return [item async for item in stream]
+        task = asyncio.ensure_future(first())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        stream.put(1)
+        await asyncio.sleep(0.05)
+        stream.close()
+        return [item async for item in stream]
+
+    assert asyncio.run(main()) == [1]
@@ -0,0 +1,72 @@
+import time
+import threading
+
+import pytest
+
+from worker import worker, process, WorkerTimeout
+from worker.timer import DeadlineTimer, pop_timeout
+
+
+# a stopped thread ends with the asynchronous SystemExit, which pytest reports as unhandled
+pytestmark = pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+
+
+def wait_finished(w, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not w.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return w.finished
+
+
+@worker("test-timeout", timeout=0.1)
+def sleepy(seconds):
+    for _ in range(int(seconds * 100)):
+        time.sleep(0.01)
+    return seconds
+
+
+@process(pool_size=1, timeout=0.2)
+def child_sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_timer_expires_in_deadline_order_and_skips_cancelled():
+    timer = DeadlineTimer("test-timer")
+    fired = []
+    done = threading.Event()
+    timer.schedule(0.06, lambda: fired.append("late"))
+    timer.schedule(0.02, lambda: fired.append("early"))
+    timer.schedule(0.04, lambda: fired.append("cancelled")).cancel()
+    timer.schedule(0.08, done.set)
+    assert done.wait(5)
+    assert fired == ["early", "late"]
+    assert len(timer) == 0 and timer.info()["expired"] == 3
+
+
+def test_pop_timeout_takes_the_earliest_option():
+    kwargs = {"_timeout": 5, "_deadline": time.time() + 1, "x": 1}
+    assert 0 < pop_timeout(kwargs, timeout=10) <= 1
+    assert kwargs == {"x": 1}
+    assert pop_timeout({}, timeout=3) == 3
+    assert pop_timeout({}) is None
+
+
+def test_worker_is_stopped_at_its_timeout():
+    w = sleepy(5)
+    assert wait_finished(w, 3)
+    assert w.is_timed_out and isinstance(w.error, WorkerTimeout)
+    assert w.ret is None
+
+
+def test_per_call_timeout_overrides_the_decorator():
+    assert sleepy(0.2, _timeout=5).await_worker(5) == 0.2
+    w = sleepy(5, _deadline=time.time() + 0.05)
+    assert wait_finished(w, 3) and w.is_timed_out
+
+
+def test_pooled_process_is_killed_at_its_timeout_and_replaced():
+    c = child_sleep(5)
+    assert c.wait(5)
+    assert c.is_timed_out and isinstance(c.error, WorkerTimeout)
+    assert child_sleep(0).receive() == 0
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from worker import worker, ThreadWorkerManager
+
+
+@worker("sleep")
+def sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_wait_timeout_returns_false_while_running():
+    w = sleep(0.5)
+    assert w.wait(timeout=0.05) is False
+    assert ThreadWorkerManager.wait(w, timeout=0.05) is False
+    assert w.await_worker() == 0.5
+
+
+def test_wait_wakes_up_when_the_worker_finishes():
+    w = sleep(0.1)
+    start = time.monotonic()
+    assert w.wait(timeout=5)
+    assert time.monotonic() - start < 1
+
+
+def test_wait_any_returns_the_first_finished_worker():
+    slow, fast = sleep(0.5), sleep(0.05)
+    assert ThreadWorkerManager.wait_any(slow, fast, timeout=5) is fast
+    assert ThreadWorkerManager.wait_any(sleep(1), timeout=0.05) is None
+
+
+def test_as_completed_yields_in_completion_order():
+    workers = [sleep(0.3), sleep(0.1), sleep(0.2)]
+    assert [w.ret for w in ThreadWorkerManager.as_completed(*workers, timeout=5)] == [0.1, 0.2, 0.3]
+
+
+def test_as_completed_raises_on_timeout():
+    with pytest.raises(TimeoutError):
+        list(ThreadWorkerManager.as_completed(sleep(0.01), sleep(1), timeout=0.2))
+
+
+def test_done_callback_of_a_finished_worker_runs_at_once():
+    w = sleep(0)
+    w.await_worker()
+    called = []
+    w.add_done_callback(called.append)
+    assert called == [w]
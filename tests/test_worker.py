@@ -0,0 +1,40 @@
+import time
+import functools
+
+from worker import worker, ThreadWorker
+
+
+runs = []
+
+
+@worker("test-compact")
+def record(a, b=0):
+    runs.append((a, b))
+    return a + b
+
+
+def test_worker_is_a_slotted_task_object():
+    w = record(1, b=2)
+    w.await_worker(5)
+    assert not hasattr(w, "__dict__")
+    assert (w.rawfunc.__name__, w.args, w.kwargs) == ("record", (1,), {"b": 2})
+    assert isinstance(w.func, functools.partial) and w.func() == 3
+
+
+def test_restart_reruns_with_the_same_arguments():
+    runs.clear()
+    w = record(4, b=5)
+    w.await_worker(5)
+    w.restart()
+    deadline = time.monotonic() + 5
+    while len(runs) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert runs == [(4, 5), (4, 5)]
+    assert w.await_worker(5) == 9
+
+
+def test_worker_called_again_runs_new_arguments():
+    w = ThreadWorker(lambda n: n * 2, "test-call")
+    assert w(7).await_worker(5) == 14
+    assert w.args == (7,)
+    assert w(8).await_worker(5) == 16
@@ -1,4 +1,67 @@
+import sys
+import types
+import importlib
+from typing import overload
+
 from .worker import *
+from .cache import CachedResult
+from .gate import WorkerQueueFull
+from .cancel import get_token
+from .batch import BatchItem
+from .pipeline import Pipeline, Stage, stage
+
+if TYPE_CHECKING:
+    from .process import ProcessConnector, PooledProcessConnector, ProcessPool, ProcessKilled
+    from .serializer import Serializer, PickleSerializer, JSONSerializer, MsgpackSerializer, CodecSerializer
+    from .shared_memory import SharedMemoryTransport
+    from .loop import EventLoopThread
+    from .actor import actor, ActorClass, ActorRef, ActorPool
+
+# the process backend (multiprocessing, serializers, shared memory) and the event loop threads are
+# imported on first use, a program only running thread workers never loads them
+_LAZY_ATTRIBUTES = {
+    "ProcessConnector": ".process",
+    "PooledProcessConnector": ".process",
+    "ProcessPool": ".process",
+    "ProcessKilled": ".process",
+    "Serializer": ".serializer",
+    "PickleSerializer": ".serializer",
+    "JSONSerializer": ".serializer",
+    "MsgpackSerializer": ".serializer",
+    "CodecSerializer": ".serializer",
+    "SharedMemoryTransport": ".shared_memory",
+    "EventLoopThread": ".loop",
+    "actor": ".actor",
+    "ActorClass": ".actor",
+    "ActorRef": ".actor",
+    "ActorPool": ".actor",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name: str, value):
+        # loading the `worker.process` / `worker.actor` submodule binds it on the package,
+        # the `process` and `actor` decorators keep their names
+        if name in ("process", "actor") and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
 
 ### SHORTCUT ###
 run_as_worker = ThreadWorkerManager.run_as_worker
@@ -19,7 +82,20 @@ def worker(
     name: Optional[str] = "",
     on_abort: Optional[FunctionType] = None,
     keyboard_interrupt: Optional[bool] = True,
-    multiproc: bool = False
+    multiproc: bool = False,
+    pool: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    on_full: str = "block",
+    priority: float = 0,
+    cache: Optional[LRU] = None,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    max_latency_ms: float = 10,
+    autoscale: Union[bool, dict, ScalingPolicy, None] = None
 ) -> ThreadedFunction: ...
 
 
@@ -27,7 +103,20 @@ def worker(
 def worker(
     on_abort: Optional[FunctionType] = None,
     keyboard_interrupt: Optional[bool] = True,
-    multiproc: bool = False
+    multiproc: bool = False,
+    pool: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    on_full: str = "block",
+    priority: float = 0,
+    cache: Optional[LRU] = None,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    max_latency_ms: float = 10,
+    autoscale: Union[bool, dict, ScalingPolicy, None] = None
 ) -> ThreadedFunction: ...
 
 
@@ -37,6 +126,19 @@ def worker(
     on_abort: Optional[FunctionType] = None,
     keyboard_interrupt: Optional[bool] = True,
     multiproc: bool = False,
+    pool: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    on_full: str = "block",
+    priority: float = 0,
+    cache: Optional[LRU] = None,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    max_latency_ms: float = 10,
+    autoscale: Union[bool, dict, ScalingPolicy, None] = None,
     **kargs
 ):
     """
@@ -48,17 +150,52 @@ def worker(
     - @worker("cool")
     - @worker(name="looping backapp", keyboard_interrupt=True)
     - @worker(keyboard_interrupt=True, on_abort: lambda: print("its over"))
+    - @worker(pool="io", max_workers=8)
+    - @worker("ingest", max_concurrency=8, queue_size=1000, on_full="reject")
+    - @worker(pool="io", priority=10), or per call `fetch(url, _priority=10)`
+    - @worker("lookup", cache=LRU(maxsize=1024, ttl=60))
+    - @worker("lookup", singleflight=True)
+    - @worker("fetch", timeout=30), or per call `fetch(url, _timeout=5)` / `fetch(url, _deadline=time.time() + 5)`
+    - @worker("insert", batch_size=100, max_latency_ms=20), the function gets a list and returns one result per item
+    - @worker(pool="io", autoscale=dict(min_size=2, max_size=64, target_queue_wait=0.1))
     """
     if multiproc:
         return process
 
+    if pool:
+        kargs.update(pool=pool, max_workers=max_workers)
+
+    if autoscale:
+        kargs.update(autoscale=autoscale)
+
+    if max_concurrency:
+        kargs.update(max_concurrency=max_concurrency, queue_size=queue_size, on_full=on_full)
+
+    if priority:
+        kargs.update(priority=priority)
+
+    if cache is not None:
+        kargs.update(cache=cache)
+
+    if singleflight:
+        kargs.update(singleflight=singleflight)
+
+    if timeout is not None or deadline is not None:
+        kargs.update(timeout=timeout, deadline=deadline)
+
+    if batch_size:
+        kargs.update(batch_size=batch_size, max_latency_ms=max_latency_ms)
+
     if args:
         if type(args[0]) == FunctionType:
-            assert not inspect.iscoroutinefunction(args[0]), "please use `async_worker` instead for coroutine function"
+            assert not is_async_function(args[0]), "please use `async_worker` instead for coroutine function"
             def register(*dargs,**dkargs):
-                w = ThreadWorker(lambda: args[0](*dargs,**dkargs), name, on_abort, keyboard_interrupt)
+                dkargs.pop("_priority", None)
+                call_timeout = pop_timeout(dkargs)
+                w = ThreadWorker(args[0], name, on_abort, keyboard_interrupt, timeout=call_timeout, args=dargs, kwargs=dkargs)
                 w.work()
                 return w
+            ThreadWorkerManager._bind_map(register, args[0], name, on_abort, keyboard_interrupt)
             return register
         elif type(args[0]) == str:
             name = args[0]
@@ -74,13 +211,21 @@ def async_worker(function: FunctionType) -> AsyncThreadedFunction: ...
 def async_worker(
     name: Optional[str] = "",
     on_abort: Optional[FunctionType] = None,
-    keyboard_interrupt: Optional[bool] = True
+    keyboard_interrupt: Optional[bool] = True,
+    shared_loop: bool = False,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None
 ) -> AsyncThreadedFunction: ...
 
 @overload
 def async_worker(
     on_abort: Optional[FunctionType] = None,
-    keyboard_interrupt: Optional[bool] = True
+    keyboard_interrupt: Optional[bool] = True,
+    shared_loop: bool = False,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None
 ) -> AsyncThreadedFunction: ...
 
 def async_worker(
@@ -88,6 +233,10 @@ def async_worker(
     name: Optional[str] = "",
     on_abort: Optional[FunctionType] = None,
     keyboard_interrupt: Optional[bool] = True,
+    shared_loop: bool = False,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
     **kargs
 ):
     """
@@ -101,14 +250,25 @@ def async_worker(
     - @async_worker("cool")
     - @async_worker(name="looping backapp", keyboard_interrupt=True)
     - @async_worker(keyboard_interrupt=True, on_abort: lambda: print("its over"))
+    - @async_worker(shared_loop=True)
+    - @async_worker("fetch", singleflight=True)
+    - @async_worker("fetch", timeout=30), or per call `await fetch(url, _timeout=5)`
     """
+    if shared_loop:
+        kargs.update(shared_loop=shared_loop)
+
+    if singleflight:
+        kargs.update(singleflight=singleflight)
+
+    if timeout is not None or deadline is not None:
+        kargs.update(timeout=timeout, deadline=deadline)
+
     if args:
         if type(args[0]) == FunctionType:
-            assert inspect.iscoroutinefunction(args[0]), "please use `worker` instead for non-coroutine function"
+            assert is_async_function(args[0]), "please use `worker` instead for non-coroutine function"
             async def register(*dargs,**dkargs):
-                async def worker_func():
-                    return await args[0](*dargs,**dkargs)
-                w = ThreadWorker(worker_func, name, on_abort, keyboard_interrupt)
+                call_timeout = pop_timeout(dkargs)
+                w = ThreadWorker(args[0], name, on_abort, keyboard_interrupt, timeout=call_timeout, args=dargs, kwargs=dkargs)
                 w.work()
                 return w
             return register
@@ -119,17 +279,88 @@ def async_worker(
         return ThreadWorkerManager.create_async_worker(name, on_abort=on_abort, keyboard_interrupt=keyboard_interrupt, **kargs)
 
 
-from .process import *
-
-def process(function: FunctionType):
+def process(
+    function: Optional[FunctionType] = None,
+    pool_size: Optional[int] = None,
+    max_tasks_per_child: Optional[int] = None,
+    serializer: Optional[Union[str, "Serializer"]] = None,
+    shared_memory: Optional[Union[bool, int, "SharedMemoryTransport"]] = None,
+    priority: float = 0,
+    cache: Optional[LRU] = None,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    start_method: Optional[str] = None,
+    preload: Optional[list] = None,
+    batch_size: Optional[int] = None,
+    max_latency_ms: float = 10,
+    autoscale: Union[bool, dict, "ScalingPolicy", None] = None
+):
     """
     Create a process worker. This function will run your function in a separate GIL
+
+    Usage Example:
+    - @process
+    - @process(pool_size=4, max_tasks_per_child=100)
+    - @process(serializer="msgpack")
+    - @process(shared_memory=True)
+    - @process(pool_size=4, priority=10), or per call `go(n, _priority=10)`
+    - @process(pool_size=4, cache=LRU(maxsize=1024, directory=".cache/go"))
+    - @process(pool_size=4, singleflight=True)
+    - @process(timeout=60), the child is killed (a pooled one is replaced) once the time is up
+    - @process(pool_size=4, start_method="forkserver", preload=["numpy"])
+    - @process(pool_size=4, batch_size=64, max_latency_ms=20), the function gets a list and returns one result per item
+    - @process(pool_size=2, autoscale=dict(min_size=1, max_size=8))
     """
-    return ProcessConnector.create_process(function)
+    from .process import ProcessConnector
+    if function is None:
+        return lambda function: ProcessConnector.create_process(
+            function, pool_size, max_tasks_per_child, serializer, shared_memory, priority, cache, singleflight,
+            timeout, deadline, start_method, preload, batch_size, max_latency_ms, autoscale
+        )
+    return ProcessConnector.create_process(
+        function, pool_size, max_tasks_per_child, serializer, shared_memory, priority, cache, singleflight,
+        timeout, deadline, start_method, preload, batch_size, max_latency_ms, autoscale
+    )
 
 
-def async_process(function: FunctionType):
+def async_process(
+    function: Optional[FunctionType] = None,
+    pool_size: Optional[int] = None,
+    max_tasks_per_child: Optional[int] = None,
+    serializer: Optional[Union[str, "Serializer"]] = None,
+    shared_memory: Optional[Union[bool, int, "SharedMemoryTransport"]] = None,
+    priority: float = 0,
+    cache: Optional[LRU] = None,
+    singleflight: bool = False,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    start_method: Optional[str] = None,
+    preload: Optional[list] = None,
+    autoscale: Union[bool, dict, "ScalingPolicy", None] = None
+):
     """
     Create an async process worker. This function will run your function in a separate GIL
+
+    Usage Example:
+    - @async_process
+    - @async_process(pool_size=4, max_tasks_per_child=100)
+    - @async_process(serializer="msgpack")
+    - @async_process(shared_memory=True)
+    - @async_process(pool_size=4, priority=10), or per call `go(n, _priority=10)`
+    - @async_process(pool_size=4, cache=LRU(maxsize=1024, ttl=600))
+    - @async_process(pool_size=4, singleflight=True)
+    - @async_process(timeout=60), the child is killed (a pooled one is replaced) once the time is up
+    - @async_process(pool_size=4, start_method="forkserver", preload=["numpy"])
+    - @async_process(pool_size=2, autoscale=True)
     """
-    return ProcessConnector.create_process(function)
+    from .process import ProcessConnector
+    if function is None:
+        return lambda function: ProcessConnector.create_process(
+            function, pool_size, max_tasks_per_child, serializer, shared_memory, priority, cache, singleflight,
+            timeout, deadline, start_method, preload, autoscale=autoscale
+        )
+    return ProcessConnector.create_process(
+        function, pool_size, max_tasks_per_child, serializer, shared_memory, priority, cache, singleflight,
+        timeout, deadline, start_method, preload, autoscale=autoscale
+    )
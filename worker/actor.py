@@ -0,0 +1,198 @@
+import functools
+import itertools
+from typing import Any, Optional, Union
+
+from .process import ProcessConnector, PooledProcessConnector, ProcessPool
+from .serializer import Serializer, get_serializer
+from .shared_memory import SharedMemoryTransport, get_transport
+from .timer import pop_timeout
+
+
+class ActorClass():
+    """
+    ActorClass class -> actor class
+
+    A class decorated with `@actor`, calling it starts an instance in its own long-lived child process.
+    The instance is created once in the child, so what `__init__` loads stays warm across the calls
+    """
+
+    def __init__(
+        self,
+        cls: type,
+        serializer: Optional[Union[str, Serializer]] = None,
+        shared_memory: Optional[Union[bool, int, SharedMemoryTransport]] = None,
+        timeout: Optional[float] = None,
+        start_method: Optional[str] = None,
+        preload: Optional[list] = None
+    ):
+        assert isinstance(cls, type), "only accept class for actor"
+        functools.update_wrapper(self, cls, updated=())
+
+        # private attributes
+        self.__counter = itertools.count()
+
+        # public attributes
+        self.cls = cls
+        self.serializer = get_serializer(serializer)
+        self.transport = get_transport(shared_memory)
+        self.timeout = timeout
+        self.context = ProcessConnector.get_context(start_method, preload)
+        # fail on the decoration if the children cannot import the class
+        ProcessConnector.child_function(cls, self.context)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> "ActorRef":
+        return ActorRef(self, next(self.__counter), args, kwargs)
+
+
+class ActorRef():
+    """
+    ActorRef class -> actor
+
+    One instance of an actor class living in its own child process. A method call is sent to the child
+    as a message and returns the same handle as a pooled `@process` call (`receive`, `wait`, `await`,
+    `add_done_callback`). The calls run one at a time in the order they are made.
+
+    A killed or crashed child is replaced on the next call and the instance is created again.
+    Use `call(name, ...)` for a method named like one of the `ActorRef` methods
+    """
+
+    def __init__(self, actor_class: ActorClass, index: int, args: tuple, kwargs: dict):
+        pool = ProcessPool(
+            actor_class.cls, 1, None, actor_class.serializer, actor_class.transport, actor_class.context
+        )
+        # the child builds the instance from the class and the constructor arguments
+        pool.target = functools.partial(_create_instance, pool.target, args, kwargs)
+        pool.name = f"{pool.name}-{index}"
+
+        # private attributes
+        self.__pool = pool
+
+        # public attributes
+        self.name = pool.name
+        self.actor_class = actor_class
+        self.timeout = actor_class.timeout
+        ProcessConnector.pools.add(pool)
+        self.ready = self.call(None)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return functools.partial(self.call, name)
+
+    def __repr__(self):
+        return f"<ActorRef {self.name}>"
+
+    @property
+    def is_alive(self) -> bool:
+        slots = self.__pool.slots
+        return not self.__pool.is_shutdown and bool(slots) and slots[0].proc is not None and slots[0].proc.is_alive()
+
+    def info(self) -> dict:
+        return self.__pool.info()
+
+    def call(self, name: Optional[str], *args: Any, **kwargs: Any) -> PooledProcessConnector:
+        """
+        Send a method call to the child, `_timeout` / `_deadline` kill the child once the time is up
+
+        :params name: str -> name of the method, a plain attribute is returned as is
+        """
+        # the calls of an actor keep their order, a priority would reorder them
+        kwargs.pop("_priority", None)
+        timeout = pop_timeout(kwargs, self.timeout)
+        connector = PooledProcessConnector(self.actor_class.cls, self.__pool, timeout=timeout, mode="method")
+        return connector.create_and_run(name, *args, **kwargs)
+
+    def kill(self):
+        """
+        Kill the child, the running call fails with `ProcessKilled` and the next call starts a fresh instance
+        """
+        for slot in self.__pool.slots:
+            slot.kill()
+
+    def stop(self, wait: bool = True):
+        """
+        Stop the child once the queued calls are done
+        """
+        ProcessConnector.pools.discard(self.__pool)
+        self.__pool.shutdown(wait)
+
+
+class ActorPool():
+    """
+    ActorPool class -> pool
+
+    `size` instances of an actor class. The calls are routed by key, so everything the instance caches
+    for a key stays in one child process
+
+    Usage Example:
+    - pool = ActorPool(Model, 4, "weights.bin")
+    - pool.route(user_id).predict(features) or pool[user_id].predict(features)
+    - pool.broadcast("reload")
+
+    :params actor_class: ActorClass -> an `@actor` class, a plain class is decorated with the defaults
+    :params size: int -> number of instances
+    :params args, kwargs -> constructor arguments of every instance
+    """
+
+    def __init__(self, actor_class: Union[ActorClass, type], size: int, *args: Any, **kwargs: Any):
+        assert size > 0, "size must be greater than 0"
+        if not isinstance(actor_class, ActorClass):
+            actor_class = ActorClass(actor_class)
+        self.actor_class = actor_class
+        self.actors = [actor_class(*args, **kwargs) for _ in range(size)]
+
+    def __len__(self):
+        return len(self.actors)
+
+    def __getitem__(self, key: Any) -> ActorRef:
+        return self.route(key)
+
+    def route(self, key: Any) -> ActorRef:
+        """
+        Return the instance owning `key`, the same key always goes to the same instance
+        """
+        return self.actors[hash(key) % len(self.actors)]
+
+    def broadcast(self, name: str, *args: Any, **kwargs: Any) -> list:
+        """
+        Call a method on every instance and return their handles
+        """
+        return [ref.call(name, *args, **kwargs) for ref in self.actors]
+
+    def info(self) -> list:
+        return [ref.info() for ref in self.actors]
+
+    def kill(self):
+        for ref in self.actors:
+            ref.kill()
+
+    def stop(self, wait: bool = True):
+        for ref in self.actors:
+            ref.stop(wait)
+
+
+def _create_instance(cls: type, args: tuple, kwargs: dict) -> Any:
+    return cls(*args, **kwargs)
+
+
+def actor(
+    cls: Optional[type] = None,
+    serializer: Optional[Union[str, Serializer]] = None,
+    shared_memory: Optional[Union[bool, int, SharedMemoryTransport]] = None,
+    timeout: Optional[float] = None,
+    start_method: Optional[str] = None,
+    preload: Optional[list] = None
+):
+    """
+    An actor class decorator.
+    Every instance runs in its own long-lived child process and its method calls are sent to it in order
+
+    Usage Example:
+    - @actor
+    - @actor(serializer="msgpack", shared_memory=True)
+    - @actor(timeout=30), or per call `model.predict(x, _timeout=5)`, the child is killed and replaced
+    - @actor(start_method="forkserver", preload=["torch"])
+    """
+    if cls is None:
+        return lambda cls: ActorClass(cls, serializer, shared_memory, timeout, start_method, preload)
+    return ActorClass(cls, serializer, shared_memory, timeout, start_method, preload)
@@ -0,0 +1,295 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional, Union
+
+from .timer import DeadlineTimer
+
+
+logger = logging.getLogger()
+
+
+class ScalingPolicy():
+    """
+    ScalingPolicy class -> policy
+
+    When an `Autoscaler` grows or shrinks a pool. The pool grows once it was under pressure (queue wait or
+    utilization above the target) for `scale_up_intervals` intervals in a row, and shrinks once it was
+    idle (no queue, utilization below half the target) for `scale_down_intervals` intervals in a row
+
+    :params min_size: int -> minimum threads or children
+    :params max_size: int -> maximum threads or children, default to 32 threads or one child per core
+    :params target_queue_wait: float -> seconds, grow while the tasks wait longer than this to start, None to ignore it
+    :params target_utilization: float -> busy fraction of the pool to aim for
+    :params interval: float -> seconds between two evaluations
+    :params scale_up_intervals: int -> intervals under pressure before growing
+    :params scale_down_intervals: int -> idle intervals before shrinking
+    :params max_cpu: float -> thread pools only, do not grow while this process uses this many cores (GIL bound work).
+        The CPU of the pool children cannot be sampled portably, a process pool is capped by `max_size` and `min_gain`
+    :params min_gain: float -> a growth raising the throughput by less than this fraction is undone
+    :params probe_intervals: int -> intervals the size reached by an undone growth stays the ceiling
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: Optional[int] = None,
+        target_queue_wait: Optional[float] = 0.05,
+        target_utilization: float = 0.8,
+        interval: float = 1.0,
+        scale_up_intervals: int = 2,
+        scale_down_intervals: int = 5,
+        max_cpu: Optional[float] = None,
+        min_gain: float = 0.05,
+        probe_intervals: int = 30
+    ):
+        assert min_size > 0, "min_size must be greater than 0"
+        assert max_size is None or max_size >= min_size, "max_size must not be less than min_size"
+        assert target_queue_wait is None or target_queue_wait >= 0, "target_queue_wait must not be negative"
+        assert 0 < target_utilization <= 1, "target_utilization must be in (0, 1]"
+        assert interval > 0, "interval must be greater than 0"
+        assert scale_up_intervals > 0 and scale_down_intervals > 0, "scale intervals must be greater than 0"
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_queue_wait = target_queue_wait
+        self.target_utilization = target_utilization
+        self.interval = interval
+        self.scale_up_intervals = scale_up_intervals
+        self.scale_down_intervals = scale_down_intervals
+        self.max_cpu = max_cpu
+        self.min_gain = min_gain
+        self.probe_intervals = probe_intervals
+
+    def info(self) -> dict:
+        return dict(vars(self))
+
+
+class Autoscaler():
+    """
+    Autoscaler class -> autoscaler
+
+    Resize a `ThreadPool` or a `ProcessPool` from its measured queue wait, utilization and throughput.
+    It is evaluated every `policy.interval` seconds on the deadline timer thread.
+    Every resize is kept in `decisions` with the measures behind it, `last` is the latest evaluation
+
+    :params pool: ThreadPool | ProcessPool -> pool to resize
+    :params policy: ScalingPolicy -> when to resize it
+    :params timer: DeadlineTimer -> timer running the evaluations
+    :params history_size: int -> number of decisions kept
+    """
+
+    def __init__(self, pool, policy: ScalingPolicy, timer: DeadlineTimer, history_size: int = 100):
+        self.kind = "process" if hasattr(pool, "pool_size") else "thread"
+        assert self.kind == "thread" or policy.max_cpu is None, "max_cpu only applies to thread pools"
+        default_max = (os.cpu_count() or 1) if self.kind == "process" else 32
+
+        # private attributes
+        self.__lock = threading.Lock()
+        self.__next = None
+        self.__ticks = 0
+        self.__high = 0
+        self.__low = 0
+        self.__streak = [0, 0.0]
+        self.__grown_from = None
+        self.__ceiling = None
+        self.__ceiling_until = 0
+
+        # public attributes
+        self.name = pool.name
+        self.pool = pool
+        self.policy = policy
+        self.timer = timer
+        self.min_size = policy.min_size
+        self.max_size = policy.max_size or max(default_max, policy.min_size, self.size)
+        self.decisions = deque(maxlen=history_size)
+        self.last = None
+        self.is_running = False
+        self.__previous = pool.load.sample(time.perf_counter_ns())
+        self.__cpu = self.__process_time()
+
+    @property
+    def size(self) -> int:
+        return self.pool.pool_size if self.kind == "process" else self.pool.max_workers
+
+    @property
+    def ceiling(self) -> Optional[int]:
+        return self.__ceiling
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "size": self.size,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "ceiling": self.__ceiling,
+            "is_running": self.is_running,
+            "last": self.last,
+            "decisions": len(self.decisions)
+        }
+
+    def start(self):
+        """
+        Bring the pool within `min_size` and `max_size`, then evaluate it every interval
+        """
+        with self.__lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            self.__previous = self.pool.load.sample(time.perf_counter_ns())
+            self.__cpu = self.__process_time()
+            size = min(self.max_size, max(self.min_size, self.size))
+            if size != self.size:
+                self.__apply("clamp", size, f"outside [{self.min_size}, {self.max_size}]", {})
+            self.__next = self.timer.schedule(self.policy.interval, self.__tick)
+
+    def stop(self):
+        with self.__lock:
+            self.is_running = False
+            if self.__next is not None:
+                self.__next.cancel()
+                self.__next = None
+
+    def evaluate(self) -> dict:
+        """
+        Measure the pool since the previous evaluation and resize it if the policy says so, return the decision
+        """
+        with self.__lock:
+            measures = self.__measure()
+            action, size, reason = self.__decide(measures)
+            if action == "hold":
+                decision = self.__record(action, size, reason, measures)
+            else:
+                decision = self.__apply(action, size, reason, measures)
+            return decision
+
+    ## Private Executor ---------------------------
+    def __tick(self):
+        if not self.is_running:
+            return
+        if self.pool.is_shutdown:
+            return self.stop()
+        try:
+            self.evaluate()
+        finally:
+            with self.__lock:
+                if self.is_running:
+                    self.__next = self.timer.schedule(self.policy.interval, self.__tick)
+
+    def __process_time(self) -> Optional[float]:
+        """
+        CPU seconds of this process, the threads of a thread pool run in it but the children of a process pool do not
+        """
+        return time.process_time() if self.kind == "thread" else None
+
+    def __measure(self) -> dict:
+        now = time.perf_counter_ns()
+        sample = self.pool.load.sample(now)
+        previous, self.__previous = self.__previous, sample
+        cpu, self.__cpu = self.__cpu, self.__process_time()
+        elapsed = max(1, sample["time_ns"] - previous["time_ns"]) / 1e9
+        started = sample["started"] - previous["started"]
+        queue_wait = (sample["queue_wait_ns"] - previous["queue_wait_ns"]) / started / 1e9 if started else 0.0
+        if sample["queued"]:
+            # the tasks still waiting count too, or a pool too busy to start anything would look idle
+            queue_wait = max(queue_wait, sample["queued_age_ns"] / sample["queued"] / 1e9)
+        return {
+            "elapsed": elapsed,
+            "queue_wait": queue_wait,
+            "utilization": min(1.0, (sample["busy_ns"] - previous["busy_ns"]) / 1e9 / elapsed / self.size),
+            "throughput": (sample["finished"] - previous["finished"]) / elapsed,
+            "cpu": (self.__cpu - cpu) / elapsed if self.kind == "thread" else None,
+            "pending": sample["queued"],
+            "running": sample["running"]
+        }
+
+    def __decide(self, m: dict) -> tuple:
+        """
+        Return the action ("grow", "shrink" or "hold"), the new size and the reason
+        """
+        policy = self.policy
+        size = self.size
+        self.__ticks += 1
+        if self.__ceiling is not None and self.__ticks >= self.__ceiling_until:
+            # probe above the ceiling again, the load may have changed
+            self.__ceiling = None
+
+        waiting = policy.target_queue_wait is not None and m["queue_wait"] > policy.target_queue_wait
+        busy = m["utilization"] > policy.target_utilization
+        idle = not m["pending"] and m["utilization"] < policy.target_utilization / 2 and (
+            policy.target_queue_wait is None or m["queue_wait"] <= policy.target_queue_wait / 2
+        )
+        self.__high = self.__high + 1 if waiting or busy else 0
+        self.__low = self.__low + 1 if idle else 0
+        if not (waiting or busy):
+            # the last growth relieved the pool
+            self.__grown_from = None
+            self.__streak = [0, 0.0]
+            if self.__low < policy.scale_down_intervals:
+                return "hold", size, "idle" if idle else "within target"
+            self.__low = 0
+            if size <= self.min_size:
+                return "hold", size, "at min_size"
+            needed = math.ceil(size * m["utilization"] / policy.target_utilization)
+            new_size = max(self.min_size, needed, size - max(1, size // 4))
+            return "shrink", new_size, f"utilization {m['utilization']:.2f} < {policy.target_utilization / 2:.2f}"
+
+        self.__streak[0] += m["throughput"] * m["elapsed"]
+        self.__streak[1] += m["elapsed"]
+        if self.__high < policy.scale_up_intervals:
+            return "hold", size, "under pressure"
+        throughput = self.__streak[0] / self.__streak[1]
+        self.__high = 0
+        self.__streak = [0, 0.0]
+        if self.__grown_from is not None:
+            before, before_throughput = self.__grown_from
+            self.__grown_from = None
+            if before < size and throughput < before_throughput * (1 + policy.min_gain):
+                # more workers did not get more done (GIL, cores or a downstream limit), go back
+                self.__ceiling = before
+                self.__ceiling_until = self.__ticks + policy.probe_intervals
+                return "shrink", before, (
+                    f"no throughput gain from {before} to {size} ({before_throughput:.1f} -> {throughput:.1f}/s)"
+                )
+        limit = min(self.max_size, self.__ceiling or self.max_size)
+        if size >= limit:
+            return "hold", size, "at max_size" if limit == self.max_size else f"at ceiling {limit}"
+        if policy.max_cpu is not None and m["cpu"] >= policy.max_cpu:
+            return "hold", size, f"cpu {m['cpu']:.2f} >= {policy.max_cpu:.2f} cores"
+        new_size = max(size + 1, math.ceil(size * m["utilization"] / policy.target_utilization))
+        if waiting:
+            new_size = max(new_size, size + max(1, size // 2))
+        self.__grown_from = (size, throughput)
+        if waiting:
+            reason = f"queue wait {m['queue_wait']:.3f}s > {policy.target_queue_wait:.3f}s"
+        else:
+            reason = f"utilization {m['utilization']:.2f} > {policy.target_utilization:.2f}"
+        return "grow", min(limit, new_size), reason
+
+    def __apply(self, action: str, size: int, reason: str, measures: dict) -> dict:
+        decision = self.__record(action, size, reason, measures)
+        self.pool.resize(size)
+        self.decisions.append(decision)
+        logger.debug(f"[{self.name}] Autoscale {action} {decision['size']} -> {size}: {reason}")
+        return decision
+
+    def __record(self, action: str, size: int, reason: str, measures: dict) -> dict:
+        self.last = dict(measures, time=time.time(), action=action, size=self.size, new_size=size, reason=reason)
+        return self.last
+
+
+def get_policy(policy: Union[bool, dict, ScalingPolicy, None]) -> Optional[ScalingPolicy]:
+    """
+    Resolve the `autoscale` option of a decorator, True uses the defaults and a dict the policy options
+    """
+    if not policy:
+        return None
+    if policy is True:
+        return ScalingPolicy()
+    if isinstance(policy, dict):
+        return ScalingPolicy(**policy)
+    assert isinstance(policy, ScalingPolicy), "autoscale must be True, a dict of options or a ScalingPolicy"
+    return policy
@@ -0,0 +1,399 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from .cache import CALL_OPTIONS
+from .stream import iter_result
+from .timer import DeadlineTimer, pop_timeout
+
+
+logger = logging.getLogger()
+
+
+class Batcher():
+    """
+    Batcher class -> batcher
+
+    Collect the calls of a decorated function and run the function once per batch with the list of their items.
+    A batch is dispatched by the call filling it up to `batch_size` items, or `max_latency_ms` after its first item
+    from a thread started by the timer. Every call gets its own `BatchItem` handle, the returned list is split back to them
+
+    :params name: str -> name of the batched function
+    :params run: Callable -> start the function on a list of items and return its worker or process connector
+    :params batch_size: int -> maximum items per batch
+    :params max_latency_ms: float -> maximum milliseconds an item waits for its batch to fill up
+    :params timer: DeadlineTimer -> timer dispatching the batches which did not fill up
+    """
+
+    def __init__(self, name: str, run: Callable, batch_size: int, max_latency_ms: float, timer: DeadlineTimer):
+        assert batch_size > 0, "batch_size must be greater than 0"
+        assert max_latency_ms >= 0, "max_latency_ms must not be negative"
+
+        # private attributes
+        self.__batch = None
+        self.__flush = None
+        self.__lock = threading.Lock()
+
+        # public attributes
+        self.name = name
+        self.run = run
+        self.batch_size = batch_size
+        self.max_latency_ms = max_latency_ms
+        self.timer = timer
+        self.batches = 0
+        self.items = 0
+
+    def __len__(self):
+        batch = self.__batch
+        return len(batch.items) if batch is not None else 0
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "batch_size": self.batch_size,
+            "max_latency_ms": self.max_latency_ms,
+            "pending": len(self),
+            "batches": self.batches,
+            "items": self.items
+        }
+
+    def wrap(self) -> Callable:
+        """
+        Return the decorated function, every call takes one item and the per call options
+        """
+        def call(*args, **kwargs):
+            assert len(args) == 1 and all(key in CALL_OPTIONS for key in kwargs), \
+                f"{self.name} is batched, a call takes exactly one item"
+            return self.submit(args[0], kwargs.pop("_priority", None), pop_timeout(kwargs))
+        call.batcher = self
+        return call
+
+    def submit(self, item: Any, priority: Optional[float] = None, timeout: Optional[float] = None) -> "BatchItem":
+        """
+        Add an item to the pending batch, dispatch the batch once it is full
+
+        :params priority: float -> the batch runs with the highest priority of its items
+        :params timeout: float -> the batch runs with the earliest deadline of its items
+        """
+        with self.__lock:
+            batch = self.__batch
+            if batch is None:
+                batch = self.__batch = _Batch(self)
+                self.__flush = self.timer.schedule(self.max_latency_ms / 1000, lambda: self.__flush_later(batch))
+            handle = BatchItem(self.name, batch, item)
+            batch.add(handle, priority, timeout)
+            full = len(batch.items) >= self.batch_size
+            if full:
+                self.__batch = None
+                self.__flush.cancel()
+        if full:
+            self.__dispatch(batch)
+        return handle
+
+    def flush(self, batch: Optional["_Batch"] = None):
+        """
+        Dispatch the pending batch now
+
+        :params batch: _Batch -> only dispatch it if it is still the pending batch
+        """
+        with self.__lock:
+            if self.__batch is None or (batch is not None and self.__batch is not batch):
+                return
+            batch, self.__batch = self.__batch, None
+            self.__flush.cancel()
+        self.__dispatch(batch)
+
+    def _discard(self, handle: "BatchItem", batch: "_Batch") -> bool:
+        """
+        Remove an item from the pending batch, return False once its batch is dispatched
+        """
+        with self.__lock:
+            if self.__batch is not batch:
+                return False
+            batch.items.remove(handle)
+            return True
+
+    ## Private Executor ---------------------------
+    def __flush_later(self, batch: "_Batch"):
+        """
+        Dispatch a partial batch from a short-lived thread, the timer thread expires every deadline
+        and must not wait for a gate or a pool slot, nor start a process
+        """
+        threading.Thread(target=self.flush, args=(batch,), name=f"{self.name}-flush", daemon=True).start()
+
+    def __dispatch(self, batch: "_Batch"):
+        """
+        Start the function on the items of a batch
+        """
+        if not batch.items:
+            # every item was aborted while it waited
+            return batch.finish(aborted=True)
+        options = {}
+        if batch.priority is not None:
+            options["_priority"] = batch.priority
+        if batch.deadline is not None:
+            options["_timeout"] = batch.deadline - time.monotonic()
+        for index, handle in enumerate(batch.items):
+            handle.index = index
+        self.batches += 1
+        self.items += len(batch.items)
+        try:
+            runner = self.run([handle.item for handle in batch.items], **options)
+        except Exception as e:
+            logger.debug(f"[{self.name}] BatchDispatchError {e}")
+            return batch.finish(error=e)
+        batch.start(runner)
+
+
+class _Batch():
+    """
+    The items dispatched together, they share the worker (or process connector) running them
+    """
+    __slots__ = (
+        "batcher", "items", "priority", "deadline", "runner", "results", "error", "is_aborted",
+        "dispatched", "done", "lock", "on_dispatch", "on_done"
+    )
+
+    def __init__(self, batcher: Batcher):
+        self.batcher = batcher
+        self.items = []
+        self.priority = None
+        self.deadline = None
+        self.runner = None
+        self.results = None
+        self.error = None
+        self.is_aborted = False
+        self.dispatched = threading.Event()
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.on_dispatch = []
+        self.on_done = []
+
+    def add(self, handle: "BatchItem", priority: Optional[float] = None, timeout: Optional[float] = None):
+        self.items.append(handle)
+        if priority is not None:
+            self.priority = priority if self.priority is None else max(self.priority, priority)
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            self.deadline = deadline if self.deadline is None else min(self.deadline, deadline)
+
+    def start(self, runner):
+        self.runner = runner
+        with self.lock:
+            self.dispatched.set()
+            callbacks, self.on_dispatch = self.on_dispatch, []
+        for callback in callbacks:
+            callback()
+        if all(handle.is_cancelled for handle in self.items):
+            self.abort()
+        runner.add_done_callback(self.complete)
+
+    def complete(self, runner):
+        """
+        Split the returned list back to the items
+        """
+        error = runner.error
+        aborted = getattr(runner, "is_aborted", False) or getattr(runner, "is_killed", False)
+        results = None
+        if error is None and not aborted:
+            results = runner.ret
+            if not isinstance(results, (list, tuple)) or len(results) != len(self.items):
+                count = len(results) if isinstance(results, (list, tuple)) else type(results).__name__
+                error = ValueError(
+                    f"[{self.batcher.name}] returned {count} results for a batch of {len(self.items)} items"
+                )
+                results = None
+        self.finish(results, error, aborted)
+
+    def finish(self, results: Optional[list] = None, error: Optional[BaseException] = None, aborted: bool = False):
+        self.results = results
+        self.error = error
+        self.is_aborted = aborted
+        with self.lock:
+            self.dispatched.set()
+            self.done.set()
+            dispatch_callbacks, self.on_dispatch = self.on_dispatch, []
+            callbacks, self.on_done = self.on_done, []
+        for callback in dispatch_callbacks:
+            callback()
+        for handle, callback in callbacks:
+            try:
+                callback(handle)
+            except Exception as e:
+                logger.debug(f"[{self.batcher.name}] DoneCallbackError {e}")
+
+    def abort(self):
+        runner = self.runner
+        if runner is not None and not self.done.is_set():
+            abort = getattr(runner, "abort", None) or runner.kill
+            abort()
+
+    def detach(self, handle: "BatchItem") -> list:
+        """
+        Remove and return the done callbacks of an item dropped from the batch
+        """
+        with self.lock:
+            callbacks = [entry for entry in self.on_done if entry[0] is handle]
+            self.on_done = [entry for entry in self.on_done if entry[0] is not handle]
+        return callbacks
+
+    def when_dispatched(self, callback: Callable):
+        with self.lock:
+            if not self.dispatched.is_set():
+                self.on_dispatch.append(callback)
+                return
+        callback()
+
+    def when_done(self, handle: "BatchItem", callback: Callable):
+        with self.lock:
+            if not self.done.is_set():
+                self.on_done.append((handle, callback))
+                return
+        callback(handle)
+
+
+class BatchItem():
+    """
+    BatchItem class -> handle
+
+    The handle of one call of a batched function, it behaves like a finished worker or process connector
+    once its batch is done. `batch` is the worker (or process connector) running the whole batch
+    """
+    __slots__ = ("name", "item", "index", "is_cancelled", "__batch")
+
+    def __init__(self, name: str, batch: _Batch, item: Any):
+        # private attributes
+        self.__batch = batch
+
+        # public attributes
+        self.name = name
+        self.item = item
+        self.index = None
+        self.is_cancelled = False
+
+    def __await__(self):
+        """
+        Await the item from a coroutine without blocking the event loop
+        """
+        import asyncio
+        batch = self.__batch
+        loop = asyncio.get_running_loop()
+        if not batch.dispatched.is_set():
+            future = loop.create_future()
+            batch.when_dispatched(lambda: loop.call_soon_threadsafe(_resolve, future))
+            yield from future.__await__()
+        if batch.runner is not None and not batch.done.is_set():
+            # a process connector only receives its result while it is awaited
+            yield from batch.runner.__await__()
+        if not batch.done.is_set():
+            future = loop.create_future()
+            batch.when_done(self, lambda handle: loop.call_soon_threadsafe(_resolve, future))
+            yield from future.__await__()
+        return self.ret
+
+    def __iter__(self):
+        self.wait()
+        yield from iter_result(self.ret, f"[{self.name}]")
+
+    async def __aiter__(self):
+        await self
+        for item in iter_result(self.ret, f"[{self.name}]"):
+            yield item
+
+    ## Properties ---------------------------
+
+    @property
+    def batch(self):
+        return self.__batch.runner
+
+    @property
+    def finished(self):
+        return self.__batch.done.is_set()
+
+    @property
+    def is_alive(self):
+        return not self.finished
+
+    @property
+    def is_aborted(self):
+        return self.is_cancelled or self.__batch.is_aborted
+
+    @property
+    def ret(self):
+        results = self.__batch.results
+        if results is None or self.is_cancelled:
+            return None
+        return results[self.index]
+
+    result = ret
+
+    @property
+    def error(self):
+        return self.__batch.error
+
+    @property
+    def work_time(self):
+        return getattr(self.__batch.runner, "work_time", 0.0)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait the batch of the item to finish
+
+        :params timeout: float -> maximum seconds to wait, return False if the batch is still running
+        """
+        batch = self.__batch
+        if batch.done.is_set():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not batch.dispatched.wait(timeout):
+            return False
+        if batch.runner is not None and not batch.done.is_set():
+            # a process connector only receives its result while it is waited on
+            batch.runner.wait(timeout=_left(deadline))
+        return batch.done.wait(_left(deadline))
+
+    def await_worker(self, timeout: Optional[float] = None) -> Any:
+        self.wait(timeout)
+        return self.ret
+
+    def receive(self) -> Any:
+        self.wait()
+        return self.ret
+
+    def add_done_callback(self, callback: Callable):
+        """
+        Call `callback(handle)` once the batch is finished, immediately if it is already finished
+        """
+        self.__batch.when_done(self, callback)
+
+    def _add_result_callback(self, callback: Callable):
+        """
+        Call `callback(result)` once the item has a result, used by the process cache
+        """
+        self.add_done_callback(lambda h: callback(h.ret) if h.error is None and not h.is_aborted else None)
+
+    def abort(self):
+        """
+        Drop the item from a batch still collecting items.
+        A dispatched batch keeps running for its other items, it is aborted once all of them are
+        """
+        batch = self.__batch
+        self.is_cancelled = True
+        if batch.batcher._discard(self, batch):
+            dropped = self.__batch = _Batch(batch.batcher)
+            dropped.on_done = batch.detach(self)
+            dropped.finish(aborted=True)
+        elif batch.runner is not None and all(handle.is_cancelled for handle in batch.items):
+            batch.abort()
+
+    kill = abort
+
+
+def _left(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0, deadline - time.monotonic())
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
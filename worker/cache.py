@@ -0,0 +1,258 @@
+import os
+import time
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from .stream import is_async_function, iter_result
+
+
+logger = logging.getLogger()
+
+
+MISSING = object()
+
+# per call options of the decorated functions, they are not arguments of the call
+CALL_OPTIONS = ("_priority", "_timeout", "_deadline")
+
+
+class LRU():
+    """
+    LRU class -> cache
+
+    A memoizing result cache for `@worker` and `@process` functions.
+    The least recently used results are evicted above `maxsize`, and expire after `ttl` seconds.
+
+    With `directory`, the results are also pickled on disk so they survive the process,
+    useful for expensive `@process` results
+
+    :params maxsize: int -> maximum results kept in memory
+    :params ttl: float -> seconds before a result expires, None never expires
+    :params directory: str -> opt-in disk tier
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None, directory: Optional[str] = None):
+        assert maxsize > 0, "maxsize must be greater than 0"
+        assert ttl is None or ttl > 0, "ttl must be greater than 0"
+
+        # private attributes
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+        # public attributes
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def info(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.__entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "directory": self.directory
+        }
+
+    def get(self, key: Any) -> Any:
+        """
+        Return the cached result of `key`, `MISSING` if there is none
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.__entries[key]
+        if self.directory:
+            value = self.__load(key)
+            if value is not MISSING:
+                with self.__lock:
+                    self.disk_hits += 1
+                    self.__put(key, value)
+                return value
+        with self.__lock:
+            self.misses += 1
+        return MISSING
+
+    def set(self, key: Any, value: Any):
+        with self.__lock:
+            self.__put(key, value)
+        if self.directory:
+            self.__dump(key, value)
+
+    def clear(self):
+        """
+        Drop the results in memory and on disk
+        """
+        with self.__lock:
+            self.__entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".result"):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    ## Private Executor ---------------------------
+    def __put(self, key: Any, value: Any):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        self.__entries[key] = (value, expires)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def __path(self, key: Any) -> str:
+        import hashlib
+        digest = hashlib.sha256(pickle.dumps(key, protocol=4)).hexdigest()
+        return os.path.join(self.directory, f"{digest}.result")
+
+    def __load(self, key: Any) -> Any:
+        path = self.__path(key)
+        try:
+            with open(path, "rb") as file:
+                expires, value = pickle.load(file)
+        except FileNotFoundError:
+            return MISSING
+        except Exception as e:
+            logger.debug(f"cannot load cached result {path}: {e}")
+            return MISSING
+        if expires is not None and expires <= time.time():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return MISSING
+        return value
+
+    def __dump(self, key: Any, value: Any):
+        path = self.__path(key)
+        expires = None if self.ttl is None else time.time() + self.ttl
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, "wb") as file:
+                pickle.dump((expires, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, path)
+        except Exception as e:
+            logger.debug(f"cannot store cached result {path}: {e}")
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+
+
+class CachedResult():
+    """
+    CachedResult class -> handle
+
+    An already completed handle returned on a cache hit, it behaves like a finished worker
+    or process connector without any thread or process behind it
+    """
+
+    def __init__(self, name: str, value: Any):
+        self.name = name
+        self.ret = self.result = value
+        self.error = None
+        self.finished = True
+        self.is_alive = False
+        self.is_aborted = False
+        self.is_cached = True
+        self.work_time = 0.0
+
+    def __await__(self):
+        if False:
+            yield
+        return self.ret
+
+    def __iter__(self):
+        yield from iter_result(self.ret, self.name)
+
+    async def __aiter__(self):
+        for item in iter_result(self.ret, self.name):
+            yield item
+
+    def wait(self, *args, **kwargs) -> bool:
+        return True
+
+    def await_worker(self, *args, **kwargs) -> Any:
+        return self.ret
+
+    def receive(self) -> Any:
+        return self.ret
+
+    def add_done_callback(self, callback: Callable):
+        callback(self)
+
+    def abort(self):
+        pass
+
+    def kill(self):
+        pass
+
+
+def make_key(namespace: str, args: tuple, kwargs: dict) -> Tuple[bool, Any]:
+    """
+    Return a cache key for a call, arguments which are not hashable are keyed by their pickle.
+    The first item is False when the call cannot be cached
+    """
+    key = (namespace, args, tuple(sorted((k, v) for k, v in kwargs.items() if k not in CALL_OPTIONS)))
+    try:
+        hash(key)
+        return True, key
+    except TypeError:
+        pass
+    try:
+        return True, (namespace, pickle.dumps(key[1:], protocol=4))
+    except Exception:
+        return False, None
+
+
+def cached(cache: LRU, namespace: str, run: Callable, watch: Callable[[Any, Callable], None]) -> Callable:
+    """
+    Wrap a decorated function so the calls with known arguments return a `CachedResult`
+
+    :params run: callable -> the decorated function returning a handle
+    :params watch: callable -> `watch(handle, store)` calls `store(result)` once the handle succeeded
+    """
+    if is_async_function(run):
+        async def call(*args, **kwargs):
+            cacheable, key = make_key(namespace, args, kwargs)
+            if cacheable:
+                value = cache.get(key)
+                if value is not MISSING:
+                    return CachedResult(namespace, value)
+            handle = await run(*args, **kwargs)
+            if cacheable:
+                watch(handle, lambda value: cache.set(key, value))
+            return handle
+    else:
+        def call(*args, **kwargs):
+            cacheable, key = make_key(namespace, args, kwargs)
+            if cacheable:
+                value = cache.get(key)
+                if value is not MISSING:
+                    return CachedResult(namespace, value)
+            handle = run(*args, **kwargs)
+            if cacheable:
+                watch(handle, lambda value: cache.set(key, value))
+            return handle
+    call.cache = cache
+    return call
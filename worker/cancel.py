@@ -0,0 +1,72 @@
+import threading
+import contextvars
+from typing import Optional
+
+
+class WorkerCancelled(SystemExit):
+    """
+    Raised by `CancellationToken.raise_if_cancelled`, it ends the worker as aborted like `abort_thread` does
+    """
+
+
+# guards the event of every token, it is only created once something waits on a token
+_lock = threading.Lock()
+
+
+class CancellationToken():
+    """
+    CancellationToken class -> token
+
+    Set by `abort()` before it falls back to an asynchronous exception, so a worker can stop by itself.
+    Unlike the asynchronous exception, `wait` also wakes up a worker blocked on it
+    """
+    __slots__ = ("__cancelled", "__event")
+
+    def __init__(self):
+        # private attributes
+        self.__cancelled = False
+        self.__event = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__cancelled
+
+    def cancel(self):
+        with _lock:
+            self.__cancelled = True
+            event = self.__event
+        if event is not None:
+            event.set()
+
+    def raise_if_cancelled(self):
+        if self.__cancelled:
+            raise WorkerCancelled()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sleep until the token is cancelled, return True if it is cancelled
+
+        :params timeout: float -> maximum seconds to sleep
+        """
+        with _lock:
+            if self.__cancelled:
+                return True
+            if self.__event is None:
+                self.__event = threading.Event()
+            event = self.__event
+        return event.wait(timeout)
+
+
+_current_token = contextvars.ContextVar("worker_cancellation_token", default=None)
+
+
+def get_token() -> CancellationToken:
+    """
+    Return the cancellation token of the running worker.
+    Outside of a worker it is a token nobody cancels, so the same code also runs in the main thread
+    """
+    token = _current_token.get()
+    if token is None:
+        token = CancellationToken()
+        _current_token.set(token)
+    return token
@@ -0,0 +1,164 @@
+import threading
+import logging
+from typing import Optional
+
+from .scheduler import PriorityTaskQueue
+
+
+logger = logging.getLogger()
+
+
+ON_FULL_POLICIES = ("block", "reject", "drop_oldest", "caller_runs")
+
+
+class WorkerQueueFull(Exception):
+    """
+    Raised when a worker is submitted to a full gate with `on_full="reject"`
+    """
+
+
+class WorkerGate():
+    """
+    WorkerGate class -> gate
+
+    Limit how many workers of a name run at once.
+    The next workers wait in a bounded priority queue, `on_full` decides what happens once it is full:
+
+    - block -> the caller waits until there is room in the queue
+    - reject -> raise `WorkerQueueFull`
+    - drop_oldest -> abort the oldest queued worker to make room
+    - caller_runs -> run the worker in the calling thread
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        queue_size: Optional[int] = None,
+        on_full: str = "block",
+        aging_rate: float = 1.0
+    ):
+        assert max_concurrency > 0, "max_concurrency must be greater than 0"
+        assert queue_size is None or queue_size >= 0, "queue_size must not be negative"
+        assert on_full in ON_FULL_POLICIES, f"on_full must be one of {ON_FULL_POLICIES}"
+        assert on_full != "drop_oldest" or queue_size != 0, "drop_oldest needs a queue_size greater than 0"
+
+        # private attributes
+        self.__pending = PriorityTaskQueue(aging_rate)
+        self.__lock = threading.Lock()
+        self.__room = threading.Condition(self.__lock)
+
+        # public attributes
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.on_full = on_full
+        self.running = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.caller_runs = 0
+
+    ## Properties ---------------------------
+
+    @property
+    def pending(self):
+        return len(self.__pending)
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "queue_size": self.queue_size,
+            "on_full": self.on_full,
+            "running": self.running,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "caller_runs": self.caller_runs
+        }
+
+    ## Gate ---------------------------
+    def submit(self, worker):
+        """
+        Start the worker if a slot is free, queue it otherwise
+        """
+        dropped = None
+        with self.__lock:
+            while True:
+                if self.running < self.max_concurrency:
+                    self.running += 1
+                    action = "start"
+                    break
+                if self.queue_size is None or len(self.__pending) < self.queue_size:
+                    self.__pending.put(worker, worker.priority)
+                    action = "queue"
+                    break
+                if self.on_full == "block":
+                    self.__room.wait()
+                elif self.on_full == "reject":
+                    self.rejected += 1
+                    raise WorkerQueueFull(f"worker queue `{self.name}` is full ({self.queue_size} pending)")
+                elif self.on_full == "drop_oldest":
+                    dropped = self.__pending.pop_oldest()
+                    self.__pending.put(worker, worker.priority)
+                    self.dropped += 1
+                    action = "queue"
+                    break
+                else:
+                    # caller_runs
+                    self.caller_runs += 1
+                    action = "inline"
+                    break
+        if dropped is not None:
+            dropped._drop()
+        if action == "start":
+            self.__start(worker)
+        elif action == "inline":
+            worker._run_inline()
+
+    def discard(self, worker) -> bool:
+        """
+        Remove a queued worker, return False if it is not queued anymore
+        """
+        with self.__lock:
+            if not self.__pending.remove(worker):
+                return False
+            self.__room.notify()
+            return True
+
+    def resize(self, max_concurrency: int):
+        """
+        Change the maximum number of running workers, the queued ones start if there is room
+        """
+        assert max_concurrency > 0, "max_concurrency must be greater than 0"
+        with self.__lock:
+            self.max_concurrency = max_concurrency
+        self.__release(None, done=False)
+
+    ## Private Executor ---------------------------
+    def __start(self, worker):
+        worker.add_done_callback(self.__release)
+        try:
+            worker._start()
+        except BaseException:
+            self.__release(worker)
+            raise
+
+    def __release(self, worker, done: bool = True):
+        """
+        Hand the slot of a finished worker to the next queued ones
+        """
+        starting = []
+        with self.__lock:
+            if done:
+                self.running -= 1
+            while self.__pending and self.running < self.max_concurrency:
+                self.running += 1
+                starting.append(self.__pending.get_nowait())
+            if starting:
+                self.__room.notify(len(starting))
+        for worker in starting:
+            try:
+                self.__start(worker)
+            except Exception as e:
+                logger.debug(f"[{self.name}] StartError {e}")
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Coroutine
+
+
+logger = logging.getLogger()
+
+
+class EventLoopThread():
+    """
+    EventLoopThread class -> loop thread
+
+    A long-lived background thread running its own event loop.
+    Coroutines from any thread are scheduled onto it with `submit`
+    """
+
+    def __init__(self, name: str):
+        # private attributes
+        self.__tasks = 0
+        self.__lock = threading.Lock()
+
+        # public attributes
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.__run, name=name, daemon=True)
+        self.thread.start()
+
+    @property
+    def tasks(self):
+        return self.__tasks
+
+    @property
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "tasks": self.tasks,
+            "is_alive": self.is_alive
+        }
+
+    ## Private Executor ---------------------------
+    def __run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            try:
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            finally:
+                self.loop.close()
+
+    def __done(self, future: Future):
+        with self.__lock:
+            self.__tasks -= 1
+
+    async def __drain(self):
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self.loop.stop()
+
+    ## Public Methods ---------------------------
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the loop thread, thread-safe
+        """
+        with self.__lock:
+            self.__tasks += 1
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(self.__done)
+        return future
+
+    def stop(self, wait: bool = True):
+        """
+        Stop the loop, with `wait` the running coroutines are finished first
+        """
+        if not self.is_alive:
+            return
+        if wait:
+            asyncio.run_coroutine_threadsafe(self.__drain(), self.loop)
+        else:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if threading.current_thread() is not self.thread:
+            self.thread.join()
@@ -0,0 +1,57 @@
+import queue
+import itertools
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator
+
+
+def chunked(iterable: Iterable, chunksize: int) -> Iterator[list]:
+    """
+    Split an iterable into lists of `chunksize` items, lazily
+    """
+    assert chunksize > 0, "chunksize must be greater than 0"
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_chunk_results(
+    submit: Callable[[list], Any],
+    collect: Callable[[Any], list],
+    chunks: Iterator[list],
+    ordered: bool = True,
+    max_inflight: int = 1
+) -> Iterator[Any]:
+    """
+    Submit the chunks with at most `max_inflight` of them running at once and yield their items.
+
+    :params submit: callable -> submit a chunk and return a handle with `add_done_callback`
+    :params collect: callable -> return the list of results of a finished handle
+    :params ordered: bool -> yield in input order, otherwise in completion order
+    """
+    assert max_inflight > 0, "max_inflight must be greater than 0"
+    if ordered:
+        inflight = deque()
+        for chunk in itertools.islice(chunks, max_inflight):
+            inflight.append(submit(chunk))
+        while inflight:
+            handle = inflight.popleft()
+            handle.wait(timeout=None)
+            for chunk in itertools.islice(chunks, 1):
+                inflight.append(submit(chunk))
+            yield from collect(handle)
+    else:
+        done = queue.Queue()
+        inflight = 0
+        for chunk in itertools.islice(chunks, max_inflight):
+            submit(chunk).add_done_callback(done.put)
+            inflight += 1
+        while inflight:
+            handle = done.get()
+            inflight -= 1
+            for chunk in itertools.islice(chunks, 1):
+                submit(chunk).add_done_callback(done.put)
+                inflight += 1
+            yield from collect(handle)
@@ -0,0 +1,229 @@
+import bisect
+import threading
+from typing import Dict, Optional, Sequence
+
+
+# seconds, from 100us to 1 minute
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+class Histogram():
+    """
+    Histogram class -> histogram
+
+    Per-bucket counts of durations recorded in nanoseconds, exported in seconds
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = [int(b * 1e9) for b in buckets]
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+    def observe(self, value_ns: int):
+        self.counts[bisect.bisect_left(self.bounds, value_ns)] += 1
+        self.count += 1
+        self.sum_ns += value_ns
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": {str(b): c for b, c in zip(self.buckets + ("+Inf",), self.counts)},
+            "count": self.count,
+            "sum": self.sum_ns / 1e9
+        }
+
+
+class WorkerMetrics():
+    """
+    WorkerMetrics class -> metrics
+
+    Counters, gauges and histograms of all the workers sharing a name
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.__lock = threading.Lock()
+        self.name = name
+        self.started = 0
+        self.finished = 0
+        self.aborted = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.queue_wait = Histogram(buckets)
+        self.run_time = Histogram(buckets)
+
+    def on_queued(self):
+        with self.__lock:
+            self.queued += 1
+
+    def on_start(self, queue_wait_ns: int):
+        with self.__lock:
+            self.queued -= 1
+            self.in_flight += 1
+            self.started += 1
+            self.queue_wait.observe(queue_wait_ns)
+
+    def on_finish(self, run_time_ns: int, outcome: str):
+        """
+        :params outcome: str -> "finished", "aborted", "failed" or "timed_out"
+        """
+        with self.__lock:
+            self.in_flight -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.run_time.observe(run_time_ns)
+
+    def on_cancel(self, outcome: str = "aborted"):
+        """
+        A queued worker was aborted (or timed out) before it started
+        """
+        with self.__lock:
+            self.queued -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self) -> dict:
+        with self.__lock:
+            return {
+                "started": self.started,
+                "finished": self.finished,
+                "aborted": self.aborted,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "queue_wait_seconds": self.queue_wait.snapshot(),
+                "run_time_seconds": self.run_time.snapshot()
+            }
+
+
+class LoadMeter():
+    """
+    LoadMeter class -> meter
+
+    Running totals of the queue wait and busy time of the tasks of a pool, in nanoseconds.
+    The tasks still queued or running are counted up to the sample time, so a long task shows up
+    as busy while it runs and not only once it is done
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.started = 0
+        self.finished = 0
+        self.queued = 0
+        self.running = 0
+        self.queue_wait_ns = 0
+        self.busy_ns = 0
+        self.queued_since_ns = 0
+        self.running_since_ns = 0
+
+    def on_queued(self, queued_ns: int):
+        with self.__lock:
+            self.queued += 1
+            self.queued_since_ns += queued_ns
+
+    def on_start(self, queued_ns: int, start_ns: int):
+        with self.__lock:
+            self.queued -= 1
+            self.queued_since_ns -= queued_ns
+            self.queue_wait_ns += start_ns - queued_ns
+            self.started += 1
+            self.running += 1
+            self.running_since_ns += start_ns
+
+    def on_finish(self, start_ns: int, end_ns: int):
+        with self.__lock:
+            self.running -= 1
+            self.running_since_ns -= start_ns
+            self.busy_ns += end_ns - start_ns
+            self.finished += 1
+
+    def on_cancel(self, queued_ns: int):
+        """
+        A queued task was dropped before it started
+        """
+        with self.__lock:
+            self.queued -= 1
+            self.queued_since_ns -= queued_ns
+
+    def sample(self, now_ns: int) -> dict:
+        with self.__lock:
+            return {
+                "time_ns": now_ns,
+                "started": self.started,
+                "finished": self.finished,
+                "queued": self.queued,
+                "running": self.running,
+                "queue_wait_ns": self.queue_wait_ns,
+                "queued_age_ns": self.queued * now_ns - self.queued_since_ns,
+                "busy_ns": self.busy_ns + self.running * now_ns - self.running_since_ns
+            }
+
+
+class MetricsRegistry():
+    """
+    MetricsRegistry class -> registry
+
+    The `WorkerMetrics` of every worker name, with JSON and Prometheus text exporters
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.__metrics: Dict[str, WorkerMetrics] = {}
+        self.__lock = threading.Lock()
+        self.buckets = tuple(buckets)
+
+    def get(self, name: str) -> WorkerMetrics:
+        metrics = self.__metrics.get(name)
+        if metrics is None:
+            with self.__lock:
+                metrics = self.__metrics.setdefault(name, WorkerMetrics(name, self.buckets))
+        return metrics
+
+    def snapshot(self, name: Optional[str] = None) -> dict:
+        if name is not None:
+            return self.get(name).snapshot()
+        return {name: metrics.snapshot() for name, metrics in list(self.__metrics.items())}
+
+    def reset(self):
+        with self.__lock:
+            self.__metrics.clear()
+
+    def to_json(self, **kwargs) -> str:
+        import json
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "python_worker") -> str:
+        """
+        Render the metrics in the Prometheus text exposition format
+        """
+        lines = []
+        snapshot = self.snapshot()
+        for counter in ("started", "finished", "aborted", "failed", "timed_out"):
+            metric = f"{prefix}_{counter}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, stats in snapshot.items():
+                lines.append(f'{metric}{{name="{_escape(name)}"}} {stats[counter]}')
+        for gauge in ("queued", "in_flight"):
+            metric = f"{prefix}_{gauge}"
+            lines.append(f"# TYPE {metric} gauge")
+            for name, stats in snapshot.items():
+                lines.append(f'{metric}{{name="{_escape(name)}"}} {stats[gauge]}')
+        for histogram in ("queue_wait_seconds", "run_time_seconds"):
+            metric = f"{prefix}_{histogram}"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, stats in snapshot.items():
+                label = _escape(name)
+                cumulative = 0
+                for bound, count in stats[histogram]["buckets"].items():
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{name="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{name="{label}"}} {stats[histogram]["sum"]}')
+                lines.append(f'{metric}_count{{name="{label}"}} {stats[histogram]["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
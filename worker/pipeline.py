@@ -0,0 +1,458 @@
+import time
+import logging
+import threading
+from collections import deque
+from types import FunctionType
+from typing import Any, Iterable, Optional
+
+from .stream import END, is_generator_function, maybe_await
+from .worker import ThreadWorker, ThreadWorkerManager
+
+
+logger = logging.getLogger()
+
+
+STAGE_KINDS = ("thread", "async", "process")
+ON_ERROR_POLICIES = ("skip", "abort")
+
+
+class Stage():
+    """
+    Stage class -> stage
+
+    One step of a `Pipeline`: `func(item)` runs on `workers` thread workers, coroutines or pooled processes.
+    A returned value is sent to the next stage, None drops the item and a generator sends every item it yields.
+    Without input items, the first stage is the source and `func()` is called once per worker
+
+    :params func: function -> called with one item
+    :params workers: int -> concurrent calls of the stage
+    :params kind: str -> "thread", "async" (coroutines in one event loop) or "process" (a process pool)
+    :params queue_size: int -> maximum items waiting for the stage, the upstream stage blocks beyond it
+    :params on_error: str -> "skip" logs and drops the failed item, "abort" aborts the whole pipeline
+    :params name: str -> name of the stage, default to the function name
+    """
+
+    def __init__(
+        self,
+        func: FunctionType,
+        workers: int = 1,
+        kind: str = "thread",
+        queue_size: int = 64,
+        on_error: str = "skip",
+        name: Optional[str] = None
+    ):
+        assert workers > 0, "workers must be greater than 0"
+        assert queue_size > 0, "queue_size must be greater than 0"
+        assert kind in STAGE_KINDS, f"kind must be one of {STAGE_KINDS}"
+        assert on_error in ON_ERROR_POLICIES, f"on_error must be one of {ON_ERROR_POLICIES}"
+
+        # private attributes
+        self.__lock = threading.Lock()
+
+        # public attributes
+        self.func = func
+        self.workers = workers
+        self.kind = kind
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.name = name or getattr(func, "__name__", "stage")
+        self.inbox = None
+        self.running = 0
+        self.received = 0
+        self.emitted = 0
+        self.errors = 0
+        self.error = None
+        self.busy_ns = 0
+        self.starved_ns = 0
+        self.blocked_ns = 0
+        self.start_ns = 0
+        self.end_ns = 0
+
+    def _record(self, received: int = 0, emitted: int = 0, busy_ns: int = 0, starved_ns: int = 0, blocked_ns: int = 0):
+        with self.__lock:
+            self.received += received
+            self.emitted += emitted
+            self.busy_ns += busy_ns
+            self.starved_ns += starved_ns
+            self.blocked_ns += blocked_ns
+
+    def _fail(self, error: Exception):
+        with self.__lock:
+            self.errors += 1
+            self.error = error
+
+    def stats(self) -> dict:
+        """
+        Throughput and queue depth of the stage.
+        `utilization` is the share of the worker time spent in the function, the bottleneck stage is the
+        busiest one. `starved_seconds` is waiting for input, `blocked_seconds` waiting for room downstream
+        """
+        end_ns = self.end_ns or time.perf_counter_ns()
+        elapsed = (end_ns - self.start_ns) / 1e9 if self.start_ns else 0
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "workers": self.workers,
+            "running": self.running,
+            "queue_depth": len(self.inbox) if self.inbox is not None else 0,
+            "queue_size": self.queue_size,
+            "received": self.received,
+            "emitted": self.emitted,
+            "errors": self.errors,
+            "items_per_second": round(self.received / elapsed, 1) if elapsed else 0.0,
+            "utilization": round(self.busy_ns / 1e9 / (elapsed * self.workers), 3) if elapsed else 0.0,
+            "busy_seconds": round(self.busy_ns / 1e9, 6),
+            "starved_seconds": round(self.starved_ns / 1e9, 6),
+            "blocked_seconds": round(self.blocked_ns / 1e9, 6)
+        }
+
+
+def stage(
+    func: FunctionType,
+    workers: int = 1,
+    kind: str = "thread",
+    queue_size: int = 64,
+    on_error: str = "skip",
+    name: Optional[str] = None
+) -> Stage:
+    """
+    Shortcut of `Stage`, e.g. `stage(parse, workers=4, kind="process")`
+    """
+    return Stage(func, workers, kind, queue_size, on_error, name)
+
+
+class _Channel():
+    """
+    A bounded queue between two stages, it ends once all its producers are closed
+    """
+
+    def __init__(self, maxsize: int, producers: int):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.producers = producers
+        self.is_aborted = False
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item: Any, interval: float = 0.1) -> bool:
+        """
+        Wait for room and put an item, return False once the pipeline is aborted.
+        The interval keeps the waiting worker responsive to an abort
+        """
+        with self.not_full:
+            while len(self.items) >= self.maxsize and not self.is_aborted:
+                self.not_full.wait(interval)
+            if self.is_aborted:
+                return False
+            self.items.append(item)
+            self.not_empty.notify()
+            return True
+
+    def get(self, interval: float = 0.1) -> Any:
+        """
+        Wait for an item, return `END` once all the producers are closed and the queue is drained
+        """
+        with self.not_empty:
+            while not self.items and self.producers and not self.is_aborted:
+                self.not_empty.wait(interval)
+            if self.is_aborted or not self.items:
+                return END
+            item = self.items.popleft()
+            self.not_full.notify()
+            return item
+
+    def close(self):
+        with self.lock:
+            self.producers -= 1
+            if self.producers <= 0:
+                self.not_empty.notify_all()
+
+    def abort(self):
+        with self.lock:
+            self.is_aborted = True
+            self.items.clear()
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+
+
+class Pipeline():
+    """
+    Pipeline class -> pipeline
+
+    Stages connected by bounded queues, the items stream through them while the next ones are produced.
+    The stages run on `ThreadWorker`s, the end of the stream flows down once every worker of a stage is done,
+    and aborting one of them (e.g. with `abort_all_worker` or CTRL+C) aborts the whole pipeline
+
+    Usage Example:
+    - Pipeline(stage(read), stage(parse, workers=4, kind="process"), stage(write, workers=2)).run()
+    - Pipeline(stage(fetch, workers=16, kind="async"), stage(store)).run(urls)
+
+    :params stages: Stage -> the stages in order
+    :params name: str -> prefix of the stage worker names
+    """
+
+    def __init__(self, *stages: Stage, name: str = "pipeline"):
+        assert stages, "a pipeline needs at least one stage"
+        for s in stages:
+            assert isinstance(s, Stage), "use `stage(func, ...)` to define the stages"
+
+        # private attributes
+        self.__lock = threading.Lock()
+        self.__pools = {}
+        self.__started = False
+
+        # public attributes
+        self.name = name
+        self.stages = list(stages)
+        self.workers = []
+        self.is_aborted = False
+
+    def start(self, items: Optional[Iterable] = None) -> "Pipeline":
+        """
+        Start every stage, `items` are fed to the first stage, otherwise the first stage is the source
+        """
+        with self.__lock:
+            assert not self.__started, "a pipeline can only be started once"
+            self.__started = True
+        start_ns = time.perf_counter_ns()
+        producers = 1 if items is not None else 0
+        for s in self.stages:
+            s.start_ns = start_ns
+            if producers:
+                s.inbox = _Channel(s.queue_size, producers)
+            producers = s.workers
+        if items is not None:
+            self.__spawn(f"{self.name}.feed", self.__feed, items)
+        for index, s in enumerate(self.stages):
+            s.running = s.workers
+            outbox = self.stages[index + 1].inbox if index + 1 < len(self.stages) else None
+            if s.kind == "process":
+                from .process import ProcessConnector
+                run = ProcessConnector.create_process(s.func, pool_size=s.workers)
+                self.__pools[s] = run.pool
+                for _ in range(s.workers):
+                    self.__spawn(f"{self.name}.{s.name}", self.__run_process, s, run, outbox)
+            elif s.kind == "async":
+                self.__spawn(f"{self.name}.{s.name}", self.__run_async, s, outbox)
+            else:
+                for _ in range(s.workers):
+                    self.__spawn(f"{self.name}.{s.name}", self.__run_thread, s, outbox)
+        return self
+
+    def run(self, items: Optional[Iterable] = None, timeout: Optional[float] = None) -> "Pipeline":
+        """
+        Start the pipeline and wait for the end of the stream
+        """
+        self.start(items)
+        self.wait(timeout)
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the end of the stream, return False if some stages are still running after `timeout` seconds
+        """
+        return ThreadWorkerManager.wait(*self.workers, timeout=timeout)
+
+    @property
+    def finished(self) -> bool:
+        return self.__started and all(w.finished for w in self.workers)
+
+    def abort(self):
+        """
+        Abort every stage, the queued items are dropped.
+        The stage workers stop by themselves once their queues are aborted, the ones still busy in their
+        function after `ThreadWorkerManager.abort_grace` seconds are aborted
+        """
+        with self.__lock:
+            if self.is_aborted:
+                return
+            self.is_aborted = True
+        for s in self.stages:
+            if s.inbox is not None:
+                s.inbox.abort()
+        for w in self.workers:
+            w.token.cancel()
+        for pool in self.__pools.values():
+            pool.shutdown(wait=False)
+        ThreadWorkerManager.deadlines.schedule(ThreadWorkerManager.abort_grace, self.__force_abort)
+
+    def stats(self) -> dict:
+        """
+        Stats of every stage by name, and the `bottleneck` stage with the highest utilization
+        """
+        stages = {s.name: s.stats() for s in self.stages}
+        busiest = max(stages.values(), key=lambda s: s["utilization"])
+        return {
+            "name": self.name,
+            "finished": self.finished,
+            "is_aborted": self.is_aborted,
+            "bottleneck": busiest["name"],
+            "stages": stages
+        }
+
+    ## Private Executor ---------------------------
+    def __force_abort(self):
+        for w in self.workers:
+            if not w.finished:
+                w.abort()
+
+    def __spawn(self, name: str, func: FunctionType, *args):
+        w = ThreadWorker(func, name, on_abort=self.abort, args=args)
+        self.workers.append(w)
+        w.work()
+
+    def __feed(self, items: Iterable):
+        inbox = self.stages[0].inbox
+        try:
+            for item in items:
+                if not inbox.put(item):
+                    return
+        finally:
+            inbox.close()
+
+    def __emit(self, s: Stage, outbox: Optional[_Channel], result: Any) -> int:
+        """
+        Send a result to the next stage, return the time blocked on a full queue
+        """
+        if result is None:
+            return 0
+        started = time.perf_counter_ns()
+        if outbox is not None and not outbox.put(result):
+            return 0
+        s._record(emitted=1)
+        return time.perf_counter_ns() - started
+
+    def __fail(self, s: Stage, error: Exception):
+        s._fail(error)
+        logger.debug(f"[{self.name}.{s.name}] StageError {error}")
+        if s.on_error == "abort":
+            self.abort()
+
+    def __stop(self, s: Stage, outbox: Optional[_Channel]):
+        """
+        Close the output of one worker of the stage, the next stage ends once all of them are closed
+        """
+        if outbox is not None:
+            outbox.close()
+        with self.__lock:
+            s.running -= 1
+            last = s.running == 0
+        if last:
+            s.end_ns = time.perf_counter_ns()
+            if s in self.__pools:
+                self.__pools[s].shutdown(wait=False)
+
+    def __inputs(self, s: Stage):
+        """
+        Yield the items of the stage and record the time waiting for them, a source stage gets one call
+        """
+        if s.inbox is None:
+            yield ()
+            return
+        while True:
+            started = time.perf_counter_ns()
+            item = s.inbox.get()
+            s._record(starved_ns=time.perf_counter_ns() - started)
+            if item is END:
+                return
+            yield (item,)
+
+    def __run_thread(self, s: Stage, outbox: Optional[_Channel]):
+        generator = is_generator_function(s.func)
+        try:
+            for args in self.__inputs(s):
+                started, blocked = time.perf_counter_ns(), 0
+                try:
+                    result = s.func(*args)
+                    if generator:
+                        for item in result:
+                            blocked += self.__emit(s, outbox, item)
+                            if self.is_aborted:
+                                break
+                    else:
+                        blocked += self.__emit(s, outbox, result)
+                except Exception as e:
+                    self.__fail(s, e)
+                s._record(received=len(args), busy_ns=time.perf_counter_ns() - started - blocked, blocked_ns=blocked)
+        finally:
+            self.__stop(s, outbox)
+
+    def __run_process(self, s: Stage, run: FunctionType, outbox: Optional[_Channel]):
+        generator = is_generator_function(s.func)
+        try:
+            for args in self.__inputs(s):
+                started, blocked = time.perf_counter_ns(), 0
+                handle = None
+                try:
+                    handle = run(*args)
+                    if generator:
+                        for item in handle:
+                            blocked += self.__emit(s, outbox, item)
+                            if self.is_aborted:
+                                break
+                    else:
+                        # wait in steps, an aborted stage worker gets its exception between them
+                        while not handle.wait(timeout=0.1):
+                            pass
+                        if handle.error is not None:
+                            raise handle.error
+                        blocked += self.__emit(s, outbox, handle.result)
+                except Exception as e:
+                    self.__fail(s, e)
+                finally:
+                    if handle is not None and not handle.finished and self.is_aborted:
+                        handle.kill()
+                s._record(received=len(args), busy_ns=time.perf_counter_ns() - started - blocked, blocked_ns=blocked)
+        finally:
+            self.__stop(s, outbox)
+
+    async def __run_async(self, s: Stage, outbox: Optional[_Channel]):
+        """
+        Run the workers of the stage as tasks of one event loop, the queues are waited on in its executor
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        async def emit(item) -> int:
+            if outbox is not None and len(outbox) >= outbox.maxsize:
+                return await loop.run_in_executor(None, self.__emit, s, outbox, item)
+            return self.__emit(s, outbox, item)
+        async def consume():
+            while True:
+                if s.inbox is None:
+                    args = ()
+                else:
+                    started = time.perf_counter_ns()
+                    item = await loop.run_in_executor(None, s.inbox.get)
+                    s._record(starved_ns=time.perf_counter_ns() - started)
+                    if item is END:
+                        return
+                    args = (item,)
+                started, blocked = time.perf_counter_ns(), 0
+                try:
+                    result = await maybe_await(s.func(*args))
+                    if hasattr(result, "__aiter__"):
+                        async for item in result:
+                            blocked += await emit(item)
+                            if self.is_aborted:
+                                break
+                    elif is_generator_function(s.func):
+                        for item in result:
+                            blocked += await emit(item)
+                            if self.is_aborted:
+                                break
+                    else:
+                        blocked += await emit(result)
+                except Exception as e:
+                    self.__fail(s, e)
+                s._record(received=len(args), busy_ns=time.perf_counter_ns() - started - blocked, blocked_ns=blocked)
+                if s.inbox is None:
+                    return
+        try:
+            await asyncio.gather(*[consume() for _ in range(s.workers)])
+        finally:
+            for _ in range(s.workers):
+                self.__stop(s, outbox)
@@ -0,0 +1,192 @@
+import os
+import time
+import threading
+import logging
+from typing import Callable, Optional
+
+from .metrics import LoadMeter
+from .scheduler import PriorityTaskQueue
+
+
+logger = logging.getLogger()
+
+
+def _register_atexit(func: Callable):
+    """
+    Run `func` before the interpreter joins the non-daemon threads,
+    falling back to the regular atexit hook on older pythons.
+
+    Forked children inherit the hook, so it only runs in the registering process
+    """
+    pid = os.getpid()
+    def hook():
+        if os.getpid() == pid:
+            func()
+    try:
+        threading._register_atexit(hook)
+    except AttributeError:
+        import atexit
+        atexit.register(hook)
+
+
+class ThreadPool():
+    """
+    ThreadPool class -> pool
+
+    A named and bounded set of reusable background threads.
+    Threads are started lazily (up to `max_workers`) and kept alive to run the next tasks,
+    the queued tasks are picked by priority
+    """
+
+    def __init__(self, name: str, max_workers: Optional[int] = None, aging_rate: float = 1.0):
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        assert max_workers > 0, "max_workers must be greater than 0"
+
+        # private attributes
+        self.__tasks = PriorityTaskQueue(aging_rate)
+        self.__lock = threading.Lock()
+        self.__idle = 0
+        self.__counts = 0
+        self.__retiring = 0
+
+        # public attributes
+        self.name = name
+        self.max_workers = max_workers
+        self.threads = set()
+        self.is_shutdown = False
+        self.load = LoadMeter()
+
+    ## Properties ---------------------------
+
+    @property
+    def size(self):
+        return len(self.threads)
+
+    @property
+    def idle(self):
+        return self.__idle
+
+    @property
+    def pending(self):
+        return self.__tasks.qsize()
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "size": self.size,
+            "idle": self.idle,
+            "pending": self.pending,
+            "is_shutdown": self.is_shutdown
+        }
+
+    ## Private Executor ---------------------------
+    def __needs_thread(self) -> bool:
+        """
+        Whether the queued tasks need one more thread, the lock must be held by the caller
+        """
+        return (
+            self.__idle < self.__tasks.qsize() - self.__retiring
+            and len(self.threads) - self.__retiring < self.max_workers
+        )
+
+    def __spawn(self):
+        """
+        Start a new pool thread, the lock must be held by the caller
+        """
+        self.__counts += 1
+        th = threading.Thread(
+            target=self.__run,
+            name=f"{self.name}-{self.__counts}",
+            daemon=True
+        )
+        self.threads.add(th)
+        th.start()
+
+    def __run(self):
+        """
+        Pick the queued tasks and run them until a stop sentinel is received
+        """
+        try:
+            while True:
+                try:
+                    with self.__lock:
+                        self.__idle += 1
+                    task = self.__tasks.get()
+                    with self.__lock:
+                        self.__idle -= 1
+                        if task is None:
+                            if self.__retiring:
+                                self.__retiring -= 1
+                            # no longer counted as retiring, so no longer counted as a thread either
+                            self.threads.discard(threading.current_thread())
+                        # a task submitted before this thread left the idle count got no new thread
+                        if not self.is_shutdown and self.__needs_thread():
+                            self.__spawn()
+                    if task is None:
+                        break
+                    queued_ns, task = task
+                    start_ns = time.perf_counter_ns()
+                    self.load.on_start(queued_ns, start_ns)
+                    try:
+                        task()
+                    finally:
+                        self.load.on_finish(start_ns, time.perf_counter_ns())
+                except SystemExit:
+                    # an aborted task must not take down the pool thread
+                    continue
+                except Exception as e:
+                    logger.debug(f"[{self.name}] TaskError {e}")
+        finally:
+            with self.__lock:
+                self.threads.discard(threading.current_thread())
+
+    ## Public Methods ---------------------------
+    def submit(self, task: Callable, priority: float = 0):
+        """
+        Queue a callable to be run by one of the pool threads, higher priorities run first
+        """
+        if self.is_shutdown:
+            raise RuntimeError(f"cannot submit a task to pool `{self.name}` after shutdown")
+        queued_ns = time.perf_counter_ns()
+        self.load.on_queued(queued_ns)
+        self.__tasks.put((queued_ns, task), priority)
+        with self.__lock:
+            if self.__needs_thread():
+                self.__spawn()
+
+    def resize(self, max_workers: int):
+        """
+        Change the maximum number of threads.
+        Extra threads are stopped once they finished their current task
+        """
+        assert max_workers > 0, "max_workers must be greater than 0"
+        with self.__lock:
+            # the threads already asked to stop are not counted twice
+            excess = len(self.threads) - self.__retiring - max_workers
+            self.max_workers = max_workers
+            for i in range(excess):
+                self.__retiring += 1
+                self.__tasks.put(None, float("inf"))
+            grow = min(
+                self.max_workers - len(self.threads) + self.__retiring,
+                self.__tasks.qsize() - self.__retiring - self.__idle
+            )
+            for i in range(grow):
+                self.__spawn()
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop all the pool threads after the queued tasks are done
+        """
+        with self.__lock:
+            self.is_shutdown = True
+            self.__retiring = 0
+            threads = list(self.threads)
+            for th in threads:
+                self.__tasks.put(None, float("-inf"))
+        if wait:
+            for th in threads:
+                if th is not threading.current_thread():
+                    th.join()
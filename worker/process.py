@@ -1,10 +1,31 @@
 import asyncio
+import importlib
 import inspect
-import json
 import logging
-from multiprocessing import Process, Pipe
+import multiprocessing
+import os
+import time
+import itertools
+import threading
+from collections import deque
+from multiprocessing import Process
 from multiprocessing.connection import Connection
+from multiprocessing.context import BaseContext
 from types import FunctionType
+from typing import Any, Optional, Union
+
+from .autoscale import ScalingPolicy
+from .cache import LRU, cached
+from .metrics import LoadMeter
+from .pool import _register_atexit
+from .mapping import chunked, iter_chunk_results
+from .singleflight import SingleFlight
+from .serializer import Serializer, get_serializer, send_payload, recv_payload
+from .shared_memory import SharedMemoryTransport, get_transport
+from .scheduler import PriorityTaskQueue
+from .stream import ResultStream, asend_stream, is_async_function, iter_result, maybe_await, send_stream
+from .timer import WorkerTimeout, pop_timeout
+from .worker import ThreadWorkerManager
 
 
 logger = logging.getLogger()
@@ -14,102 +35,942 @@ class ProcessConnector:
     """
     A process connector classes.
     """
-    def __init__(self, function):
+    pools = set()
+    stream_size = 64
+    stream_chunksize = 64
+    forkserver_preload = ["__main__"]
+
+    def __init__(
+        self,
+        function,
+        serializer: Optional[Serializer] = None,
+        shared_memory: Optional[SharedMemoryTransport] = None,
+        timeout: Optional[float] = None,
+        context: Optional[BaseContext] = None
+    ):
         self.parent_con, self.child_con = None, None
         self.pid = 0
         self.proc = None
         self.raw_func = function
+        self.context = context or multiprocessing.get_context()
         self.is_async = inspect.iscoroutinefunction(function)
+        self.serializer = get_serializer(serializer)
+        self.transport = get_transport(shared_memory)
+        self.segments = []
         self.result = None
+        self.error = None
+        self.timeout = timeout
+        self.is_timed_out = False
+        self.is_stream = False
+        self.__deadline = None
+        self.__pending = deque()
+        self.__result_callbacks = []
+        self.__done_callbacks = []
+        self.__finished = False
+        self.__lock = threading.RLock()
+        self.__callbacks_lock = threading.Lock()
+
+    def __await__(self):
+        """
+        Await the process result from a coroutine without blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        while self.__is_open():
+            yield from self.__readable(loop).__await__()
+            self.__receive()
+        return self.result
+
+    def __iter__(self):
+        """
+        Iterate the items of a generator function while the child is producing them.
+        A function returning an iterable is iterated once its result is received
+        """
+        while self.__pending or self.__is_open():
+            while self.__pending:
+                yield self.__pending.popleft()
+            if self.__is_open():
+                self.__receive()
+        if not self.is_stream:
+            yield from iter_result(self.result, f"process {self.pid}")
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        while self.__pending or self.__is_open():
+            while self.__pending:
+                yield self.__pending.popleft()
+            if self.__is_open():
+                await self.__readable(loop)
+                self.__receive()
+        if not self.is_stream:
+            for item in iter_result(self.result, f"process {self.pid}"):
+                yield item
+
+    def __is_open(self) -> bool:
+        return self.parent_con is not None and not self.parent_con.closed
+
+    def __readable(self, loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+        """
+        Return a future resolved once the next message can be received
+        """
+        future = loop.create_future()
+        fd = self.parent_con.fileno()
+        def on_readable():
+            loop.remove_reader(fd)
+            if not future.done():
+                future.set_result(None)
+        try:
+            loop.add_reader(fd, on_readable)
+        except NotImplementedError:
+            # the event loop has no reader support (e.g. proactor on windows)
+            future = loop.run_in_executor(None, self.parent_con.poll, None)
+        return future
+
+    def __receive(self):
+        """
+        Receive one message from the child, the streamed items are kept until they are iterated
+        """
+        with self.__lock:
+            # another thread sharing this connector may have received the result already
+            if not self.__is_open():
+                return
+            try:
+                status, payload = recv_payload(self.parent_con, self.serializer)
+            except EOFError:
+                logger.debug(f"process {self.pid} exited without a result")
+                status, payload = None, None
+                if self.is_timed_out:
+                    self.error = WorkerTimeout(f"process {self.pid} timed out after {self.timeout}s")
+            if status == "items":
+                self.is_stream = True
+                self.__pending.extend(payload)
+                return
+            if status == "end":
+                self.is_stream = True
+            self.result = payload
+            self.parent_con.close()
+            SharedMemoryTransport.unlink(self.segments)
+            if self.__deadline is not None:
+                self.__deadline.cancel()
+            with self.__callbacks_lock:
+                self.__finished = True
+                callbacks, self.__done_callbacks = self.__done_callbacks, []
+        if status == "ok":
+            for callback in self.__result_callbacks:
+                callback(payload)
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.debug(f"process {self.pid} DoneCallbackError {e}")
+
+    @property
+    def finished(self):
+        return self.__finished
+
+    def add_done_callback(self, callback: FunctionType):
+        """
+        Call `callback(connector)` once the result is received, immediately if it is already received
+        """
+        with self.__callbacks_lock:
+            if not self.__finished:
+                self.__done_callbacks.append(callback)
+                return
+        callback(self)
+
+    def _add_result_callback(self, callback: FunctionType):
+        """
+        Call `callback(result)` once a result is received, a failed call has none
+        """
+        self.__result_callbacks.append(callback)
+
+    @staticmethod
+    def send_result(
+        conn: Connection,
+        result,
+        serializer: Serializer,
+        transport: Optional[SharedMemoryTransport] = None
+    ):
+        """
+        Send a result as ("ok", result). A generator is sent as ("items", [...]) chunks
+        followed by ("end", its return value)
+        """
+        send = lambda message: send_payload(conn, message, serializer, transport)
+        if inspect.isasyncgen(result):
+            asyncio.run(asend_stream(send, result, ProcessConnector.stream_chunksize))
+            send(("end", None))
+        elif inspect.isgenerator(result):
+            send(("end", send_stream(send, result, ProcessConnector.stream_chunksize)))
+        else:
+            send(("ok", result))
 
     def kill(self):
         self.proc.kill()
 
-    def execute_in_process(self, conn: Connection):
+    def __expire(self):
+        """
+        Kill the child once its deadline is reached, called on the manager timer thread
+        """
+        if self.finished or not self.proc.is_alive():
+            return
+        self.is_timed_out = True
+        self.kill()
+
+    @staticmethod
+    def execute_in_process(
+        function: FunctionType,
+        conn: Connection,
+        serializer: Serializer,
+        transport: Optional[SharedMemoryTransport] = None
+    ):
         try:
-            input_params = conn.recv()
+            input_params = recv_payload(conn, serializer)
             args = input_params.get("args", [])
             kwargs = input_params.get("kwargs", {})
-            result = self.raw_func(*args, **kwargs)
-            try:
-                json.dumps(result)
-            except Exception as e:
-                logger.debug(e)
-                result = {}
-            conn.send(result)
+            result = function(*args, **kwargs)
+            ProcessConnector.send_result(conn, result, serializer, transport)
         except Exception as error:
             logger.debug(error)
             raise error
         finally:
             conn.close()
 
-    async def execute_in_process_event_loop(self, conn: Connection):
+    @staticmethod
+    async def execute_in_process_event_loop(
+        function: FunctionType,
+        conn: Connection,
+        serializer: Serializer,
+        transport: Optional[SharedMemoryTransport] = None
+    ):
         try:
-            input_params = conn.recv()
+            input_params = recv_payload(conn, serializer)
             args = input_params.get("args", [])
             kwargs = input_params.get("kwargs", {})
-            result = await self.raw_func(*args, **kwargs)
-            try:
-                json.dumps(result)
-            except Exception as e:
-                logger.debug(e)
-                result = {}
-            conn.send(result)
+            result = await maybe_await(function(*args, **kwargs))
+            if inspect.isasyncgen(result):
+                send = lambda message: send_payload(conn, message, serializer, transport)
+                await asend_stream(send, result, ProcessConnector.stream_chunksize)
+                send(("end", None))
+            else:
+                ProcessConnector.send_result(conn, result, serializer, transport)
         except Exception as error:
             logger.debug(error)
             raise error
         finally:
             conn.close()
 
+    @staticmethod
+    def execute_in_event_loop(
+        function: FunctionType,
+        conn: Connection,
+        serializer: Serializer,
+        transport: Optional[SharedMemoryTransport] = None
+    ):
+        asyncio.run(ProcessConnector.execute_in_process_event_loop(function, conn, serializer, transport))
+
     def create_and_run(self, *args, **kwargs):
-        self.parent_con, self.child_con = Pipe()
-        if self.is_async:
-            self.proc = Process(
-                target=lambda: (
-                    asyncio.run(
-                        self.execute_in_process_event_loop(
-                            self.child_con
-                        )
-                    )
-                )
-            )
-        else:
-            self.proc = Process(
-                target=lambda: (
-                    self.execute_in_process(
-                        self.child_con
-                    )
-                )
-            )
+        self.parent_con, self.child_con = self.context.Pipe()
+        target = ProcessConnector.execute_in_event_loop if self.is_async else ProcessConnector.execute_in_process
+        self.proc = self.context.Process(
+            target=target,
+            args=(ProcessConnector.child_function(self.raw_func, self.context), self.child_con, self.serializer, self.transport)
+        )
         self.proc.start()
-        self.parent_con.send({"args": args, "kwargs": kwargs})
+        self.pid = self.proc.pid
+        if self.timeout is not None:
+            self.__deadline = ThreadWorkerManager.deadlines.schedule(self.timeout, self.__expire)
+        # the child owns its end now, closing ours lets `recv` see EOF if the child dies
+        self.child_con.close()
+        self.segments = send_payload(self.parent_con, {"args": args, "kwargs": kwargs}, self.serializer, self.transport)
         return self.parent_con
 
     @property
     def ret(self):
-        if self.parent_con and not self.parent_con.closed and self.child_con.closed:
-            self.result = self.parent_con.recv()
-            self.parent_con.close()
+        if self.__is_open() and self.parent_con.poll():
+            self.__receive()
         return self.result
 
     def wait(self, timeout=10):
+        # collect the result first, a child can't exit while its result fills the pipe
+        while self.__is_open() and self.parent_con.poll(timeout):
+            self.__receive()
         self.proc.join(timeout)
 
     def receive(self):
-        return self.parent_con.recv()
+        while self.__is_open():
+            self.__receive()
+        return self.result
+
+    @staticmethod
+    def get_context(start_method: Optional[str] = None, preload: Optional[list] = None) -> BaseContext:
+        """
+        Return the multiprocessing context of a start method, the platform default without it
+
+        :params start_method: str -> "fork", "forkserver" or "spawn"
+        :params preload: list -> modules imported once in the forkserver (in this process with fork),
+            so the children start with them already imported instead of importing them each time
+        """
+        context = multiprocessing.get_context(start_method)
+        if preload:
+            method = context.get_start_method()
+            if method == "forkserver":
+                # the forkserver is shared by the whole process, it gets all the requested modules.
+                # It only applies if the forkserver is not started yet
+                for module in preload:
+                    if module not in ProcessConnector.forkserver_preload:
+                        ProcessConnector.forkserver_preload.append(module)
+                context.set_forkserver_preload(ProcessConnector.forkserver_preload)
+            elif method == "fork":
+                for module in preload:
+                    importlib.import_module(module)
+            else:
+                logger.debug(f"preload is ignored with the {method} start method")
+        return context
+
+    @staticmethod
+    def child_function(function: FunctionType, context: BaseContext):
+        """
+        Return what is sent to a child to run `function`. Without fork the child imports it
+        by its module and name, a decorated function cannot be pickled as its name is the wrapper
+        """
+        if context.get_start_method() == "fork":
+            return function
+        assert "<locals>" not in function.__qualname__, \
+            f"`{function.__qualname__}` must be defined at module level for the {context.get_start_method()} start method"
+        return _FunctionReference(function.__module__, function.__qualname__)
+
+    @staticmethod
+    def shutdown_pools(wait: bool = True):
+        """
+        Shut down all the process pools
+        """
+        while ProcessConnector.pools:
+            ProcessConnector.pools.pop().shutdown(wait)
 
     @staticmethod
-    def create_process(function: FunctionType):
+    def create_process(
+        function: FunctionType,
+        pool_size: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = None,
+        serializer: Optional[Serializer] = None,
+        shared_memory: Optional[SharedMemoryTransport] = None,
+        priority: float = 0,
+        cache: Optional[LRU] = None,
+        singleflight: bool = False,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        start_method: Optional[str] = None,
+        preload: Optional[list] = None,
+        batch_size: Optional[int] = None,
+        max_latency_ms: float = 10,
+        autoscale: Union[bool, dict, ScalingPolicy, None] = None
+    ):
         assert isinstance(function, FunctionType), "only accept function for process"
-        if inspect.iscoroutinefunction(function):
+        assert not autoscale or pool_size, "autoscale requires pool_size"
+        assert not batch_size or not is_async_function(function), "batch_size does not support coroutine functions"
+        assert cache is None or not (inspect.isgeneratorfunction(function) or inspect.isasyncgenfunction(function)), \
+            "cache does not support generator functions"
+        assert not singleflight or not (inspect.isgeneratorfunction(function) or inspect.isasyncgenfunction(function)), \
+            "singleflight does not support generator functions"
+        serializer = get_serializer(serializer)
+        shared_memory = get_transport(shared_memory)
+        context = ProcessConnector.get_context(start_method, preload)
+        # fail on the decoration if the children cannot import the function
+        ProcessConnector.child_function(function, context)
+        if pool_size:
+            pool = ProcessPool(function, pool_size, max_tasks_per_child, serializer, shared_memory, context)
+            # a function can back several pools, each of them is shut down at exit
+            ProcessConnector.pools.add(pool)
+            if autoscale:
+                ThreadWorkerManager.autoscale(pool, autoscale)
+            if is_async_function(function):
+                async def run_in_pool(*args, **kwargs):
+                    call_priority = kwargs.pop("_priority", priority)
+                    call_timeout = pop_timeout(kwargs, timeout, deadline)
+                    return PooledProcessConnector(function, pool, call_priority, call_timeout).create_and_run(*args, **kwargs)
+            else:
+                def run_in_pool(*args, **kwargs):
+                    call_priority = kwargs.pop("_priority", priority)
+                    call_timeout = pop_timeout(kwargs, timeout, deadline)
+                    return PooledProcessConnector(function, pool, call_priority, call_timeout).create_and_run(*args, **kwargs)
+            run_in_pool = ThreadWorkerManager._batch_calls(run_in_pool, function, batch_size, max_latency_ms)
+            if singleflight:
+                run_in_pool = SingleFlight(pool.name).wrap(run_in_pool)
+            run_in_pool = ProcessConnector._cache_process(run_in_pool, function, cache)
+            run_in_pool.pool = pool
+            run_in_pool.__wrapped__ = function
+            if not batch_size:
+                ProcessConnector._bind_map(run_in_pool, function, pool)
+            return run_in_pool
+        if is_async_function(function):
             async def run_in_different_proc(*args, **kwargs):
-                pc = ProcessConnector(function)
+                kwargs.pop("_priority", None)
+                pc = ProcessConnector(function, serializer, shared_memory, pop_timeout(kwargs, timeout, deadline), context)
                 pc.create_and_run(*args, **kwargs)
                 return pc
-            return run_in_different_proc
         else:
             def run_in_different_proc(*args, **kwargs):
-                pc = ProcessConnector(function)
+                kwargs.pop("_priority", None)
+                pc = ProcessConnector(function, serializer, shared_memory, pop_timeout(kwargs, timeout, deadline), context)
                 pc.create_and_run(*args, **kwargs)
                 return pc
-            return run_in_different_proc
+        run_in_different_proc = ThreadWorkerManager._batch_calls(run_in_different_proc, function, batch_size, max_latency_ms)
+        if singleflight:
+            run_in_different_proc = SingleFlight(f"{function.__module__}.{function.__qualname__}").wrap(run_in_different_proc)
+        run_in_different_proc = ProcessConnector._cache_process(run_in_different_proc, function, cache)
+        run_in_different_proc.__wrapped__ = function
+        if not batch_size:
+            ProcessConnector._bind_map(run_in_different_proc, function, None, serializer, shared_memory, context)
+        return run_in_different_proc
+
+    @staticmethod
+    def _cache_process(run: FunctionType, function: FunctionType, cache: Optional[LRU] = None) -> FunctionType:
+        """
+        Return the cached calls of a decorated process function from `cache`
+        """
+        if cache is None:
+            return run
+        watch = lambda connector, store: connector._add_result_callback(store)
+        return cached(cache, f"{function.__module__}.{function.__qualname__}", run, watch)
+
+    @staticmethod
+    def _bind_map(
+        run: FunctionType,
+        function: FunctionType,
+        pool: Optional["ProcessPool"] = None,
+        serializer: Optional[Serializer] = None,
+        shared_memory: Optional[SharedMemoryTransport] = None,
+        context: Optional[BaseContext] = None
+    ):
+        """
+        Attach `map` and `starmap` to a decorated process function
+        """
+        def map(iterable, chunksize: int = 1, ordered: bool = True, max_inflight: Optional[int] = None):
+            """
+            Send the items to the children in chunks (one message per chunk) and iterate the results lazily
+            """
+            return ProcessConnector.map_process(function, iterable, chunksize, ordered, max_inflight, "map", pool, serializer, shared_memory, context)
+        def starmap(iterable, chunksize: int = 1, ordered: bool = True, max_inflight: Optional[int] = None):
+            """
+            Like `map` but every item is unpacked as the function arguments
+            """
+            return ProcessConnector.map_process(function, iterable, chunksize, ordered, max_inflight, "starmap", pool, serializer, shared_memory, context)
+        run.map = map
+        run.starmap = starmap
+
+    @staticmethod
+    def map_process(
+        function: FunctionType,
+        iterable,
+        chunksize: int = 1,
+        ordered: bool = True,
+        max_inflight: Optional[int] = None,
+        mode: str = "map",
+        pool: Optional["ProcessPool"] = None,
+        serializer: Optional[Serializer] = None,
+        shared_memory: Optional[SharedMemoryTransport] = None,
+        context: Optional[BaseContext] = None
+    ):
+        """
+        Split the items into chunks and run them on a process pool, a temporary one is used without `pool`
+
+        :params ordered: bool -> yield the results in input order, otherwise in completion order
+        :params max_inflight: int -> maximum chunks sent at once, default to twice the pool size
+        """
+        temporary = pool is None
+        if temporary:
+            pool = ProcessPool(function, max_inflight or os.cpu_count() or 1, None, serializer, shared_memory, context)
+        if max_inflight is None:
+            max_inflight = pool.pool_size * 2
+        def submit(chunk):
+            pc = PooledProcessConnector(function, pool)
+            pool.submit(pc, chunk, {}, mode)
+            return pc
+        def collect(pc):
+            if pc.error is not None:
+                raise pc.error
+            return pc.ret
+        try:
+            yield from iter_chunk_results(submit, collect, chunked(iterable, chunksize), ordered, max_inflight)
+        finally:
+            if temporary:
+                pool.shutdown()
+
+
+class ProcessKilled(Exception):
+    """
+    Raised as the error of a pooled task whose child process died before answering
+    """
+
+
+class PooledProcessConnector(ProcessConnector):
+    """
+    A process connector which runs its function on a warm `ProcessPool` child
+    """
+    def __init__(
+        self,
+        function,
+        pool: "ProcessPool",
+        priority: float = 0,
+        timeout: Optional[float] = None,
+        mode: str = "call"
+    ):
+        super().__init__(function, pool.serializer, pool.transport, timeout)
+        self.pool = pool
+        self.priority = priority
+        self.mode = mode
+        self.is_killed = False
+        self.slot = None
+        self.__deadline = None
+        self.__done = threading.Event()
+        self.__lock = threading.Lock()
+        self.__callbacks = []
+        self.__stream = None
+
+    @property
+    def finished(self):
+        return self.__done.is_set()
+
+    def create_and_run(self, *args, **kwargs):
+        if self.timeout is not None:
+            # counted from the call, the time waiting for a free child is part of the budget
+            self.__deadline = ThreadWorkerManager.deadlines.schedule(self.timeout, self.__expire)
+        self.pool.submit(self, args, kwargs, self.mode, self.priority)
+        return self
+
+    def _set_running(self, slot: "_PoolSlot", proc: Process):
+        self.slot = slot
+        self.proc = proc
+        self.pid = proc.pid
+
+    def __open_stream(self, producer: bool = False) -> Optional[ResultStream]:
+        with self.__lock:
+            if self.__stream is None:
+                if not producer and self.__done.is_set():
+                    return None
+                self.__stream = ResultStream(ProcessConnector.stream_size)
+            if producer:
+                self.__stream.is_stream = self.is_stream = True
+            return self.__stream
+
+    def _put_items(self, items: list):
+        """
+        Forward streamed items to the consumer, block the feeder while the consumer is behind
+        """
+        stream = self.__open_stream(producer=True)
+        for item in items:
+            stream.put(item, lambda: self.is_killed)
+
+    def __iter__(self):
+        stream = self.__open_stream()
+        if stream is not None:
+            yield from stream
+            if stream.is_stream:
+                return
+        if self.error is not None:
+            raise self.error
+        yield from iter_result(self.result, f"[{self.pool.name}]")
+
+    async def __aiter__(self):
+        stream = self.__open_stream()
+        if stream is not None:
+            async for item in stream:
+                yield item
+            if stream.is_stream:
+                return
+        if self.error is not None:
+            raise self.error
+        for item in iter_result(self.result, f"[{self.pool.name}]"):
+            yield item
+
+    def _set_result(self, result=None, error=None):
+        if error is not None and self.is_timed_out:
+            error = WorkerTimeout(f"[{self.pool.name}] timed out after {self.timeout}s")
+        if self.__deadline is not None:
+            self.__deadline.cancel()
+        self.result = result
+        self.error = error
+        if error is not None:
+            logger.debug(f"[{self.pool.name}] {error}")
+        with self.__lock:
+            self.__done.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+            if self.__stream is not None:
+                self.__stream.close()
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.debug(f"[{self.pool.name}] DoneCallbackError {e}")
+
+    def add_done_callback(self, callback: FunctionType):
+        """
+        Call `callback(connector)` once the task is finished, immediately if it is already finished
+        """
+        with self.__lock:
+            if not self.__done.is_set():
+                self.__callbacks.append(callback)
+                return
+        callback(self)
+
+    def _add_result_callback(self, callback: FunctionType):
+        self.add_done_callback(lambda c: callback(c.result) if c.error is None and not c.is_stream else None)
+
+    def __await__(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        def resolve():
+            if not future.done():
+                future.set_result(self.result)
+        self.add_done_callback(lambda c: loop.call_soon_threadsafe(resolve))
+        return (yield from future.__await__())
+
+    def kill(self):
+        """
+        Kill the child running this task, the pool replaces it with a fresh one
+        """
+        self.is_killed = True
+        if self.slot is not None:
+            # the child may already run the next task
+            self.slot.kill(self)
+
+    def __expire(self):
+        """
+        Kill the child running this task once its deadline is reached, the pool replaces the child
+        """
+        if self.finished:
+            return
+        self.is_timed_out = True
+        self.kill()
+
+    @property
+    def ret(self):
+        return self.result
+
+    def wait(self, timeout=10):
+        return self.__done.wait(timeout)
+
+    def receive(self):
+        self.__done.wait()
+        return self.result
+
+
+class ProcessPool:
+    """
+    A pool of pre-forked child processes.
+
+    Every child keeps a long-lived pipe with the parent and is recycled after `max_tasks_per_child` tasks
+    """
+    def __init__(
+        self,
+        function: FunctionType,
+        pool_size: int,
+        max_tasks_per_child: Optional[int] = None,
+        serializer: Optional[Serializer] = None,
+        shared_memory: Optional[SharedMemoryTransport] = None,
+        context: Optional[BaseContext] = None
+    ):
+        assert pool_size > 0, "pool_size must be greater than 0"
+        assert max_tasks_per_child is None or max_tasks_per_child > 0, "max_tasks_per_child must be greater than 0"
+        self.name = f"{function.__module__}.{function.__qualname__}"
+        self.function = function
+        self.is_async = inspect.iscoroutinefunction(function)
+        self.pool_size = pool_size
+        self.max_tasks_per_child = max_tasks_per_child
+        self.serializer = get_serializer(serializer)
+        self.transport = get_transport(shared_memory)
+        self.context = context or multiprocessing.get_context()
+        self.target = ProcessConnector.child_function(function, self.context)
+        self.tasks = PriorityTaskQueue()
+        self.slots = []
+        self.is_started = False
+        self.is_shutdown = False
+        self.load = LoadMeter()
+        self.__lock = threading.Lock()
+        self.__counts = itertools.count()
+        self.__retiring = 0
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "pool_size": self.pool_size,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "alive": sum(1 for slot in self.slots if slot.proc and slot.proc.is_alive()),
+            "pending": self.tasks.qsize(),
+            "is_shutdown": self.is_shutdown
+        }
+
+    def start(self):
+        """
+        Fork all the children, this is done automatically on the first submitted task
+        """
+        with self.__lock:
+            if self.is_started:
+                return
+            self.is_started = True
+            for i in range(self.pool_size):
+                slot = _PoolSlot(self, next(self.__counts))
+                self.slots.append(slot)
+                slot.start()
+
+    def submit(self, connector: PooledProcessConnector, args: tuple, kwargs: dict, mode: str = "call", priority: float = 0):
+        """
+        Queue a task, `mode` is "call", "map"/"starmap" where `args` is a chunk of items,
+        or "method" where `args` starts with the name of the actor method.
+        Higher priorities are sent to the children first
+        """
+        if self.is_shutdown:
+            raise RuntimeError(f"cannot submit a task to process pool `{self.name}` after shutdown")
+        self.start()
+        queued_ns = time.perf_counter_ns()
+        self.load.on_queued(queued_ns)
+        self.tasks.put((connector, mode, args, kwargs, queued_ns), priority)
+
+    def resize(self, pool_size: int):
+        """
+        Change the number of children.
+        The new children are started by their feeder thread, the extra ones stop once they finished their current task
+        """
+        assert pool_size > 0, "pool_size must be greater than 0"
+        with self.__lock:
+            if self.is_shutdown:
+                return
+            self.pool_size = pool_size
+            if not self.is_started:
+                return
+            excess = len(self.slots) - self.__retiring - pool_size
+            for i in range(excess):
+                self.__retiring += 1
+                self.tasks.put(None, float("inf"))
+            for i in range(-excess):
+                slot = _PoolSlot(self, next(self.__counts))
+                self.slots.append(slot)
+                slot.thread.start()
+
+    def _remove_slot(self, slot: "_PoolSlot"):
+        with self.__lock:
+            if slot in self.slots:
+                self.slots.remove(slot)
+            if not self.is_shutdown and self.__retiring:
+                self.__retiring -= 1
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the children after the queued tasks are done
+        """
+        with self.__lock:
+            if self.is_shutdown:
+                return
+            self.is_shutdown = True
+            slots = list(self.slots)
+            for slot in slots:
+                self.tasks.put(None, float("-inf"))
+        if wait:
+            for slot in slots:
+                slot.thread.join()
+
+    @staticmethod
+    def call(function: FunctionType, is_async: bool, calls: list) -> list:
+        """
+        Run the function for every (args, kwargs) in `calls`, coroutines share one event loop
+        """
+        if not is_async:
+            return [function(*args, **kwargs) for args, kwargs in calls]
+        async def gather():
+            return await asyncio.gather(*[function(*args, **kwargs) for args, kwargs in calls])
+        return asyncio.run(gather())
+
+    @staticmethod
+    def call_method(instance: Any, name: Optional[str], args: tuple, kwargs: dict) -> Any:
+        """
+        Call a method of an actor instance, a plain attribute is returned as is.
+        Without `name` it only checks the instance is created
+        """
+        if name is None:
+            return None
+        attribute = getattr(instance, name)
+        if not callable(attribute):
+            return attribute
+        result = attribute(*args, **kwargs)
+        if inspect.iscoroutine(result):
+            result = asyncio.run(result)
+        return result
+
+    @staticmethod
+    def run_child(
+        function: FunctionType,
+        is_async: bool,
+        conn: Connection,
+        max_tasks: Optional[int],
+        serializer: Serializer,
+        transport: Optional[SharedMemoryTransport] = None
+    ):
+        """
+        Child process main loop, answer the tasks sent through `conn` until it is recycled.
+        For an actor `function` creates its instance, the "method" tasks call its methods
+        """
+        done = 0
+        instance = None
+        try:
+            while max_tasks is None or done < max_tasks:
+                try:
+                    task = recv_payload(conn, serializer)
+                except EOFError:
+                    break
+                if task is None:
+                    break
+                mode, args, kwargs = task
+                try:
+                    if mode == "call":
+                        result = ProcessPool.call(function, is_async, [(args, kwargs)])[0]
+                    elif mode == "method":
+                        if instance is None:
+                            # created by the first call, again in a child replacing a killed one
+                            instance = function()
+                        result = ProcessPool.call_method(instance, args[0], args[1:], kwargs)
+                    elif mode == "starmap":
+                        result = ProcessPool.call(function, is_async, [(item, {}) for item in args])
+                    else:
+                        result = ProcessPool.call(function, is_async, [((item,), {}) for item in args])
+                    ProcessConnector.send_result(conn, result, serializer, transport)
+                except Exception as error:
+                    logger.debug(error)
+                    try:
+                        send_payload(conn, ("error", error), serializer)
+                    except Exception:
+                        send_payload(conn, ("error", RuntimeError(repr(error))), serializer)
+                done += 1
+        finally:
+            conn.close()
+
+
+class _PoolSlot:
+    """
+    One child of a `ProcessPool` and the parent thread feeding it
+    """
+    def __init__(self, pool: ProcessPool, index: int):
+        self.pool = pool
+        self.index = index
+        self.proc = None
+        self.conn = None
+        self.current = None
+        self.lock = threading.Lock()
+        self.done = 0
+        self.thread = threading.Thread(
+            target=self.run,
+            name=f"{pool.name}-feeder-{index}",
+            daemon=True
+        )
+
+    def start(self):
+        self.spawn()
+        self.thread.start()
+
+    def spawn(self):
+        self.conn, child_con = self.pool.context.Pipe()
+        self.proc = self.pool.context.Process(
+            target=ProcessPool.run_child,
+            args=(self.pool.target, self.pool.is_async, child_con, self.pool.max_tasks_per_child,
+                self.pool.serializer, self.pool.transport)
+        )
+        self.proc.start()
+        child_con.close()
+        self.done = 0
+
+    def kill(self, connector: Optional[PooledProcessConnector] = None):
+        """
+        Kill the child, only while it runs `connector` if one is given
+        """
+        with self.lock:
+            if self.proc is not None and (connector is None or self.current is connector):
+                self.proc.kill()
+
+    def retire(self, graceful: bool = True):
+        if self.proc is None:
+            return
+        try:
+            if graceful and self.proc.is_alive():
+                send_payload(self.conn, None, self.pool.serializer)
+        except (OSError, ValueError):
+            pass
+        self.conn.close()
+        self.proc.join()
+        self.proc, self.conn = None, None
+
+    def run(self):
+        while True:
+            task = self.pool.tasks.get()
+            if task is None:
+                self.retire()
+                self.pool._remove_slot(self)
+                break
+            connector, mode, args, kwargs, queued_ns = task
+            if self.proc is not None and not self.proc.is_alive():
+                # killed or crashed while it was idle
+                self.retire(graceful=False)
+            if self.proc is None:
+                self.spawn()
+            with self.lock:
+                # a kill from now on reaches the child running this task
+                killed = connector.is_killed
+                if not killed:
+                    self.current = connector
+                    connector._set_running(self, self.proc)
+            if killed:
+                self.pool.load.on_cancel(queued_ns)
+                connector._set_result(error=ProcessKilled("killed before it started"))
+                continue
+            segments = []
+            error = None
+            start_ns = time.perf_counter_ns()
+            self.pool.load.on_start(queued_ns, start_ns)
+            try:
+                segments = send_payload(self.conn, (mode, args, kwargs), self.pool.serializer, self.pool.transport)
+                status, payload = recv_payload(self.conn, self.pool.serializer)
+                while status == "items":
+                    connector._put_items(payload)
+                    status, payload = recv_payload(self.conn, self.pool.serializer)
+            except (EOFError, OSError):
+                error = ProcessKilled(f"child process {connector.pid} died")
+            except Exception as e:
+                # the pipe may hold a partial message, start over with a fresh child
+                error = e
+            finally:
+                with self.lock:
+                    self.current = None
+                # the child unlinks the segments it mapped, these are the ones it never got
+                SharedMemoryTransport.unlink(segments)
+                self.pool.load.on_finish(start_ns, time.perf_counter_ns())
+            if error is not None:
+                connector._set_result(error=error)
+                self.retire(graceful=False)
+                continue
+            if status in ("ok", "end"):
+                connector._set_result(result=payload)
+            else:
+                connector._set_result(error=payload)
+            self.done += 1
+            if self.pool.max_tasks_per_child and self.done >= self.pool.max_tasks_per_child:
+                # the child exits by itself after its last task
+                self.retire(graceful=False)
+
+
+class _FunctionReference():
+    """
+    A function pickled by its module and name, the decorated wrapper is replaced by the function it keeps
+    """
+    def __init__(self, module: str, qualname: str):
+        self.module = module
+        self.qualname = qualname
+
+    def __reduce__(self):
+        return (_load_function, (self.module, self.qualname))
+
+
+def _load_function(module: str, qualname: str) -> FunctionType:
+    function = importlib.import_module(module)
+    for name in qualname.split("."):
+        function = getattr(function, name)
+    return getattr(function, "__wrapped__", function)
+
+
+_register_atexit(ProcessConnector.shutdown_pools)
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+
+class WorkerRegistry(MutableMapping):
+    """
+    WorkerRegistry class -> registry
+
+    A dict-like registry of workers by name.
+    The live workers are kept until they finish, then they are moved into a bounded history
+    where the oldest finished workers are dropped first
+    """
+
+    def __init__(self, history_size: int = 1000):
+        # private attributes
+        self.__live = {}
+        self.__history = OrderedDict()
+        self.__lock = threading.RLock()
+
+        # public attributes
+        self.history_size = history_size
+
+    ## Mapping ---------------------------
+    def __getitem__(self, name):
+        with self.__lock:
+            if name in self.__live:
+                return self.__live[name]
+            return self.__history[name]
+
+    def __setitem__(self, name, worker):
+        with self.__lock:
+            self.__history.pop(name, None)
+            self.__live[name] = worker
+
+    def __delitem__(self, name):
+        with self.__lock:
+            if name in self.__live:
+                del self.__live[name]
+            else:
+                del self.__history[name]
+
+    def __contains__(self, name):
+        return name in self.__live or name in self.__history
+
+    def __iter__(self):
+        with self.__lock:
+            names = list(self.__history) + list(self.__live)
+        return iter(names)
+
+    def __len__(self):
+        return len(self.__live) + len(self.__history)
+
+    def copy(self) -> dict:
+        with self.__lock:
+            return {**self.__history, **self.__live}
+
+    def clear(self):
+        with self.__lock:
+            self.__live.clear()
+            self.__history.clear()
+
+    ## Registry ---------------------------
+    def register(self, name: str, worker, suffix) -> str:
+        """
+        Add a live worker, `suffix` is appended to the name if it is already taken
+        """
+        with self.__lock:
+            if name in self:
+                name += str(suffix)
+            self[name] = worker
+            return name
+
+    def finish(self, name: str, worker):
+        """
+        Move a finished worker from the live workers into the history
+        """
+        with self.__lock:
+            if self.__live.get(name) is not worker:
+                return
+            del self.__live[name]
+            if self.history_size > 0:
+                self.__history[name] = worker
+                while len(self.__history) > self.history_size:
+                    self.__history.popitem(last=False)
+
+    def set_history_size(self, history_size: int):
+        """
+        Change how many finished workers are kept, 0 keeps none
+        """
+        with self.__lock:
+            self.history_size = history_size
+            while len(self.__history) > max(history_size, 0):
+                self.__history.popitem(last=False)
+
+    def active(self) -> list:
+        """
+        Return the live workers only
+        """
+        with self.__lock:
+            return list(self.__live.values())
+
+    @property
+    def active_count(self) -> int:
+        return len(self.__live)
+
+    @property
+    def history_count(self) -> int:
+        return len(self.__history)
@@ -0,0 +1,84 @@
+import time
+import heapq
+import queue
+import itertools
+import threading
+from typing import Any, Optional
+
+
+class PriorityTaskQueue():
+    """
+    PriorityTaskQueue class -> queue
+
+    A thread-safe heap of tasks, the highest priority is picked first and equal priorities are FIFO.
+
+    Queued tasks age so low priority work is never starved,
+    every `1 / aging_rate` seconds spent in the queue count as one more priority level
+    """
+
+    def __init__(self, aging_rate: float = 1.0):
+        assert aging_rate >= 0, "aging_rate must not be negative"
+
+        # private attributes
+        self.__heap = []
+        self.__counter = itertools.count()
+        self.__lock = threading.Lock()
+        self.__not_empty = threading.Condition(self.__lock)
+
+        # public attributes
+        self.aging_rate = aging_rate
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def qsize(self) -> int:
+        return len(self.__heap)
+
+    def put(self, item: Any, priority: float = 0):
+        """
+        Queue an item, `priority=float("inf")` goes first and `float("-inf")` goes last
+        """
+        # the age is folded into the key once, so the heap never has to be re-sorted
+        key = time.monotonic() * self.aging_rate - priority
+        with self.__lock:
+            heapq.heappush(self.__heap, (key, next(self.__counter), item))
+            self.__not_empty.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        Pop the most urgent item, wait for one if the queue is empty
+        """
+        with self.__not_empty:
+            if not self.__not_empty.wait_for(lambda: self.__heap, timeout):
+                raise queue.Empty
+            return heapq.heappop(self.__heap)[2]
+
+    def get_nowait(self) -> Any:
+        return self.get(timeout=0)
+
+    def remove(self, item: Any) -> bool:
+        """
+        Remove a queued item, return False if it is not queued
+        """
+        with self.__lock:
+            for i, entry in enumerate(self.__heap):
+                if entry[2] is item:
+                    self.__heap[i] = self.__heap[-1]
+                    self.__heap.pop()
+                    heapq.heapify(self.__heap)
+                    return True
+            return False
+
+    def pop_oldest(self) -> Any:
+        """
+        Pop the item which was queued first, whatever its priority
+        """
+        with self.__lock:
+            if not self.__heap:
+                raise queue.Empty
+            i = min(range(len(self.__heap)), key=lambda i: self.__heap[i][1])
+            entry = self.__heap[i]
+            self.__heap[i] = self.__heap[-1]
+            self.__heap.pop()
+            heapq.heapify(self.__heap)
+            return entry[2]
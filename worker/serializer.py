@@ -0,0 +1,255 @@
+import io
+import json
+import array
+import pickle
+from multiprocessing.connection import Connection
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from .shared_memory import SharedMemoryTransport
+
+
+class Serializer:
+    """
+    Base serializer class.
+
+    `dumps` returns the encoded payload and a list of buffers to be sent out-of-band.
+    With `oob_threshold`, the serializer should also move the large buffers out-of-band when it can
+    """
+    name = "base"
+
+    def dumps(self, obj: Any, oob_threshold: Optional[int] = None) -> Tuple[bytes, List[memoryview]]:
+        raise NotImplementedError
+
+    def loads(self, data: bytes, buffers: List[bytearray]) -> Any:
+        raise NotImplementedError
+
+
+class PickleSerializer(Serializer):
+    """
+    Pickle serializer, PickleBuffer and numpy arrays are kept out-of-band from protocol 5.
+    With `oob_threshold` the large bytes, bytearray, array.array and memoryview objects are too
+    """
+    name = "pickle"
+
+    def __init__(self, protocol: int = pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+
+    def dumps(self, obj: Any, oob_threshold: Optional[int] = None) -> Tuple[bytes, List[memoryview]]:
+        buffers = []
+        if self.protocol < 5:
+            return pickle.dumps(obj, protocol=self.protocol), buffers
+        if oob_threshold is None:
+            data = pickle.dumps(obj, protocol=self.protocol, buffer_callback=lambda b: buffers.append(b.raw()))
+            return data, buffers
+        file = io.BytesIO()
+        pickler = _BufferPickler(file, self.protocol, lambda b: buffers.append(b.raw()), oob_threshold)
+        pickler.dump(_wrap_bytes(obj, oob_threshold))
+        return file.getvalue(), buffers
+
+    def loads(self, data: bytes, buffers: List[bytearray]) -> Any:
+        return pickle.loads(data, buffers=buffers)
+
+
+def _rebuild_bytes(buffer) -> bytes:
+    return bytes(buffer)
+
+
+def _rebuild_bytearray(buffer) -> bytearray:
+    # a buffer received through the pipe is already a bytearray
+    return buffer if type(buffer) is bytearray else bytearray(buffer)
+
+
+class _OutOfBandBytes():
+    """
+    A large bytes or bytearray object pickled as an out-of-band buffer
+    """
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __reduce__(self):
+        rebuild = _rebuild_bytes if type(self.obj) is bytes else _rebuild_bytearray
+        return rebuild, (pickle.PickleBuffer(self.obj),)
+
+
+def _wrap_bytes(obj: Any, threshold: int, depth: int = 4) -> Any:
+    """
+    Wrap the large bytes and bytearray objects of a payload into `_OutOfBandBytes`.
+    The C pickler never calls `reducer_override` for bytes, so they are found here,
+    in the tuples, lists and dicts of the first `depth` levels
+    """
+    kind = type(obj)
+    if kind is bytes or kind is bytearray:
+        return _OutOfBandBytes(obj) if len(obj) >= threshold else obj
+    if not depth:
+        return obj
+    if kind is tuple or kind is list:
+        items = [_wrap_bytes(item, threshold, depth - 1) for item in obj]
+        if all(new is old for new, old in zip(items, obj)):
+            return obj
+        return kind(items)
+    if kind is dict:
+        items = {key: _wrap_bytes(value, threshold, depth - 1) for key, value in obj.items()}
+        if all(items[key] is value for key, value in obj.items()):
+            return obj
+        return items
+    return obj
+
+
+def _rebuild_array(typecode: str, buffer) -> array.array:
+    result = array.array(typecode)
+    result.frombytes(buffer)
+    return result
+
+
+def _rebuild_memoryview(buffer, format: str, shape: tuple) -> memoryview:
+    view = memoryview(buffer)
+    if format != "B" or len(shape) != 1:
+        view = view.cast(format, shape)
+    return view
+
+
+class _BufferPickler(pickle.Pickler):
+    """
+    Pickler which also sends large bytearray, array.array and memoryview objects out-of-band
+    """
+    def __init__(self, file, protocol: int, buffer_callback: Callable, oob_threshold: int):
+        super().__init__(file, protocol=protocol, buffer_callback=buffer_callback)
+        self.oob_threshold = oob_threshold
+
+    def reducer_override(self, obj):
+        kind = type(obj)
+        if kind is bytearray and len(obj) >= self.oob_threshold:
+            return _rebuild_bytearray, (pickle.PickleBuffer(obj),)
+        if kind is array.array and obj.itemsize * len(obj) >= self.oob_threshold:
+            return _rebuild_array, (obj.typecode, pickle.PickleBuffer(obj))
+        if kind is memoryview and obj.nbytes >= self.oob_threshold and obj.c_contiguous:
+            return _rebuild_memoryview, (pickle.PickleBuffer(obj), obj.format, obj.shape)
+        return NotImplemented
+
+
+class CodecSerializer(Serializer):
+    """
+    Serializer from a pair of `dumps(obj) -> bytes` and `loads(bytes) -> obj` functions
+    """
+    name = "codec"
+
+    def __init__(self, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+        self.__dumps = dumps
+        self.__loads = loads
+
+    def dumps(self, obj: Any, oob_threshold: Optional[int] = None) -> Tuple[bytes, List[memoryview]]:
+        data = self.__dumps(obj)
+        if isinstance(data, str):
+            data = data.encode()
+        return data, []
+
+    def loads(self, data: bytes, buffers: List[bytearray]) -> Any:
+        return self.__loads(data)
+
+
+class JSONSerializer(CodecSerializer):
+    name = "json"
+
+    def __init__(self):
+        super().__init__(json.dumps, json.loads)
+
+
+class MsgpackSerializer(CodecSerializer):
+    name = "msgpack"
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("msgpack serializer requires `msgpack`, please `pip install msgpack`")
+        super().__init__(
+            lambda obj: msgpack.packb(obj, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False)
+        )
+
+    def __reduce__(self):
+        # the codec functions are lambdas, a child rebuilds them
+        return (MsgpackSerializer, ())
+
+
+SERIALIZERS = {
+    "pickle": PickleSerializer,
+    "json": JSONSerializer,
+    "msgpack": MsgpackSerializer,
+}
+
+
+def get_serializer(serializer: Union[None, str, Serializer, Any] = None) -> Serializer:
+    """
+    Resolve a serializer option.
+
+    - None -> pickle protocol 5
+    - "pickle" / "json" / "msgpack"
+    - a `Serializer` instance
+    - any object with `dumps(obj) -> bytes` and `loads(bytes) -> obj` (e.g. a module)
+    """
+    if serializer is None:
+        return PickleSerializer()
+    if isinstance(serializer, Serializer):
+        return serializer
+    if isinstance(serializer, str):
+        assert serializer in SERIALIZERS, f"unknown serializer `{serializer}`, choose one of {list(SERIALIZERS)}"
+        return SERIALIZERS[serializer]()
+    assert hasattr(serializer, "dumps") and hasattr(serializer, "loads"), "serializer requires `dumps` and `loads`"
+    return CodecSerializer(serializer.dumps, serializer.loads)
+
+
+def send_payload(
+    conn: Connection,
+    obj: Any,
+    serializer: Serializer,
+    transport: Optional[SharedMemoryTransport] = None
+) -> List[str]:
+    """
+    Encode `obj` once and send it, the out-of-band buffers follow as separate messages.
+
+    With a shared memory `transport`, the buffers above its threshold are put in segments and
+    only their handles are sent. Return the created segments, to be unlinked if never received
+    """
+    data, buffers = serializer.dumps(obj, transport.threshold if transport else None)
+    descriptors, segments = [], []
+    try:
+        for buffer in buffers:
+            buffer = memoryview(buffer)
+            if transport and buffer.nbytes >= transport.threshold:
+                segments.append(transport.put(buffer))
+                descriptors.append((buffer.nbytes, segments[-1]))
+            else:
+                descriptors.append((buffer.nbytes, None))
+        conn.send_bytes(pickle.dumps(descriptors, protocol=pickle.HIGHEST_PROTOCOL))
+        conn.send_bytes(data)
+        for buffer, (size, segment) in zip(buffers, descriptors):
+            if segment is None:
+                conn.send_bytes(buffer)
+    except BaseException:
+        SharedMemoryTransport.unlink(segments)
+        raise
+    return segments
+
+
+def recv_payload(conn: Connection, serializer: Serializer) -> Any:
+    """
+    Receive an object sent by `send_payload`, the out-of-band buffers are received in place
+    or mapped from their shared memory segments
+    """
+    descriptors = pickle.loads(conn.recv_bytes())
+    data = conn.recv_bytes()
+    buffers = []
+    for size, segment in descriptors:
+        if segment is not None:
+            buffers.append(SharedMemoryTransport.attach(segment, size))
+            continue
+        buffer = bytearray(size)
+        if size:
+            conn.recv_bytes_into(buffer)
+        else:
+            conn.recv_bytes()
+        buffers.append(buffer)
+    return serializer.loads(data, buffers)
@@ -0,0 +1,89 @@
+import os
+import mmap
+import uuid
+import tempfile
+import logging
+from typing import List, Optional, Union
+
+
+logger = logging.getLogger()
+
+
+class SharedMemoryTransport():
+    """
+    SharedMemoryTransport class -> transport
+
+    Move the large out-of-band buffers of a payload into memory-mapped segments
+    (on `/dev/shm` when available) so only their handles go through the pipe.
+
+    The receiver maps a segment and unlinks it right away, the mapping lives as long as
+    the objects built on top of it (numpy arrays and memoryviews are zero-copy)
+    """
+
+    def __init__(self, threshold: int = 1 << 20, directory: str = None):
+        assert threshold > 0, "threshold must be greater than 0"
+        if directory is None:
+            directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        self.threshold = threshold
+        self.directory = directory
+
+    def put(self, buffer: memoryview) -> str:
+        """
+        Copy a buffer into a new segment and return its path
+        """
+        path = os.path.join(self.directory, f"python-worker-{os.getpid()}-{uuid.uuid4().hex}")
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+        try:
+            os.ftruncate(fd, buffer.nbytes)
+            with mmap.mmap(fd, buffer.nbytes) as segment:
+                segment[:] = buffer.cast("B")
+        except BaseException:
+            SharedMemoryTransport.unlink([path])
+            raise
+        finally:
+            os.close(fd)
+        return path
+
+    @staticmethod
+    def attach(path: str, size: int) -> memoryview:
+        """
+        Map a segment created by `put` and unlink it, the memory is released with the last view
+        """
+        fd = os.open(path, os.O_RDWR)
+        try:
+            segment = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        SharedMemoryTransport.unlink([path])
+        return memoryview(segment)
+
+    @staticmethod
+    def unlink(paths: List[str]):
+        """
+        Remove the segments which were never attached
+        """
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"cannot unlink shared memory segment {path}: {e}")
+
+
+def get_transport(shared_memory: Union[None, bool, int, SharedMemoryTransport] = None) -> Optional[SharedMemoryTransport]:
+    """
+    Resolve a shared memory option.
+
+    - None / False -> disabled, every buffer goes through the pipe
+    - True -> buffers from 1 MiB
+    - int -> buffers from that many bytes
+    - a `SharedMemoryTransport` instance
+    """
+    if shared_memory is None or shared_memory is False:
+        return None
+    if shared_memory is True:
+        return SharedMemoryTransport()
+    if isinstance(shared_memory, SharedMemoryTransport):
+        return shared_memory
+    return SharedMemoryTransport(int(shared_memory))
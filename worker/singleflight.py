@@ -0,0 +1,156 @@
+import threading
+from typing import Callable
+
+from .cache import make_key
+from .stream import is_async_function
+
+
+class SingleFlight():
+    """
+    SingleFlight class -> group
+
+    Share one in-flight handle between the concurrent calls with equal arguments.
+    The callers get the same worker (or process connector), so they share its result,
+    its completion and its abort. Nothing is kept once the call is done
+    """
+
+    def __init__(self, namespace: str):
+        # private attributes
+        self.__calls = {}
+        self.__lock = threading.Lock()
+
+        # public attributes
+        self.namespace = namespace
+        self.started = 0
+        self.shared = 0
+
+    def __len__(self):
+        return len(self.__calls)
+
+    def info(self) -> dict:
+        return {
+            "in_flight": len(self.__calls),
+            "started": self.started,
+            "shared": self.shared
+        }
+
+    def wrap(self, run: Callable) -> Callable:
+        """
+        Wrap a decorated function returning handles with `add_done_callback`
+        """
+        if is_async_function(run):
+            async def call(*args, **kwargs):
+                ok, key = make_key(self.namespace, args, kwargs)
+                if not ok:
+                    return await run(*args, **kwargs)
+                flight, leader = self.__join(key)
+                if not leader:
+                    return await flight.wait_async()
+                try:
+                    handle = await run(*args, **kwargs)
+                except BaseException as e:
+                    self.__fail(key, flight, e)
+                    raise
+                return self.__track(key, flight, handle)
+        else:
+            def call(*args, **kwargs):
+                ok, key = make_key(self.namespace, args, kwargs)
+                if not ok:
+                    return run(*args, **kwargs)
+                flight, leader = self.__join(key)
+                if not leader:
+                    return flight.wait()
+                try:
+                    handle = run(*args, **kwargs)
+                except BaseException as e:
+                    self.__fail(key, flight, e)
+                    raise
+                return self.__track(key, flight, handle)
+        call.singleflight = self
+        return call
+
+    ## Private Executor ---------------------------
+    def __join(self, key):
+        """
+        Return the flight of a key and whether this caller has to start it
+        """
+        with self.__lock:
+            flight = self.__calls.get(key)
+            if flight is not None:
+                self.shared += 1
+                return flight, False
+            flight = self.__calls[key] = _Flight()
+            self.started += 1
+            return flight, True
+
+    def __track(self, key, flight: "_Flight", handle):
+        flight.set(handle)
+        handle.add_done_callback(lambda h: self.__forget(key, flight))
+        return handle
+
+    def __fail(self, key, flight: "_Flight", error: BaseException):
+        self.__forget(key, flight)
+        flight.set(error=error)
+
+    def __forget(self, key, flight: "_Flight"):
+        with self.__lock:
+            if self.__calls.get(key) is flight:
+                del self.__calls[key]
+
+
+class _Flight():
+    """
+    The handle of a call being started, the other callers wait until it is dispatched
+    """
+
+    def __init__(self):
+        # private attributes
+        self.__ready = threading.Event()
+        self.__lock = threading.Lock()
+        self.__waiters = []
+
+        # public attributes
+        self.handle = None
+        self.error = None
+
+    def set(self, handle=None, error: BaseException = None):
+        self.handle = handle
+        self.error = error
+        with self.__lock:
+            self.__ready.set()
+            waiters, self.__waiters = self.__waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(self.__resolve, future)
+            except RuntimeError:
+                # the loop of the waiter was closed meanwhile
+                pass
+
+    def wait(self):
+        self.__ready.wait()
+        return self.__result()
+
+    async def wait_async(self):
+        """
+        Wait on the running event loop, the leader may be started from another thread
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self.__lock:
+            if self.__ready.is_set():
+                return self.__result()
+            future = loop.create_future()
+            self.__waiters.append((loop, future))
+        await future
+        return self.__result()
+
+    def __result(self):
+        if self.error is not None:
+            raise self.error
+        return self.handle
+
+    @staticmethod
+    def __resolve(future):
+        if not future.done():
+            future.set_result(None)
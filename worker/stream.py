@@ -0,0 +1,176 @@
+import time
+import queue
+import functools
+from collections.abc import Awaitable
+from typing import Any, AsyncGenerator, Callable, Generator
+
+
+END = object()
+
+# code object flags, the same as `inspect.CO_*` which is not imported for them
+CO_GENERATOR = 0x20
+CO_COROUTINE = 0x80
+CO_ASYNC_GENERATOR = 0x200
+
+
+class ResultStream():
+    """
+    ResultStream class -> stream
+
+    A bounded queue carrying the items of a generator from its worker to one consumer.
+    The producer blocks once `maxsize` items are waiting, which gives the consumer backpressure
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.queue = queue.Queue(maxsize)
+        self.is_stream = False
+        self.is_closed = False
+
+    def put(self, item: Any, cancelled: Callable[[], bool] = lambda: False, interval: float = 0.1):
+        """
+        Put an item, wait for room while the consumer is behind.
+        The timeout keeps the producer thread responsive to aborts
+        """
+        while not cancelled():
+            try:
+                self.queue.put(item, timeout=interval)
+                return
+            except queue.Full:
+                continue
+
+    async def aput(self, item: Any, interval: float = 0.005):
+        """
+        Put an item from a coroutine without blocking its event loop
+        """
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                import asyncio
+                await asyncio.sleep(interval)
+
+    def close(self):
+        """
+        Mark the end of the stream. A full queue keeps all its items,
+        the consumer sees `is_closed` once it drained them
+        """
+        if self.is_closed:
+            return
+        self.is_closed = True
+        self.__wake()
+
+    def __wake(self):
+        """
+        Wake a consumer waiting on an empty queue
+        """
+        try:
+            self.queue.put_nowait(END)
+        except queue.Full:
+            pass
+
+    def __iter__(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                if self.is_closed:
+                    return
+                item = self.queue.get()
+            if item is END:
+                # let any other consumer see the end too
+                self.__wake()
+                return
+            yield item
+
+    async def __aiter__(self, interval: float = 0.005):
+        """
+        Poll the queue from the event loop like `aput`, a blocking `get` in an executor thread
+        would outlive a cancelled consumer and take the next item away from the others
+        """
+        import asyncio
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                if self.is_closed:
+                    return
+                await asyncio.sleep(interval)
+                continue
+            if item is END:
+                self.__wake()
+                return
+            yield item
+
+
+def send_stream(send: Callable[[Any], Any], generator: Generator, chunksize: int = 64, flush_interval: float = 0.05):
+    """
+    Send the items of a generator as ("items", [...]) messages of up to `chunksize` items.
+    A chunk is also flushed after `flush_interval` seconds. Return the generator return value
+    """
+    chunk, started = [], time.monotonic()
+    while True:
+        try:
+            item = next(generator)
+        except StopIteration as stop:
+            if chunk:
+                send(("items", chunk))
+            return stop.value
+        chunk.append(item)
+        if len(chunk) >= chunksize or time.monotonic() - started >= flush_interval:
+            send(("items", chunk))
+            chunk, started = [], time.monotonic()
+
+
+async def asend_stream(send: Callable[[Any], Any], generator: AsyncGenerator, chunksize: int = 64, flush_interval: float = 0.05):
+    """
+    Same as `send_stream` for an async generator
+    """
+    chunk, started = [], time.monotonic()
+    async for item in generator:
+        chunk.append(item)
+        if len(chunk) >= chunksize or time.monotonic() - started >= flush_interval:
+            send(("items", chunk))
+            chunk, started = [], time.monotonic()
+    if chunk:
+        send(("items", chunk))
+
+
+def _code_flags(func) -> int:
+    func = getattr(func, "__func__", func)
+    while isinstance(func, functools.partial):
+        func = func.func
+    code = getattr(func, "__code__", None)
+    return code.co_flags if code is not None else 0
+
+
+def is_async_function(func) -> bool:
+    """
+    Coroutine and async generator functions both run on an event loop
+    """
+    return bool(_code_flags(func) & (CO_COROUTINE | CO_ASYNC_GENERATOR))
+
+
+def is_generator_function(func) -> bool:
+    """
+    Generator and async generator functions, their results are streamed
+    """
+    return bool(_code_flags(func) & (CO_GENERATOR | CO_ASYNC_GENERATOR))
+
+
+async def maybe_await(result: Any) -> Any:
+    """
+    Await a coroutine, return an async generator (or any other value) as it is
+    """
+    if isinstance(result, Awaitable):
+        return await result
+    return result
+
+
+def iter_result(result: Any, owner: str):
+    """
+    Iterate the result of a worker which did not stream
+    """
+    if result is None or not hasattr(result, "__iter__"):
+        raise TypeError(f"{owner} did not return an iterable")
+    yield from result
@@ -0,0 +1,137 @@
+import time
+import heapq
+import logging
+import itertools
+import threading
+from typing import Callable, Optional
+
+
+logger = logging.getLogger()
+
+
+class WorkerTimeout(Exception):
+    """
+    Set as the error of a worker or a process which ran past its timeout or deadline
+    """
+
+
+class Deadline():
+    """
+    A scheduled expiry, cancel it once the work is done
+    """
+    __slots__ = ("timer", "when", "callback", "active")
+
+    def __init__(self, timer: "DeadlineTimer", when: float, callback: Callable):
+        self.timer = timer
+        self.when = when
+        self.callback = callback
+        self.active = True
+
+    def cancel(self):
+        self.timer._cancel(self)
+
+
+class DeadlineTimer():
+    """
+    DeadlineTimer class -> timer
+
+    A single thread expiring every deadline, kept in a heap ordered by time.
+    The cancelled deadlines are skipped lazily, the heap is compacted once most of it is cancelled
+
+    :params name: str -> name of the timer thread
+    """
+
+    def __init__(self, name: str = "worker-deadlines"):
+        # private attributes
+        self.__heap = []
+        self.__counter = itertools.count()
+        self.__cancelled = 0
+        self.__cond = threading.Condition()
+        self.__thread = None
+
+        # public attributes
+        self.name = name
+        self.expired = 0
+
+    def __len__(self):
+        return len(self.__heap) - self.__cancelled
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "pending": len(self),
+            "expired": self.expired,
+            "is_alive": self.__thread is not None and self.__thread.is_alive()
+        }
+
+    def schedule(self, timeout: float, callback: Callable) -> Deadline:
+        """
+        Call `callback()` on the timer thread in `timeout` seconds, unless it is cancelled before
+        """
+        deadline = Deadline(self, time.monotonic() + timeout, callback)
+        with self.__cond:
+            heapq.heappush(self.__heap, (deadline.when, next(self.__counter), deadline))
+            if self.__thread is None or not self.__thread.is_alive():
+                # started on the first deadline, again in a forked child
+                self.__thread = threading.Thread(target=self.__run, name=self.name, daemon=True)
+                self.__thread.start()
+            elif self.__heap[0][2] is deadline:
+                self.__cond.notify()
+        return deadline
+
+    def _cancel(self, deadline: Deadline):
+        with self.__cond:
+            if not deadline.active:
+                return
+            deadline.active = False
+            self.__cancelled += 1
+            if self.__cancelled > 1024 and self.__cancelled * 2 > len(self.__heap):
+                self.__heap = [entry for entry in self.__heap if entry[2].active]
+                heapq.heapify(self.__heap)
+                self.__cancelled = 0
+
+    ## Private Executor ---------------------------
+    def __next(self) -> Deadline:
+        """
+        Wait for the earliest deadline to expire and pop it
+        """
+        with self.__cond:
+            while True:
+                while self.__heap and not self.__heap[0][2].active:
+                    heapq.heappop(self.__heap)
+                    self.__cancelled -= 1
+                if not self.__heap:
+                    self.__cond.wait()
+                    continue
+                delay = self.__heap[0][0] - time.monotonic()
+                if delay <= 0:
+                    break
+                self.__cond.wait(delay)
+            deadline = heapq.heappop(self.__heap)[2]
+            deadline.active = False
+            self.expired += 1
+            return deadline
+
+    def __run(self):
+        while True:
+            deadline = self.__next()
+            try:
+                deadline.callback()
+            except Exception as e:
+                logger.debug(f"[{self.name}] DeadlineCallbackError {e}")
+
+
+def pop_timeout(kwargs: dict, timeout: Optional[float] = None, deadline: Optional[float] = None) -> Optional[float]:
+    """
+    Pop the per call `_timeout` and `_deadline` options of a call and return the seconds left to it.
+    They override the decorator `timeout` and `deadline`, the earliest of both applies
+
+    :params timeout: float -> seconds from the call
+    :params deadline: float -> absolute `time.time()` timestamp
+    """
+    timeout = kwargs.pop("_timeout", timeout)
+    deadline = kwargs.pop("_deadline", deadline)
+    if deadline is not None:
+        left = deadline - time.time()
+        timeout = left if timeout is None else min(timeout, left)
+    return timeout
@@ -1,14 +1,29 @@
-import inspect
 import os
 import time
-import sys
+import functools
+import queue
 import threading
-import ctypes
-import signal
-import asyncio
 import logging
-from typing import Any, Optional, Union, overload, Type
-from types import FunctionType
+from typing import Any, Optional, Union, Type, TYPE_CHECKING
+from types import FunctionType, GeneratorType, AsyncGeneratorType
+
+from .pool import ThreadPool, _register_atexit
+from .registry import WorkerRegistry
+from .mapping import chunked, iter_chunk_results
+from .cache import LRU, cached
+from .gate import WorkerGate
+from .metrics import MetricsRegistry
+from .singleflight import SingleFlight
+from .stream import ResultStream, is_async_function, is_generator_function, iter_result, maybe_await
+from .timer import DeadlineTimer, WorkerTimeout, pop_timeout
+from .cancel import CancellationToken, WorkerCancelled, _current_token
+from .batch import Batcher
+from .autoscale import Autoscaler, ScalingPolicy, get_policy
+
+# asyncio, ctypes and signal are imported on first use, `import worker` stays cheap for the thread workers
+if TYPE_CHECKING:
+    from .loop import EventLoopThread
+    from .process import ProcessPool
 
 ThreadedFunction = Type["ThreadedFunction"]
 AsyncThreadedFunction = Type["AsyncThreadedFunction"]
@@ -21,54 +36,173 @@ class ThreadWorker():
     """
     ThreadWorker class -> worker
 
-    Return a worker object that behave as a thread running on background
+    Return a worker object that behave as a thread running on background.
+    The arguments are kept on the worker itself, a call allocates no closure
     """
+    __slots__ = (
+        "__finish_stat", "__ret", "__work_time", "__abort_lock", "__running", "__done", "__is_done",
+        "__callbacks", "__stream", "__metrics", "__queued_ns", "__start_ns", "__deadline", "__task", "__loop",
+        "name", "id", "rawfunc", "args", "kwargs", "thread", "is_aborted", "error", "aborted_by_kbInterrupt",
+        "enable_keyboard_interrupt", "on_abort", "pool", "shared_loop", "gate", "priority", "timeout",
+        "is_timed_out", "token", "future", "start_time", "__weakref__"
+    )
 
     def __init__(
         self,
         func: FunctionType,
         name: Optional[str] = "",
         on_abort: Optional[FunctionType] = None,
-        enable_keyboard_interrupt: bool = True
+        enable_keyboard_interrupt: bool = True,
+        pool: Optional[str] = None,
+        shared_loop: bool = False,
+        gate: Optional[WorkerGate] = None,
+        priority: float = 0,
+        timeout: Optional[float] = None,
+        args: tuple = (),
+        kwargs: Optional[dict] = None
     ):
         # static attributes
         if not name:
             name = "worker"
-        if name in ThreadWorkerManager.allWorkers:
-            name += str(ThreadWorkerManager.counts)
-        ThreadWorkerManager.allWorkers[name] = self
+        metrics = ThreadWorkerManager.metrics.get(name)
+        name = ThreadWorkerManager.allWorkers.register(name, self, ThreadWorkerManager.counts)
         ThreadWorkerManager.counts += 1
 
         # private attributes
         self.__finish_stat = False
         self.__ret = None
         self.__work_time = 0
+        self.__abort_lock = threading.Lock()
+        self.__running = False
+        self.__done = None
+        self.__is_done = False
+        self.__callbacks = None
+        self.__stream = None
+        self.__metrics = metrics
+        self.__queued_ns = self.__start_ns = time.perf_counter_ns()
+        self.__deadline = None
+        self.__task = None
+        self.__loop = None
 
         # public attributes
         self.name = name
         self.id = ThreadWorkerManager.counts
-        self.func = None
         self.rawfunc = func
+        self.args = args
+        self.kwargs = kwargs if kwargs is not None else {}
         self.thread = None
         self.is_aborted = False
-        self.id_mark = f"[id={self.id}][{self.name}]"
+        self.error = None
         self.aborted_by_kbInterrupt = False
         self.enable_keyboard_interrupt = enable_keyboard_interrupt
         self.on_abort = on_abort
+        self.pool = pool
+        self.shared_loop = shared_loop
+        self.gate = gate
+        self.priority = priority
+        self.timeout = timeout
+        self.is_timed_out = False
+        self.token = CancellationToken()
+        self.future = None
         self.start_time = time.perf_counter()
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
-        if inspect.iscoroutinefunction(self.rawfunc):
-            async def work_func():
-                return await self.rawfunc(*args, **kwargs)
-            self.func = work_func
-        else:
-            self.func = lambda: self.rawfunc(*args, **kwargs)
+        self.args = args
+        self.kwargs = kwargs
         self.work()
         return self
 
+    def __await__(self):
+        """
+        Await the worker from a coroutine without blocking the event loop
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        def resolve():
+            if not future.done():
+                future.set_result(self.__ret)
+        self.add_done_callback(lambda w: loop.call_soon_threadsafe(resolve))
+        return (yield from future.__await__())
+
+    def __iter__(self):
+        """
+        Iterate the items of a generator worker while it is producing them.
+        A worker returning an iterable is iterated once it is finished
+        """
+        stream = self.__open_stream()
+        if stream is not None:
+            yield from stream
+            if stream.is_stream:
+                return
+        yield from iter_result(self.__ret, self.id_mark)
+
+    async def __aiter__(self):
+        """
+        Same as `__iter__` from a coroutine, for generator and async generator workers
+        """
+        stream = self.__open_stream()
+        if stream is not None:
+            async for item in stream:
+                yield item
+            if stream.is_stream:
+                return
+        for item in iter_result(self.__ret, self.id_mark):
+            yield item
+
+    def __open_stream(self, producer: bool = False) -> Optional[ResultStream]:
+        """
+        Return the stream shared by the generator and its consumer, create it on first use.
+        The consumer gets None once a worker finished without streaming
+        """
+        with self.__abort_lock:
+            if self.__stream is None:
+                if not producer and self.__is_done:
+                    return None
+                self.__stream = ResultStream(ThreadWorkerManager.stream_size)
+            if producer:
+                self.__stream.is_stream = True
+            return self.__stream
+
+    def __produce(self, generator):
+        """
+        Feed the stream from a generator, return its return value
+        """
+        stream = self.__open_stream(producer=True)
+        try:
+            while True:
+                try:
+                    item = next(generator)
+                except StopIteration as stop:
+                    return stop.value
+                stream.put(item, lambda: self.is_aborted)
+        finally:
+            stream.close()
+
+    async def __aproduce(self, generator):
+        """
+        Feed the stream from an async generator
+        """
+        stream = self.__open_stream(producer=True)
+        try:
+            async for item in generator:
+                await stream.aput(item)
+        finally:
+            stream.close()
+
     ## Properties ---------------------------
 
+    @property
+    def id_mark(self):
+        return f"[id={self.id}][{self.name}]"
+
+    @property
+    def func(self):
+        """
+        The function bound to the arguments of the call
+        """
+        return functools.partial(self.rawfunc, *self.args, **self.kwargs)
+
     @property
     def work_time(self):
         if self.thread and not self.finished:
@@ -76,12 +210,7 @@ class ThreadWorker():
         return self.__work_time
 
     def __get_working_time(self):
-            t = time.perf_counter() - self.start_time
-            lst = len(str(t).split(".")[0])
-            if lst < 10:
-                return round(t, 10-lst)
-            else:
-                return int(t)
+        return (time.perf_counter_ns() - self.__start_ns) / 1e9
 
     @property
     def finished(self):
@@ -93,21 +222,48 @@ class ThreadWorker():
 
     @property
     def is_alive(self):
+        if self.pool or self.shared_loop or self.thread is None:
+            # a queued worker has no thread yet
+            return not self.finished
+        if self.thread.ident is None:
+            # the thread is about to be started
+            return not self.finished
         return self.thread.is_alive()
 
     ## Private Executor ---------------------------
+    def __begin(self):
+        """
+        Record the start of the execution
+        """
+        self.__start_ns = time.perf_counter_ns()
+        self.start_time = time.perf_counter()
+        self.__metrics.on_start(self.__start_ns - self.__queued_ns)
+
     def __execute(self):
         """
         Setup and Execute the function in the background
         """
+        self.__begin()
+        outcome = "aborted"
+        context = _current_token.set(self.token)
         try:
             self.__finish_stat = False
-            if self.func:
-                self.__ret = self.func()
-            else:
-                self.__ret = self.rawfunc()
+            result = self.rawfunc(*self.args, **self.kwargs)
+            if isinstance(result, GeneratorType):
+                result = self.__produce(result)
+            self.__ret = result
             self.__finish_stat = True
+            outcome = "finished"
+        except WorkerCancelled:
+            # stopped by itself through its token
+            pass
+        except Exception as e:
+            outcome = "failed"
+            self.error = e
+            raise
         finally:
+            _current_token.reset(context)
+            outcome = self.__check_timeout(outcome)
             self.__work_time = self.__get_working_time()
             if not self.__finish_stat:
                 self.__finish_stat = True
@@ -118,19 +274,39 @@ class ThreadWorker():
                         self.on_abort()
                 except Exception as e:
                     logger.debug(f"{self.id_mark} OnAbortError {type(self.on_abort)}")
+            self.__metrics.on_finish(time.perf_counter_ns() - self.__start_ns, outcome)
+            self.__notify()
 
     async def __aexecute(self):
         """
         Setup and Execute the asynchronous function in the background
         """
+        self.__begin()
+        outcome = "aborted"
+        _current_token.set(self.token)
+        import asyncio
+        self.__loop = asyncio.get_running_loop()
+        self.__task = asyncio.current_task()
         try:
             self.__finish_stat = False
-            if self.func:
-                self.__ret = await self.func()
-            else:
-                self.__ret = await self.rawfunc()
+            result = await maybe_await(self.rawfunc(*self.args, **self.kwargs))
+            if isinstance(result, AsyncGeneratorType):
+                result = await self.__aproduce(result)
+            self.__ret = result
             self.__finish_stat = True
+            outcome = "finished"
+        except WorkerCancelled:
+            pass
+        except asyncio.CancelledError:
+            if not self.is_aborted:
+                raise
+        except Exception as e:
+            outcome = "failed"
+            self.error = e
+            raise
         finally:
+            self.__task = None
+            outcome = self.__check_timeout(outcome)
             self.__work_time = self.__get_working_time()
             if not self.__finish_stat:
                 self.__finish_stat = True
@@ -141,18 +317,155 @@ class ThreadWorker():
                         self.on_abort()
                 except Exception as e:
                     logger.debug(f"{self.id_mark} OnAbortError {type(self.on_abort)}")
+            self.__metrics.on_finish(time.perf_counter_ns() - self.__start_ns, outcome)
+            self.__notify()
+
+    def __check_timeout(self, outcome: str) -> str:
+        """
+        Report an abort caused by the deadline as a timeout
+        """
+        if outcome == "aborted" and self.is_timed_out:
+            self.error = WorkerTimeout(f"{self.id_mark} timed out after {self.timeout}s")
+            return "timed_out"
+        return outcome
+
+    def __expire(self):
+        """
+        Abort the worker once its deadline is reached, called on the manager timer thread
+        """
+        if self.finished:
+            return
+        self.is_timed_out = True
+        self.abort()
+
+    def __notify(self):
+        """
+        Wake up the waiters and run the done callbacks
+        """
+        if self.__deadline is not None:
+            self.__deadline.cancel()
+        ThreadWorkerManager.allWorkers.finish(self.name, self)
+        with self.__abort_lock:
+            self.__is_done = True
+            if self.__done is not None:
+                self.__done.set()
+            callbacks, self.__callbacks = self.__callbacks or (), None
+            if self.__stream is not None:
+                # wake up a consumer waiting on a worker which never streamed
+                self.__stream.close()
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.debug(f"{self.id_mark} DoneCallbackError {e}")
+
+    def __abort_pending(self):
+        """
+        Finish a worker which was aborted before it started
+        """
+        self.__finish_stat = True
+        self.__metrics.on_cancel(self.__check_timeout("aborted"))
+        try:
+            if self.on_abort:
+                self.on_abort()
+        except Exception:
+            logger.debug(f"{self.id_mark} OnAbortError {type(self.on_abort)}")
+        self.__notify()
+
+    def __run_coroutine(self):
+        import asyncio
+        asyncio.run(self.__aexecute())
+
+    def __loop_done(self, future):
+        if not self.finished:
+            # cancelled before the coroutine got a chance to run
+            self.__abort_pending()
+
+    def __run_pooled(self):
+        """
+        Execute the function on the pool thread which picked this worker
+        """
+        try:
+            with self.__abort_lock:
+                self.thread = threading.current_thread()
+                aborted = self.is_aborted
+                self.__running = not aborted
+            if aborted:
+                # aborted while it was still queued
+                return self.__abort_pending()
+            if is_async_function(self.rawfunc):
+                self.__run_coroutine()
+            else:
+                self.__execute()
+        finally:
+            with self.__abort_lock:
+                self.__running = False
 
     def work(self):
         """
         Execute function
         """
-        if inspect.iscoroutinefunction(self.rawfunc):
-            self.thread = threading.Thread(target=lambda: asyncio.run(self.__aexecute()))
+        self.__finish_stat = False
+        with self.__abort_lock:
+            self.__is_done = False
+            if self.__done is not None:
+                self.__done.clear()
+        self.__stream = None
+        self.error = None
+        self.is_timed_out = False
+        if self.token.cancelled:
+            # a restarted worker gets a fresh token
+            self.token = CancellationToken()
+        ThreadWorkerManager.allWorkers[self.name] = self
+        self.__queued_ns = time.perf_counter_ns()
+        self.__metrics.on_queued()
+        if self.__deadline is not None:
+            self.__deadline.cancel()
+        if self.timeout is not None:
+            # counted from the call, the time waiting for a slot is part of the budget
+            self.__deadline = ThreadWorkerManager.deadlines.schedule(self.timeout, self.__expire)
+        if self.gate:
+            self.gate.submit(self)
+        else:
+            self._start()
+
+    def _start(self):
+        """
+        Start the function on its thread, pool or event loop
+        """
+        if self.pool:
+            self.is_aborted = False
+            ThreadWorkerManager.get_pool(self.pool).submit(self.__run_pooled, self.priority)
+        elif self.shared_loop and is_async_function(self.rawfunc):
+            self.is_aborted = False
+            loop_thread = ThreadWorkerManager.get_event_loop()
+            self.thread = loop_thread.thread
+            self.future = loop_thread.submit(self.__aexecute())
+            self.future.add_done_callback(self.__loop_done)
+        elif is_async_function(self.rawfunc):
+            self.thread = threading.Thread(target=self.__run_coroutine)
             self.thread.start()
         else:
             self.thread = threading.Thread(target=self.__execute)
             self.thread.start()
 
+    def _run_inline(self):
+        """
+        Run the function in the calling thread, used when a full gate runs it on the caller
+        """
+        self.thread = threading.current_thread()
+        if is_async_function(self.rawfunc):
+            self.__run_coroutine()
+        else:
+            self.__execute()
+
+    def _drop(self):
+        """
+        Finish a worker which was dropped from its gate queue before it started
+        """
+        self.is_aborted = True
+        self.__abort_pending()
+
     def interrupt(self):
         """
         Interrupt whenever signal SIGINT is raised
@@ -162,26 +475,83 @@ class ThreadWorker():
 
     def abort(self):
         """
-        Abort the running worker
+        Abort the running worker.
+        Its token is cancelled first, then a coroutine is cancelled and a thread still running after `abort_grace`
+        seconds gets an asynchronous exception
         """
-        if self.thread:
+        self.token.cancel()
+        if self.gate and self.gate.discard(self):
+            # still waiting for a free slot
+            return self._drop()
+        task = self.__task
+        if self.future:
+            # never abort the shared loop thread, cancel the task instead
             self.is_aborted = True
+            self.future.cancel()
+        elif task is not None:
+            self.is_aborted = True
+            self.__loop.call_soon_threadsafe(task.cancel)
+            # a coroutine blocked in a synchronous call never sees the cancellation
+            self.__force_abort_later()
+        elif self.pool:
+            # only abort the pool thread while it is still running this worker
+            with self.__abort_lock:
+                self.is_aborted = True
+                if self.__running and not self.finished:
+                    self.__force_abort_later()
+        elif self.thread:
+            self.is_aborted = True
+            self.__force_abort_later()
+
+    def __force_abort_later(self):
+        """
+        Leave the worker `abort_grace` seconds to see its cancelled token and stop by itself
+        """
+        ThreadWorkerManager.deadlines.schedule(ThreadWorkerManager.abort_grace, self.__force_abort)
+
+    def __force_abort(self):
+        """
+        Fall back to the asynchronous exception for a worker which ignored its token
+        """
+        with self.__abort_lock:
+            if self.finished or (self.pool and not self.__running):
+                return
             ThreadWorkerManager.abort_thread(self.thread)
 
-    def wait(self, check_interval=0.01):
+    def add_done_callback(self, callback: FunctionType):
+        """
+        Call `callback(worker)` once the worker is finished, immediately if it is already finished
+        """
+        with self.__abort_lock:
+            if not self.__is_done:
+                if self.__callbacks is None:
+                    self.__callbacks = []
+                self.__callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, check_interval=0.01, timeout: Optional[float] = None):
         """
         Wait the worker to finish
+
+        :params timeout: float -> maximum seconds to wait, return False if the worker is still running
         """
         if self.is_alive:
-            while not self.finished: time.sleep(check_interval)
-            return True
+            with self.__abort_lock:
+                # created by the first waiter, most workers are never waited on
+                if self.__done is None:
+                    self.__done = threading.Event()
+                    if self.__is_done:
+                        self.__done.set()
+                done = self.__done
+            return done.wait(timeout)
         return False
 
-    def await_worker(self) -> Any:
+    def await_worker(self, timeout: Optional[float] = None) -> Any:
         """
         wait the worker to finish and get it returns
         """
-        self.wait()
+        self.wait(timeout=timeout)
         return self.__ret
 
     def restart(self):
@@ -190,7 +560,8 @@ class ThreadWorker():
         """
         self.abort()
         self.start_time = time.perf_counter()
-        return self()
+        self.work()
+        return self
 
 
 class __ThreadWorkerManager():
@@ -199,15 +570,43 @@ class __ThreadWorkerManager():
 
     Class to manage your worker and thread (abort, list, monitor)
     """
-    allWorkers = {}
+    allWorkers = WorkerRegistry()
+    metrics = MetricsRegistry()
     counts = 0
+    pools = {}
+    pools_lock = threading.Lock()
+    gates = {}
+    gates_lock = threading.Lock()
+    autoscalers = {}
+    autoscalers_lock = threading.Lock()
+    event_loops = []
+    event_loops_lock = threading.Lock()
+    event_loop_threads = 1
+    event_loop_index = 0
     interrupt_timeout = 10
+    abort_grace = 0.1
+    deadlines = DeadlineTimer()
+    priority_aging_rate = 1.0
+    stream_size = 64
     keyboard_interrupt_handler_status = False
 
     @staticmethod
     def create_worker(*margs,**kargs):
         on_abort = None
         interrupt = True
+        pool = None
+        max_workers = None
+        max_concurrency = None
+        queue_size = None
+        on_full = "block"
+        priority = 0
+        cache = None
+        singleflight = False
+        timeout = None
+        deadline = None
+        batch_size = None
+        max_latency_ms = 10
+        autoscale = None
         if kargs:
             if "on_abort" in kargs:
                 on_abort = kargs["on_abort"]
@@ -215,31 +614,82 @@ class __ThreadWorkerManager():
                 interrupt = bool(kargs["keyboard_interrupt"])
             if "interrupt" in kargs:
                 interrupt = bool(kargs["interrupt"])
+            if "pool" in kargs:
+                pool = kargs["pool"]
+            if "max_workers" in kargs:
+                max_workers = kargs["max_workers"]
+            if "max_concurrency" in kargs:
+                max_concurrency = kargs["max_concurrency"]
+            if "queue_size" in kargs:
+                queue_size = kargs["queue_size"]
+            if "on_full" in kargs:
+                on_full = kargs["on_full"]
+            if "priority" in kargs:
+                priority = kargs["priority"]
+            if "cache" in kargs:
+                cache = kargs["cache"]
+            if "singleflight" in kargs:
+                singleflight = bool(kargs["singleflight"])
+            if "timeout" in kargs:
+                timeout = kargs["timeout"]
+            if "deadline" in kargs:
+                deadline = kargs["deadline"]
+            if "batch_size" in kargs:
+                batch_size = kargs["batch_size"]
+            if "max_latency_ms" in kargs:
+                max_latency_ms = kargs["max_latency_ms"]
+            if "autoscale" in kargs:
+                autoscale = kargs["autoscale"]
             if not margs:
                 e = "Error: on_abort requires worker name on decorator\nPlease read ThreadWorkerManager.help()"
                 raise Exception(e)
+        assert not autoscale or pool, "autoscale requires a pool"
+        if pool:
+            ThreadWorkerManager.get_pool(pool, max_workers)
+            if autoscale:
+                ThreadWorkerManager.autoscale(pool, autoscale)
+        gate = None
+        if max_concurrency:
+            gate_name = margs[0] if margs and type(margs[0]) == str and margs[0] else "worker"
+            gate = ThreadWorkerManager.get_gate(gate_name, max_concurrency, queue_size, on_full)
         if margs:
             if type(margs[0]) == FunctionType:
-                assert not inspect.iscoroutinefunction(margs[0]), "please use `async_worker` instead for coroutine function"
+                assert not is_async_function(margs[0]), "please use `async_worker` instead for coroutine function"
                 def register(*args,**kargs):
+                    call_priority = kargs.pop("_priority", priority)
+                    call_timeout = pop_timeout(kargs, timeout, deadline)
                     w = ThreadWorker(
-						lambda: margs[0](*args,**kargs),
+						margs[0],
 						"worker",
-						on_abort, interrupt)
+						on_abort, interrupt, pool, gate=gate, priority=call_priority, timeout=call_timeout,
+						args=args, kwargs=kargs)
                     w.work()
                     return w
+                register = ThreadWorkerManager._batch_calls(register, margs[0], batch_size, max_latency_ms)
+                register = ThreadWorkerManager._share_calls(register, margs[0], singleflight)
+                register = ThreadWorkerManager._cache_worker(register, margs[0], cache)
+                if not batch_size:
+                    ThreadWorkerManager._bind_map(register, margs[0], "worker", on_abort, interrupt, pool)
                 return register
             elif type(margs[0]) == str:
                 def applying(func):
-                    assert not inspect.iscoroutinefunction(func), "please use `async_worker` instead for coroutine function"
+                    assert not is_async_function(func), "please use `async_worker` instead for coroutine function"
                     def register(*args,**kargs):
                         workerName = margs[0]
+                        call_priority = kargs.pop("_priority", priority)
+                        call_timeout = pop_timeout(kargs, timeout, deadline)
                         w = ThreadWorker(
-                            lambda: func(*args,**kargs),
+                            func,
                             workerName,
-                            on_abort, interrupt)
+                            on_abort, interrupt, pool, gate=gate, priority=call_priority, timeout=call_timeout,
+                            args=args, kwargs=kargs)
                         w.work()
                         return w
+                    register = ThreadWorkerManager._batch_calls(register, func, batch_size, max_latency_ms)
+                    register = ThreadWorkerManager._share_calls(register, func, singleflight)
+                    register = ThreadWorkerManager._cache_worker(register, func, cache)
+                    if not batch_size:
+                        ThreadWorkerManager._bind_map(register, func, margs[0], on_abort, interrupt, pool)
                     return register
                 return applying
             else:
@@ -251,6 +701,10 @@ class __ThreadWorkerManager():
     def create_async_worker(*margs,**kargs):
         on_abort = None
         interrupt = True
+        shared_loop = False
+        singleflight = False
+        timeout = None
+        deadline = None
         if kargs:
             if "on_abort" in kargs:
                 on_abort = kargs["on_abort"]
@@ -258,42 +712,163 @@ class __ThreadWorkerManager():
                 interrupt = bool(kargs["keyboard_interrupt"])
             if "interrupt" in kargs:
                 interrupt = bool(kargs["interrupt"])
+            if "shared_loop" in kargs:
+                shared_loop = bool(kargs["shared_loop"])
+            if "singleflight" in kargs:
+                singleflight = bool(kargs["singleflight"])
+            if "timeout" in kargs:
+                timeout = kargs["timeout"]
+            if "deadline" in kargs:
+                deadline = kargs["deadline"]
             if not margs:
                 e = "Error: on_abort requires worker name on decorator\nPlease read ThreadWorkerManager.help()"
                 raise Exception(e)
         if margs:
             if type(margs[0]) == FunctionType:
-                assert inspect.iscoroutinefunction(margs[0]), "please use `worker` instead for non-coroutine function"
+                assert is_async_function(margs[0]), "please use `worker` instead for non-coroutine function"
                 async def register(*args,**kargs):
-                    async def worker_func():
-                        return await args[0](*args,**kargs)
+                    call_timeout = pop_timeout(kargs, timeout, deadline)
                     w = ThreadWorker(
-						worker_func,
+						margs[0],
 						"worker",
-						on_abort, interrupt)
+						on_abort, interrupt, shared_loop=shared_loop, timeout=call_timeout,
+						args=args, kwargs=kargs)
                     w.work()
                     return w
-                return register
+                return ThreadWorkerManager._share_calls(register, margs[0], singleflight)
             elif type(margs[0]) == str:
                 def applying(func):
-                    assert inspect.iscoroutinefunction(func), "please use `worker` instead for non-coroutine function"
+                    assert is_async_function(func), "please use `worker` instead for non-coroutine function"
                     async def register(*args,**kargs):
                         workerName = margs[0]
-                        async def worker_func():
-                            return await func(*args,**kargs)
+                        call_timeout = pop_timeout(kargs, timeout, deadline)
                         w = ThreadWorker(
-                            worker_func,
+                            func,
                             workerName,
-                            on_abort, interrupt)
+                            on_abort, interrupt, shared_loop=shared_loop, timeout=call_timeout,
+                            args=args, kwargs=kargs)
                         w.work()
                         return w
-                    return register
+                    return ThreadWorkerManager._share_calls(register, func, singleflight)
                 return applying
             else:
                 return ThreadWorkerManager._workerDefinitionError()
         else:
             return ThreadWorkerManager._workerDefinitionError()
 
+    @staticmethod
+    def _batch_calls(
+        register: FunctionType,
+        func: FunctionType,
+        batch_size: Optional[int] = None,
+        max_latency_ms: float = 10
+    ) -> FunctionType:
+        """
+        Collect the calls into batches, `func` runs once per batch with the list of the call items
+        """
+        if not batch_size:
+            return register
+        assert not is_generator_function(func), "batch_size does not support generator functions"
+        name = f"{func.__module__}.{func.__qualname__}"
+        return Batcher(name, register, batch_size, max_latency_ms, ThreadWorkerManager.deadlines).wrap()
+
+    @staticmethod
+    def _share_calls(register: FunctionType, func: FunctionType, singleflight: bool = False) -> FunctionType:
+        """
+        Let the concurrent calls with equal arguments share one in-flight worker
+        """
+        if not singleflight:
+            return register
+        assert not is_generator_function(func), \
+            "singleflight does not support generator functions"
+        return SingleFlight(f"{func.__module__}.{func.__qualname__}").wrap(register)
+
+    @staticmethod
+    def _cache_worker(register: FunctionType, func: FunctionType, cache: Optional[LRU] = None) -> FunctionType:
+        """
+        Return the cached calls of a decorated worker function from `cache`
+        """
+        if cache is None:
+            return register
+        assert not is_generator_function(func), "cache does not support generator functions"
+        def watch(w, store):
+            w.add_done_callback(lambda w: store(w.ret) if w.error is None and not w.is_aborted else None)
+        return cached(cache, f"{func.__module__}.{func.__qualname__}", register, watch)
+
+    @staticmethod
+    def _bind_map(
+        register: FunctionType,
+        func: FunctionType,
+        name: Optional[str] = "",
+        on_abort: Optional[FunctionType] = None,
+        interrupt: bool = True,
+        pool: Optional[str] = None
+    ):
+        """
+        Attach `map` and `starmap` to a decorated worker function
+        """
+        def map(iterable, chunksize: int = 1, ordered: bool = True, max_inflight: Optional[int] = None):
+            """
+            Run the function over the items in chunks of workers and iterate the results lazily
+            """
+            return ThreadWorkerManager.map_worker(
+                func, iterable, chunksize, ordered, max_inflight, False, name, on_abort, interrupt, pool
+            )
+        def starmap(iterable, chunksize: int = 1, ordered: bool = True, max_inflight: Optional[int] = None):
+            """
+            Like `map` but every item is unpacked as the function arguments
+            """
+            return ThreadWorkerManager.map_worker(
+                func, iterable, chunksize, ordered, max_inflight, True, name, on_abort, interrupt, pool
+            )
+        register.map = map
+        register.starmap = starmap
+
+    @staticmethod
+    def _run_chunk(func: FunctionType, chunk: list, star: bool = False) -> list:
+        if star:
+            return [func(*item) for item in chunk]
+        return [func(item) for item in chunk]
+
+    @staticmethod
+    def map_worker(
+        func: FunctionType,
+        iterable,
+        chunksize: int = 1,
+        ordered: bool = True,
+        max_inflight: Optional[int] = None,
+        star: bool = False,
+        name: Optional[str] = "",
+        on_abort: Optional[FunctionType] = None,
+        interrupt: bool = True,
+        pool: Optional[str] = None
+    ):
+        """
+        Split the items into chunks, run every chunk in one worker and iterate the results lazily
+
+        :params ordered: bool -> yield the results in input order, otherwise in completion order
+        :params max_inflight: int -> maximum chunks running at once, default to the pool size
+        """
+        if max_inflight is None:
+            if pool:
+                max_inflight = ThreadWorkerManager.get_pool(pool).max_workers
+            else:
+                max_inflight = min(32, (os.cpu_count() or 1) + 4)
+        def submit(chunk):
+            w = ThreadWorker(
+                ThreadWorkerManager._run_chunk, name, on_abort, interrupt, pool, args=(func, chunk, star)
+            )
+            w.work()
+            return w
+        def collect(w):
+            result = w.ret
+            if w.error is not None:
+                raise w.error
+            if result is None:
+                raise RuntimeError(f"{w.id_mark} map chunk was aborted")
+            return result
+        return iter_chunk_results(submit, collect, chunked(iterable, chunksize), ordered, max_inflight)
+
     @staticmethod
     def _workerDefinitionError():
         e = "Error: Worker Decorator function or method! Please read ThreadWorkerManager.help()"
@@ -342,14 +917,54 @@ class __ThreadWorkerManager():
         return runFunction()
 
     @staticmethod
-    def wait(*workers: ThreadWorker, wait_all: bool = False, check_interval: float = 0.01):
+    def wait(
+        *workers: ThreadWorker,
+        wait_all: bool = False,
+        check_interval: float = 0.01,
+        timeout: Optional[float] = None
+    ) -> bool:
         """
         wait defined workers to be done
+
+        :params timeout: float -> maximum seconds to wait, return False if some workers are still running
         """
         if wait_all:
-            workers = ThreadWorkerManager.allWorkers.values()
+            workers = list(ThreadWorkerManager.allWorkers.values())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for w in workers:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            w.wait(check_interval, timeout=remaining)
+            if not w.finished and deadline is not None:
+                return False
+        return True
+
+    @staticmethod
+    def as_completed(*workers: ThreadWorker, timeout: Optional[float] = None):
+        """
+        Iterate the defined workers in the order they finished
+
+        :params timeout: float -> raise TimeoutError if all the workers are not finished in time
+        """
+        done = queue.Queue()
         for w in workers:
-            w.wait(check_interval)
+            w.add_done_callback(done.put)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for i in range(len(workers)):
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                yield done.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError(f"{len(workers) - i} (of {len(workers)}) workers are not finished")
+
+    @staticmethod
+    def wait_any(*workers: ThreadWorker, timeout: Optional[float] = None) -> Optional[ThreadWorker]:
+        """
+        wait until one of the defined workers is done and return it, return None on timeout
+        """
+        try:
+            return next(ThreadWorkerManager.as_completed(*workers, timeout=timeout))
+        except (TimeoutError, StopIteration):
+            return None
 
     @staticmethod
     def await_workers(*workers: ThreadWorker, await_all: bool = False) -> dict:
@@ -363,31 +978,268 @@ class __ThreadWorkerManager():
         return res
 
     @staticmethod
-    def list(active_only=False):
+    def list(active_only=False) -> list:
+        """
+        Log a table of the workers and return it as a list of dicts
+        """
         formatStr = "{:<5}|{:<20}|{:<6}|{:<15}| {:<15}"
         lineSeparator = lambda: logger.debug("{:=<62}".format(""))
         lineSeparator()
         logger.debug(formatStr.format("ID","Name","Active","Address","WorkTime (s)"))
         lineSeparator()
-        for x, key in enumerate(ThreadWorkerManager.allWorkers):
-            w = ThreadWorkerManager.allWorkers[key]
-            f = str(w).split(">")[0].split(' ')[3][:15]
-            pline = lambda: logger.debug(formatStr.format(w.id,w.name,str(w.is_alive),f,w.work_time))
-            if not active_only:
-                pline()
-            else:
-                if w.is_alive: pline()
+        res = []
+        for w in ThreadWorkerManager.allWorkers.copy().values():
+            alive = w.is_alive
+            if active_only and not alive:
+                continue
+            res.append({
+                "id": w.id,
+                "name": w.name,
+                "is_alive": alive,
+                "address": hex(id(w)),
+                "work_time": w.work_time
+            })
+            logger.debug(formatStr.format(w.id,w.name,str(alive),hex(id(w)),f"{w.work_time:.6f}"))
         lineSeparator()
+        return res
+
+    @staticmethod
+    def stats(name: Optional[str] = None) -> dict:
+        """
+        Return the counters (started, finished, aborted, failed), the in-flight gauges
+        and the queue wait / run time histograms, by worker name
+        """
+        return ThreadWorkerManager.metrics.snapshot(name)
+
+    @staticmethod
+    def export_metrics(format: str = "prometheus") -> str:
+        """
+        Render `stats()` as Prometheus text ("prometheus") or "json"
+        """
+        assert format in ("prometheus", "json"), "format must be `prometheus` or `json`"
+        if format == "json":
+            return ThreadWorkerManager.metrics.to_json()
+        return ThreadWorkerManager.metrics.to_prometheus()
+
+    @staticmethod
+    def reset_stats():
+        ThreadWorkerManager.metrics.reset()
 
     @staticmethod
     def clear():
-        ThreadWorkerManager.allWorkers = {}
+        ThreadWorkerManager.allWorkers.clear()
+
+    @staticmethod
+    def set_history_size(history_size: int):
+        """
+        Set how many finished workers are kept in `allWorkers`, the live workers are always kept
+        """
+        ThreadWorkerManager.allWorkers.set_history_size(history_size)
+
+    @staticmethod
+    def active_workers() -> list:
+        """
+        Return the live (not finished) workers
+        """
+        return ThreadWorkerManager.allWorkers.active()
+
+    @staticmethod
+    def get_gate(
+        name: str,
+        max_concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        on_full: str = "block"
+    ) -> WorkerGate:
+        """
+        Get the concurrency gate of a worker name, create or update it when `max_concurrency` is given
+        """
+        with ThreadWorkerManager.gates_lock:
+            gate = ThreadWorkerManager.gates.get(name)
+            if gate is None:
+                assert max_concurrency, f"worker `{name}` has no concurrency limit"
+                gate = ThreadWorkerManager.gates[name] = WorkerGate(
+                    name, max_concurrency, queue_size, on_full, ThreadWorkerManager.priority_aging_rate
+                )
+                return gate
+        if max_concurrency:
+            assert on_full != "drop_oldest" or queue_size != 0, "drop_oldest needs a queue_size greater than 0"
+            gate.queue_size = queue_size
+            gate.on_full = on_full
+            if max_concurrency != gate.max_concurrency:
+                gate.resize(max_concurrency)
+        return gate
+
+    @staticmethod
+    def list_gates() -> dict:
+        """
+        Return the running and queued workers of all concurrency limited names
+        """
+        formatStr = "{:<20}|{:<8}|{:<8}|{:<8}|{:<8}| {:<8}"
+        lineSeparator = lambda: logger.debug("{:=<66}".format(""))
+        lineSeparator()
+        logger.debug(formatStr.format("Name","Max","Running","Pending","Queue","Rejected"))
+        lineSeparator()
+        res = {}
+        for name, gate in list(ThreadWorkerManager.gates.items()):
+            res[name] = gate.info()
+            logger.debug(formatStr.format(name,gate.max_concurrency,gate.running,gate.pending,str(gate.queue_size),gate.rejected))
+        lineSeparator()
+        return res
+
+    @staticmethod
+    def queue_depth(name: str) -> int:
+        """
+        Return how many workers of a name are waiting for a free slot
+        """
+        gate = ThreadWorkerManager.gates.get(name)
+        return gate.pending if gate else 0
+
+    @staticmethod
+    def get_pool(name: str, max_workers: Optional[int] = None) -> ThreadPool:
+        """
+        Get a named thread pool, create it if it doesn't exist yet
+        """
+        with ThreadWorkerManager.pools_lock:
+            if name not in ThreadWorkerManager.pools:
+                ThreadWorkerManager.pools[name] = ThreadPool(name, max_workers, ThreadWorkerManager.priority_aging_rate)
+            return ThreadWorkerManager.pools[name]
+
+    @staticmethod
+    def list_pools() -> dict:
+        """
+        Return the information of all thread pools
+        """
+        formatStr = "{:<20}|{:<8}|{:<6}|{:<6}| {:<8}"
+        lineSeparator = lambda: logger.debug("{:=<52}".format(""))
+        lineSeparator()
+        logger.debug(formatStr.format("Name","Max","Size","Idle","Pending"))
+        lineSeparator()
+        res = {}
+        for name, pool in list(ThreadWorkerManager.pools.items()):
+            res[name] = pool.info()
+            logger.debug(formatStr.format(name,pool.max_workers,pool.size,pool.idle,pool.pending))
+        lineSeparator()
+        return res
+
+    @staticmethod
+    def resize_pool(name: str, max_workers: int):
+        """
+        Change the maximum number of threads of a named pool
+        """
+        ThreadWorkerManager.get_pool(name).resize(max_workers)
+
+    @staticmethod
+    def shutdown_pool(name: str, wait: bool = True):
+        """
+        Shut down a named pool, the queued tasks are finished first
+        """
+        with ThreadWorkerManager.pools_lock:
+            pool = ThreadWorkerManager.pools.pop(name, None)
+        if pool:
+            ThreadWorkerManager.stop_autoscale(name)
+            pool.shutdown(wait)
+
+    @staticmethod
+    def shutdown_all_pools(wait: bool = True):
+        """
+        Shut down all the thread pools
+        """
+        for name in list(ThreadWorkerManager.pools):
+            ThreadWorkerManager.shutdown_pool(name, wait)
+
+    @staticmethod
+    def autoscale(
+        pool: Union[str, ThreadPool, "ProcessPool"],
+        policy: Union[bool, dict, ScalingPolicy, None] = None,
+        **options
+    ) -> Autoscaler:
+        """
+        Resize a pool automatically from its queue wait, utilization and throughput.
+        It replaces the previous autoscaler of the pool
+
+        :params pool: str | ThreadPool | ProcessPool -> a thread pool name or a pool
+        :params policy: ScalingPolicy -> when to resize, default to `ScalingPolicy(**options)`
+        """
+        if isinstance(pool, str):
+            pool = ThreadWorkerManager.get_pool(pool)
+        autoscaler = Autoscaler(pool, get_policy(policy or options or True), ThreadWorkerManager.deadlines)
+        with ThreadWorkerManager.autoscalers_lock:
+            previous = ThreadWorkerManager.autoscalers.get(pool.name)
+            ThreadWorkerManager.autoscalers[pool.name] = autoscaler
+        if previous:
+            previous.stop()
+        autoscaler.start()
+        return autoscaler
+
+    @staticmethod
+    def stop_autoscale(name: str):
+        """
+        Stop resizing a pool, it keeps its current size
+        """
+        with ThreadWorkerManager.autoscalers_lock:
+            autoscaler = ThreadWorkerManager.autoscalers.pop(name, None)
+        if autoscaler:
+            autoscaler.stop()
+
+    @staticmethod
+    def list_autoscalers() -> dict:
+        """
+        Return the state and latest decision of all the autoscalers, `autoscalers[name].decisions` keeps their resizes
+        """
+        return {name: autoscaler.info() for name, autoscaler in list(ThreadWorkerManager.autoscalers.items())}
+
+    @staticmethod
+    def get_event_loop() -> "EventLoopThread":
+        """
+        Get one of the shared event loop threads (round-robin), start them if needed
+        """
+        from .loop import EventLoopThread
+        with ThreadWorkerManager.event_loops_lock:
+            loops = ThreadWorkerManager.event_loops
+            if not loops:
+                for i in range(ThreadWorkerManager.event_loop_threads):
+                    loops.append(EventLoopThread(f"worker-loop-{i}"))
+            ThreadWorkerManager.event_loop_index = (ThreadWorkerManager.event_loop_index + 1) % len(loops)
+            return loops[ThreadWorkerManager.event_loop_index]
+
+    @staticmethod
+    def set_event_loop_threads(n: int):
+        """
+        Set the number of shared event loop threads, the running loops are kept until shutdown
+        """
+        assert n > 0, "the number of event loop threads must be greater than 0"
+        from .loop import EventLoopThread
+        with ThreadWorkerManager.event_loops_lock:
+            ThreadWorkerManager.event_loop_threads = n
+            while len(ThreadWorkerManager.event_loops) and len(ThreadWorkerManager.event_loops) < n:
+                ThreadWorkerManager.event_loops.append(
+                    EventLoopThread(f"worker-loop-{len(ThreadWorkerManager.event_loops)}")
+                )
+
+    @staticmethod
+    def list_event_loops() -> list:
+        """
+        Return the information of the shared event loop threads
+        """
+        return [loop_thread.info() for loop_thread in ThreadWorkerManager.event_loops]
+
+    @staticmethod
+    def shutdown_event_loops(wait: bool = True):
+        """
+        Stop the shared event loop threads, with `wait` the running coroutines are finished first
+        """
+        with ThreadWorkerManager.event_loops_lock:
+            loops = ThreadWorkerManager.event_loops
+            ThreadWorkerManager.event_loops = []
+        for loop_thread in loops:
+            loop_thread.stop(wait)
 
     @staticmethod
     def abort_thread(threadObject: threading.Thread):
         """
         Abort specific thread object
         """
+        import ctypes
         res = 0
         try:
             if not res:
@@ -445,8 +1297,8 @@ class __ThreadWorkerManager():
         Abort specific worker object
         """
         try:
-            if all([forbidden not in str(workerObject.thread) for forbidden in ["MainThread","daemon"]]):
-                ThreadWorkerManager.abort_thread(workerObject.thread)
+            # the worker knows whether it owns its thread, a pooled or shared loop thread is never aborted
+            workerObject.abort()
         except Exception as e:
             logger.debug(e)
 
@@ -471,12 +1323,10 @@ class __ThreadWorkerManager():
         If some workers cannot aborted, it will retry the abortion for 10 times before it failing to abort.
         """
         if keyboard_interrupt_only:
-            for key in ThreadWorkerManager.allWorkers:
-                worker = ThreadWorkerManager.allWorkers[key]
+            for worker in ThreadWorkerManager.allWorkers.active():
                 worker.interrupt()
         else:
-            for key in ThreadWorkerManager.allWorkers:
-                worker = ThreadWorkerManager.allWorkers[key]
+            for worker in ThreadWorkerManager.allWorkers.active():
                 worker.abort()
 
     @staticmethod
@@ -488,37 +1338,37 @@ class __ThreadWorkerManager():
     @staticmethod
     def interrupt_handler(sig, frame):
         timeout = False
-        getAliveThreadWithInterrupt = lambda: any([
-            ThreadWorkerManager.allWorkers[key].is_alive
-            for key in ThreadWorkerManager.allWorkers
-            if ThreadWorkerManager.allWorkers[key].enable_keyboard_interrupt
-        ])
+        getAliveThreadWithInterrupt = lambda: [
+            tw
+            for tw in ThreadWorkerManager.allWorkers.active()
+            if tw.is_alive and tw.enable_keyboard_interrupt
+        ]
 
-        if getAliveThreadWithInterrupt():
+        workers = getAliveThreadWithInterrupt()
+        if workers:
             try:
-                for key in ThreadWorkerManager.allWorkers:
-                    tw = ThreadWorkerManager.allWorkers[key]
-                    if tw.is_alive and tw.enable_keyboard_interrupt:
-                        tw.aborted_by_kbInterrupt = True
-                stat = getAliveThreadWithInterrupt()
+                for tw in workers:
+                    tw.aborted_by_kbInterrupt = True
+                logger.debug("[WORKER] Aborting..")
                 now = time.time()
-
-                if stat:
-                    logger.debug("[WORKER] Aborting..")
-
-                while stat:
-                    [ThreadWorkerManager.abort_all_worker(keyboard_interrupt_only=True) for i in range(10)]
-                    stat = getAliveThreadWithInterrupt()
-                    time.sleep(0.01)
+                # the tokens wake up the cooperative workers at once, the others get the asynchronous exception
+                for tw in workers:
+                    tw.interrupt()
+                while not ThreadWorkerManager.wait(*workers, timeout=ThreadWorkerManager.abort_grace):
                     if time.time()-now > ThreadWorkerManager.interrupt_timeout:
                         timeout = True
                         break
+                    # retry the workers which swallowed the exception
+                    workers = [tw for tw in workers if not tw.finished]
+                    for tw in workers:
+                        tw.interrupt()
             finally:
                 if not timeout:
                     logger.debug("\n[WORKER] All Workers Aborted")
                 else:
                     logger.debug("[WORKER] Aborting Timeout")
         else:
+            import signal
             return signal.default_int_handler()
 
     __systemExitThread = None
@@ -549,6 +1399,7 @@ class __ThreadWorkerManager():
         - ex: enableKeyboardInterrupt(enable_exit_thread=True)
         """
         if not ThreadWorkerManager.keyboard_interrupt_handler_status:
+            import signal
             signal.signal(signal.SIGINT, ThreadWorkerManager.interrupt_handler)
             ThreadWorkerManager.keyboard_interrupt_handler_status = True
             if enable_exit_thread:
@@ -561,9 +1412,12 @@ class __ThreadWorkerManager():
         Disable the keyboard interrupt (CTRL+C) to abort the running thread
         """
         if ThreadWorkerManager.keyboard_interrupt_handler_status:
+            import signal
             signal.signal(signal.SIGINT, signal.default_int_handler)
             ThreadWorkerManager.keyboard_interrupt_handler_status = False
             if ThreadWorkerManager.__systemExitThread:
                 ThreadWorkerManager.__systemExitThread.abort()
 
-ThreadWorkerManager = __ThreadWorkerManager()
\ No newline at end of file
+ThreadWorkerManager = __ThreadWorkerManager()
+_register_atexit(ThreadWorkerManager.shutdown_all_pools)
+_register_atexit(ThreadWorkerManager.shutdown_event_loops)
\ No newline at end of file